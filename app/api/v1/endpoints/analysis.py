@@ -1,8 +1,12 @@
 """Endpoints de análise."""
-from fastapi import APIRouter, HTTPException, status, Query, Request
+import asyncio
+import gzip
+import hashlib
+from fastapi import APIRouter, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from app.database import get_db
+from app.database import get_db, AsyncSessionLocal
 from fastapi import Depends
 from app.services.analysis_service import AnalysisService
 from app.api.v1.schemas import AnalysisResponse, AnalysisListResponse
@@ -14,97 +18,149 @@ from typing import Optional
 
 router = APIRouter()
 
+# Stream de status (SSE): intervalo de verificação no servidor e, em ticks
+# sem mudança, a cada quantos envia um comentário para manter a conexão
+EVENTS_POLL_INTERVAL = 1.0
+EVENTS_KEEPALIVE_TICKS = 15
 
-@router.get("/{analysis_id}", response_model=AnalysisResponse)
+# Status a partir deste tamanho vai comprimido com gzip se o cliente aceitar
+# (só JSON de status; arquivos de vídeo não passam por aqui)
+STATUS_GZIP_MIN_SIZE = 1024
+
+
+async def _build_analysis_response(
+    analysis_id: str,
+    db: AsyncSession,
+    base_url: str
+) -> Optional[AnalysisResponse]:
+    """Monta o status completo da análise (None se não existir)."""
+    analysis = await AnalysisService.get_analysis(analysis_id, db)
+    
+    if not analysis:
+        return None
+    
+    # Buscar steps
+    from app.models.analysis_step import AnalysisStep
+    steps_result = await db.execute(
+        select(AnalysisStep)
+        .where(AnalysisStep.analysis_id == analysis.id)
+        .order_by(AnalysisStep.step_name)
+    )
+    steps = steps_result.scalars().all()
+    
+    # Formatar steps
+    steps_info = []
+    current_step = None
+    total_progress = 0
+    
+    for step in steps:
+        steps_info.append({
+            "name": step.step_name.value,
+            "status": step.status.value,
+            "progress": step.progress,
+            "started_at": step.started_at,
+            "completed_at": step.completed_at
+        })
+        
+        if step.status.value == "running":
+            current_step = step.step_name.value
+        
+        total_progress += step.progress
+    
+    # Calcular progresso médio
+    avg_progress = total_progress // len(steps) if steps else 0
+    
+    async def resolve_file_url(file_id: Optional[uuid.UUID], default_url: Optional[str]) -> Optional[str]:
+        if not file_id:
+            return None
+        result = await db.execute(select(File).where(File.id == file_id))
+        file_record = result.scalar_one_or_none()
+        if file_record and file_record.cdn_uploaded and file_record.cdn_url:
+            return file_record.cdn_url
+        return default_url
+    
+    original_video_url = await resolve_file_url(
+        analysis.original_file_id,
+        f"{base_url}/api/v1/files/{analysis_id}/original"
+    )
+    clean_video_url = await resolve_file_url(
+        analysis.clean_video_id,
+        f"{base_url}/api/v1/files/{analysis_id}/clean_video" if analysis.clean_video_id else None
+    )
+    report_url = await resolve_file_url(
+        analysis.report_file_id,
+        f"{base_url}/api/v1/reports/{analysis_id}/report" if analysis.report_file_id else None
+    )
+    
+    return AnalysisResponse(
+        id=str(analysis.id),
+        status=analysis.status.value,
+        progress=avg_progress,
+        current_step=current_step,
+        steps=steps_info,
+        created_at=analysis.created_at,
+        started_at=analysis.started_at,
+        completed_at=analysis.completed_at,
+        classification=analysis.classification,
+        confidence=analysis.confidence,
+        clean_video_url=clean_video_url,
+        report_url=report_url,
+        original_video_url=original_video_url
+    )
+
+
+def _base_url(request: Optional[Request]) -> str:
+    """URL base para os links de arquivos da resposta."""
+    if request:
+        return str(request.base_url).rstrip('/')
+    return settings.API_BASE_URL or "http://localhost:8000"
+
+
+@router.get(
+    "/{analysis_id}",
+    # Corpo montado à mão (ETag, 304, gzip): o schema vem de `responses`, e a
+    # validação já ocorre ao construir AnalysisResponse
+    response_class=Response,
+    responses={
+        200: {"model": AnalysisResponse, "description": "Status da análise (gzip se aceito pelo cliente)"},
+        304: {"description": "Status inalterado desde o ETag enviado em If-None-Match"},
+    }
+)
 async def get_analysis(
     analysis_id: str,
     request: Request,
     db: AsyncSession = Depends(get_db)
 ):
-    """Obtém status completo da análise."""
+    """
+    Obtém status completo da análise.
+    
+    A resposta traz ETag; com If-None-Match igual, responde 304 sem corpo
+    (clientes em polling só baixam o status quando algo mudou).
+    """
     try:
-        analysis = await AnalysisService.get_analysis(analysis_id, db)
+        analysis_response = await _build_analysis_response(analysis_id, db, _base_url(request))
         
-        if not analysis:
+        if not analysis_response:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Análise não encontrada"
             )
         
-        # Buscar steps
-        from app.models.analysis_step import AnalysisStep
-        steps_result = await db.execute(
-            select(AnalysisStep)
-            .where(AnalysisStep.analysis_id == analysis.id)
-            .order_by(AnalysisStep.step_name)
-        )
-        steps = steps_result.scalars().all()
-        
-        # Formatar steps
-        steps_info = []
-        current_step = None
-        total_progress = 0
-        
-        for step in steps:
-            steps_info.append({
-                "name": step.step_name.value,
-                "status": step.status.value,
-                "progress": step.progress,
-                "started_at": step.started_at,
-                "completed_at": step.completed_at
-            })
-            
-            if step.status.value == "running":
-                current_step = step.step_name.value
-            
-            total_progress += step.progress
-        
-        # Calcular progresso médio
-        avg_progress = total_progress // len(steps) if steps else 0
-        
-        # Gerar URLs base
-        if request:
-            base_url = str(request.base_url).rstrip('/')
-        else:
-            base_url = settings.API_BASE_URL or "http://localhost:8000"
-        
-        async def resolve_file_url(file_id: Optional[uuid.UUID], default_url: Optional[str]) -> Optional[str]:
-            if not file_id:
-                return None
-            result = await db.execute(select(File).where(File.id == file_id))
-            file_record = result.scalar_one_or_none()
-            if file_record and file_record.cdn_uploaded and file_record.cdn_url:
-                return file_record.cdn_url
-            return default_url
-        
-        original_video_url = await resolve_file_url(
-            analysis.original_file_id,
-            f"{base_url}/api/v1/files/{analysis_id}/original"
-        )
-        clean_video_url = await resolve_file_url(
-            analysis.clean_video_id,
-            f"{base_url}/api/v1/files/{analysis_id}/clean_video" if analysis.clean_video_id else None
-        )
-        report_url = await resolve_file_url(
-            analysis.report_file_id,
-            f"{base_url}/api/v1/reports/{analysis_id}/report" if analysis.report_file_id else None
-        )
-        
-        return AnalysisResponse(
-            id=str(analysis.id),
-            status=analysis.status.value,
-            progress=avg_progress,
-            current_step=current_step,
-            steps=steps_info,
-            created_at=analysis.created_at,
-            started_at=analysis.started_at,
-            completed_at=analysis.completed_at,
-            classification=analysis.classification,
-            confidence=analysis.confidence,
-            clean_video_url=clean_video_url,
-            report_url=report_url,
-            original_video_url=original_video_url
+        body = analysis_response.model_dump_json().encode()
+        headers = {"Vary": "Accept-Encoding"}
+        compress = (
+            len(body) >= STATUS_GZIP_MIN_SIZE
+            and "gzip" in request.headers.get("accept-encoding", "")
         )
+        # Cada representação (comprimida ou não) tem seu próprio ETag
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        headers["ETag"] = f'"{digest}-gzip"' if compress else f'"{digest}"'
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        if compress:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        return Response(content=body, media_type="application/json", headers=headers)
     
     except HTTPException:
         raise
@@ -119,6 +175,56 @@ async def get_analysis(
         )
 
 
+@router.get("/{analysis_id}/events")
+async def stream_analysis_events(analysis_id: str, request: Request):
+    """
+    Stream (Server-Sent Events) do status da análise.
+    
+    Envia um evento `data: {json}` (mesmo formato de GET /{analysis_id}) a cada
+    mudança e encerra quando a análise termina (completed/failed). O cliente
+    mantém uma única conexão em vez de fazer polling.
+    """
+    base_url = _base_url(request)
+    
+    async with AsyncSessionLocal() as db:
+        if not await AnalysisService.get_analysis(analysis_id, db):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Análise não encontrada"
+            )
+    
+    async def events():
+        last_body = None
+        idle_ticks = 0
+        while not await request.is_disconnected():
+            # Sessão nova a cada tick: enxerga o que o worker gravou desde o último
+            async with AsyncSessionLocal() as db:
+                analysis_response = await _build_analysis_response(analysis_id, db, base_url)
+            if analysis_response is None:
+                return
+            
+            body = analysis_response.model_dump_json()
+            if body != last_body:
+                last_body = body
+                idle_ticks = 0
+                yield f"data: {body}\n\n"
+                if analysis_response.status in ("completed", "failed"):
+                    return
+            else:
+                idle_ticks += 1
+                if idle_ticks >= EVENTS_KEEPALIVE_TICKS:
+                    idle_ticks = 0
+                    yield ": keep-alive\n\n"
+            
+            await asyncio.sleep(EVENTS_POLL_INTERVAL)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("", response_model=AnalysisListResponse)
 async def list_analyses(
     page: int = Query(1, ge=1),
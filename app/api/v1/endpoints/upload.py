@@ -1,15 +1,18 @@
 """Endpoints de upload."""
+import asyncio
 import mimetypes
 import logging
 from pathlib import Path
 from typing import Optional
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, status, Query, Request, BackgroundTasks
+from fastapi import Path as PathParam
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
-from app.services.upload_service import UploadService
+from app.services.upload_service import UploadService, MAX_BULK_CHUNKS
 from app.services.analysis_service import AnalysisService
 from app.utils.formatters import format_success_response, format_error_response
 from app.utils.context import get_correlation_id, format_log_with_context
+from app.utils.chunked_upload import BULK_CONTENT_TYPE, BULK_FRAME_HEADER, BULK_DIGEST_SIZE
 from app.api.v1.schemas import (
     UploadInitResponse,
     ChunkUploadResponse,
@@ -23,6 +26,76 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+async def _read_body_limited(request: Request, limit: int, message: str) -> bytes:
+    """
+    Lê o corpo da requisição em streaming, abortando com 413 assim que
+    passar de `limit` bytes (ou se o Content-Length já anunciar mais).
+    
+    Content-Length inválido levanta ValueError (400).
+    """
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=format_error_response(
+            message=message,
+            error_code="VALIDATION_ERROR"
+        )
+    )
+    content_length = request.headers.get("content-length")
+    if content_length is not None:
+        try:
+            declared = int(content_length)
+        except ValueError:
+            declared = -1
+        if declared < 0:
+            raise ValueError("Cabeçalho Content-Length inválido")
+        if declared > limit:
+            raise too_large
+    
+    parts = []
+    received = 0
+    async for part in request.stream():
+        received += len(part)
+        if received > limit:
+            raise too_large
+        parts.append(part)
+    return b"".join(parts)
+
+
+def _chunk_upload_error(error: Exception, message: str) -> HTTPException:
+    """
+    Converte um erro do envio de chunks na HTTPException da resposta.
+    
+    ValueError vira 400, RuntimeError vira 500 (UPLOAD_ERROR) e qualquer
+    outro erro vira 500 com `message`; HTTPException passa sem alteração.
+    """
+    if isinstance(error, HTTPException):
+        return error
+    if isinstance(error, ValueError):
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=format_error_response(
+                message=str(error),
+                error_code="VALIDATION_ERROR"
+            )
+        )
+    if isinstance(error, RuntimeError):
+        return HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=format_error_response(
+                message=str(error),
+                error_code="UPLOAD_ERROR"
+            )
+        )
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail=format_error_response(
+            message=message,
+            error_code="INTERNAL_ERROR",
+            details={"error": str(error)}
+        )
+    )
+
+
 @router.post(
     "/init",
     response_model=UploadInitResponse,
@@ -106,16 +179,19 @@ async def init_upload(
         
         # Salvar arquivo completo de uma vez
         # Dividir em chunks se necessário para arquivos grandes
-        if file_size <= chunk_size:
-            # Arquivo cabe em um chunk, salvar diretamente
-            UploadService.save_chunk(upload_id, 0, content)
-        else:
+        def save_all_chunks():
+            if file_size <= chunk_size:
+                # Arquivo cabe em um chunk, salvar diretamente
+                UploadService.save_chunk(upload_id, 0, content)
+                return
             # Arquivo grande - salvar em múltiplos chunks
-            chunks_saved = 0
-            for i in range(0, file_size, chunk_size):
-                chunk_data = content[i:i + chunk_size]
-                UploadService.save_chunk(upload_id, chunks_saved, chunk_data)
-                chunks_saved += 1
+            # (fatias de memoryview não copiam o conteúdo)
+            buffer = memoryview(content)
+            for chunk_number, i in enumerate(range(0, file_size, chunk_size)):
+                UploadService.save_chunk(upload_id, chunk_number, buffer[i:i + chunk_size])
+        
+        # Escrita em disco fora do event loop
+        await asyncio.to_thread(save_all_chunks)
         
         response_data = {
             "upload_id": upload_id,
@@ -162,22 +238,24 @@ async def init_upload(
 )
 async def upload_chunk(
     upload_id: str,
-    chunk_number: int = Form(..., description="Número do chunk (0-indexed)"),
+    chunk_number: int = Form(..., ge=0, description="Número do chunk (0-indexed)"),
     chunk: UploadFile = File(..., description="Dados do chunk (máx 5MB)")
 ):
     try:
         # Ler dados do chunk
         chunk_data = await chunk.read()
         
-        # Salvar chunk
-        chunks_received, progress = UploadService.save_chunk(
+        # Salvar chunk (escrita em disco fora do event loop, liberando-o
+        # para outros uploads concorrentes)
+        chunks_received, progress = await asyncio.to_thread(
+            UploadService.save_chunk,
             upload_id=upload_id,
             chunk_number=chunk_number,
             chunk_data=chunk_data
         )
         
         # Obter status completo
-        status_info = UploadService.get_upload_status(upload_id)
+        status_info = await asyncio.to_thread(UploadService.get_upload_status, upload_id)
         if not status_info:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -191,31 +269,102 @@ async def upload_chunk(
             progress=progress
         )
     
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=format_error_response(
-                message=str(e),
-                error_code="VALIDATION_ERROR"
-            )
+    except Exception as e:
+        raise _chunk_upload_error(e, "Erro ao processar chunk")
+
+
+@router.put(
+    "/chunk/{upload_id}/{chunk_number}",
+    response_model=ChunkUploadResponse,
+    tags=["upload"],
+    summary="Upload de chunk (corpo binário)",
+    description="""
+    Igual a `POST /chunk/{upload_id}`, mas com os dados do chunk como corpo
+    da requisição (`Content-Type: application/octet-stream`), sem
+    codificação multipart.
+    """
+)
+async def upload_chunk_raw(
+    upload_id: str,
+    request: Request,
+    chunk_number: int = PathParam(..., ge=0, description="Número do chunk (0-indexed)")
+):
+    try:
+        chunk_data = await _read_body_limited(
+            request, settings.CHUNK_SIZE, f"Chunk maior que {settings.CHUNK_SIZE} bytes"
         )
-    except RuntimeError as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=format_error_response(
-                message=str(e),
-                error_code="UPLOAD_ERROR"
+        
+        # Escrita em disco fora do event loop
+        chunks_received, progress = await asyncio.to_thread(
+            UploadService.save_chunk,
+            upload_id=upload_id,
+            chunk_number=chunk_number,
+            chunk_data=chunk_data
+        )
+        
+        status_info = await asyncio.to_thread(UploadService.get_upload_status, upload_id)
+        if not status_info:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Upload não encontrado"
             )
+        
+        return ChunkUploadResponse(
+            upload_id=upload_id,
+            chunks_received=chunks_received,
+            total_chunks=status_info["total_chunks"],
+            progress=progress
         )
+    
     except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=format_error_response(
-                message="Erro ao processar chunk",
-                error_code="INTERNAL_ERROR",
-                details={"error": str(e)}
+        raise _chunk_upload_error(e, "Erro ao processar chunk")
+
+
+@router.post(
+    "/chunk_bulk/{upload_id}",
+    response_model=ChunkUploadResponse,
+    tags=["upload"],
+    summary="Upload de chunks em lote",
+    description=f"""
+    Envia vários chunks em uma única requisição.
+    
+    **Formato do corpo** (`Content-Type: {BULK_CONTENT_TYPE}`), para cada chunk:
+    - tamanho dos dados (uint32 little-endian)
+    - `chunk_number` (uint32 little-endian)
+    - dados do chunk
+    - BLAKE2b de 16 bytes dos dados
+    
+    Máximo de {MAX_BULK_CHUNKS} chunks por requisição. Um frame inválido
+    rejeita o lote inteiro sem gravar nenhum chunk.
+    """
+)
+async def upload_chunk_bulk(upload_id: str, request: Request):
+    max_body = MAX_BULK_CHUNKS * (settings.CHUNK_SIZE + BULK_FRAME_HEADER.size + BULK_DIGEST_SIZE)
+    
+    try:
+        body = await _read_body_limited(request, max_body, f"Lote maior que {max_body} bytes")
+        
+        # Validação dos frames e escrita em disco fora do event loop
+        chunks_received, progress = await asyncio.to_thread(
+            UploadService.save_chunks_bulk, upload_id, body
+        )
+        
+        status_info = await asyncio.to_thread(UploadService.get_upload_status, upload_id)
+        if not status_info:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Upload não encontrado"
             )
+        
+        return ChunkUploadResponse(
+            upload_id=upload_id,
+            chunks_received=chunks_received,
+            total_chunks=status_info["total_chunks"],
+            progress=progress
         )
+    
+    except Exception as e:
+        raise _chunk_upload_error(e, "Erro ao processar lote de chunks")
 
 
 @router.post(
@@ -265,9 +414,6 @@ async def complete_upload(
         
         # Iniciar processamento em background
         # Usar BackgroundTasks (preferencial) ou asyncio.create_task como fallback
-        import logging
-        import asyncio
-        logger = logging.getLogger(__name__)
         logger.info(f"[UPLOAD] Iniciando processamento para análise {analysis_id}")
         
         # Tentar usar BackgroundTasks primeiro (mais confiável no FastAPI)
@@ -407,12 +553,13 @@ async def analyze_video(
             )
             raise ValueError(error)
         
-        logger.debug(
-            format_log_with_context(
-                "UPLOAD",
-                f"Validação de tipo OK: {filename} ({file.content_type})",
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                format_log_with_context(
+                    "UPLOAD",
+                    f"Validação de tipo OK: {filename} ({file.content_type})",
+                )
             )
-        )
         
         # Validar tamanho
         from app.utils.validators import validate_file_size
@@ -426,12 +573,13 @@ async def analyze_video(
             )
             raise ValueError(error)
         
-        logger.debug(
-            format_log_with_context(
-                "UPLOAD",
-                f"Validação de tamanho OK: {file_size} bytes (máx: {settings.MAX_FILE_SIZE})",
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                format_log_with_context(
+                    "UPLOAD",
+                    f"Validação de tamanho OK: {file_size} bytes (máx: {settings.MAX_FILE_SIZE})",
+                )
             )
-        )
         
         # Criar análise diretamente do arquivo
         logger.info(
@@ -461,7 +609,6 @@ async def analyze_video(
         )
         
         # Iniciar processamento em background
-        import asyncio
         logger.info(
             format_log_with_context(
                 "UPLOAD",
@@ -574,7 +721,7 @@ async def analyze_video(
     description="Obtém o status atual de um upload em andamento."
 )
 async def get_upload_status(upload_id: str):
-    status_info = UploadService.get_upload_status(upload_id)
+    status_info = await asyncio.to_thread(UploadService.get_upload_status, upload_id)
     
     if not status_info:
         raise HTTPException(
@@ -43,6 +43,8 @@ class Settings(BaseSettings):
     STORAGE_PATH: str = "/app/storage"
     MAX_FILE_SIZE: int = 10737418240  # 10GB
     CHUNK_SIZE: int = 5242880  # 5MB
+    CHECKSUM_ALGO: str = "sha256"  # sha256 ou blake3 (requer o pacote blake3)
+    UPLOAD_DIRECT_WRITE: bool = False  # Gravar chunks direto no arquivo final (pwrite), sem arquivo por chunk
     
     # DigitalOcean Spaces
     DO_SPACES_ENDPOINT: Optional[str] = None
@@ -52,10 +54,19 @@ class Settings(BaseSettings):
     DO_SPACES_REGION: str = "nyc3"
     OUTPUT_PREFIX: str = "vid-finger"
     UPLOAD_TO_CDN: bool = False
+    S3_MULTIPART_PART_SIZE: int = 67108864  # 64MB por parte no upload multipart
+    S3_MULTIPART_CONCURRENCY: int = 16  # Partes enviadas em paralelo
     
     # Webhooks
     WEBHOOK_TIMEOUT: int = 10
     WEBHOOK_RETRY_ATTEMPTS: int = 3
+    WEBHOOK_BATCHING: bool = False  # Agrupar eventos por URL em {"deliveries": [...]}
+    WEBHOOK_BATCH_MAX: int = 50  # Máximo de eventos por lote
+    WEBHOOK_BATCH_WINDOW: float = 0.2  # Janela (s) para acumular eventos de um lote
+    WEBHOOK_BACKOFF_BASE: float = 0.5  # Base (s) do backoff exponencial entre tentativas
+    WEBHOOK_BACKOFF_CAP: float = 30.0  # Espera máxima (s) entre tentativas
+    WEBHOOK_CIRCUIT_THRESHOLD: int = 5  # Falhas consecutivas que abrem o circuito da URL
+    WEBHOOK_CIRCUIT_COOLDOWN: float = 60.0  # Tempo (s) com o circuito aberto antes de testar de novo
     
     # Celery
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
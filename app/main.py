@@ -6,6 +6,7 @@ from contextlib import asynccontextmanager
 from app.config import settings
 from app.api.v1.router import api_router
 from app.services.file_service import FileService
+from app.services.webhook_service import close_http_client
 from app.utils.logger import setup_logging, get_logger
 from app.middleware.request_logging import RequestLoggingMiddleware
 
@@ -59,6 +60,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info(format_log_message("🛑", "Encerrando aplicação..."))
+    await close_http_client()
     logger.info(format_log_message("👋", "Aplicação encerrada"))
 
 app = FastAPI(
@@ -44,7 +44,12 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
         
         # Logar body se for pequeno (máx 1KB) e não for binário
         # Não logar body para uploads de arquivo (pode ser muito grande)
-        if request.method in ["POST", "PUT", "PATCH"] and "/upload/" not in str(request.url.path):
+        # Só em DEBUG: fora dele, ler o body seria trabalho descartado
+        if (
+            self.logger.isEnabledFor(logging.DEBUG)
+            and request.method in ["POST", "PUT", "PATCH"]
+            and "/upload/" not in str(request.url.path)
+        ):
             try:
                 # Verificar se já foi lido
                 if hasattr(request, '_body') and request._body:
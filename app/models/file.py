@@ -32,7 +32,7 @@ class File(Base):
     cdn_url = Column(String, nullable=True)
     cdn_uploaded = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    checksum = Column(String, nullable=False)  # SHA256
+    checksum = Column(String, nullable=False)  # SHA256 (hex) ou "blake3:<hex>"
     
     # Relationships
     analysis = relationship("Analysis", foreign_keys=[analysis_id])
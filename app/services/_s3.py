@@ -0,0 +1,40 @@
+"""Cliente S3 compartilhado para DigitalOcean Spaces."""
+import threading
+from typing import Any
+import boto3
+from botocore.config import Config
+from app.config import settings
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_s3_client() -> Any:
+    """
+    Retorna o cliente S3 único do processo, criando-o na primeira chamada.
+
+    StorageService e SpacesLifecycleService compartilham o mesmo cliente e,
+    portanto, o mesmo pool de conexões HTTPS com o endpoint do Spaces.
+    Quem chama deve verificar as credenciais antes.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = boto3.client(
+                    's3',
+                    endpoint_url=settings.DO_SPACES_ENDPOINT,
+                    aws_access_key_id=settings.DO_SPACES_KEY,
+                    aws_secret_access_key=settings.DO_SPACES_SECRET,
+                    config=Config(
+                        signature_version='s3v4',
+                        region_name=settings.DO_SPACES_REGION,
+                        s3={'addressing_style': 'path'},
+                        # Pool >= partes em paralelo: conexões HTTPS reaproveitadas
+                        # entre as partes do multipart, sem novo handshake TLS
+                        max_pool_connections=max(32, settings.S3_MULTIPART_CONCURRENCY),
+                        tcp_keepalive=True,
+                        retries={'max_attempts': 5, 'mode': 'adaptive'}
+                    )
+                )
+    return _client
@@ -1,11 +1,12 @@
 """Processador de análise de vídeo."""
+import asyncio
 import uuid
 import json
 from pathlib import Path
 from datetime import datetime
 from typing import Optional, Any
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, func
 import logging
 import numpy as np
 
@@ -28,6 +29,19 @@ from app.database import AsyncSessionLocal
 
 logger = logging.getLogger(__name__)
 
+# Campos copiados dos metadados para o relatório: (chave no relatório, chave nos metadados)
+_META_KEYS = (
+    ("codec", "codec_name"),
+    ("encoder", "encoder"),
+    ("major_brand", "major_brand"),
+    ("compatible_brands", "compatible_brands"),
+    ("duration", "duration"),
+    ("bit_rate", "bit_rate"),
+    ("frame_rate", "r_frame_rate"),
+    ("width", "width"),
+    ("height", "height"),
+)
+
 
 class AnalysisProcessor:
     """Processa análises de vídeo."""
@@ -44,7 +58,13 @@ class AnalysisProcessor:
         4. Classificação
         5. Geração de relatório
         6. Geração de vídeo limpo
+        
+        A análise é carregada uma única vez e mantida na sessão (expire_on_commit=False);
+        só é recarregada do banco se a sessão sofrer rollback.
         """
+        analysis = None
+        analysis_uuid = None
+        session_rolled_back = False
         try:
             # Buscar análise
             analysis_uuid = uuid.UUID(analysis_id)
@@ -80,12 +100,11 @@ class AnalysisProcessor:
             analysis.status = AnalysisStatus.analyzing
             analysis.started_at = datetime.utcnow()
             await db.commit()
-            await db.refresh(analysis)
             
             # Enviar webhook de início
             if analysis.webhook_url:
                 try:
-                    await WebhookService.send_webhook(
+                    WebhookService.send_webhook_background(
                         webhook_url=analysis.webhook_url,
                         event="analysis.started",
                         analysis_id=analysis_id,
@@ -97,7 +116,7 @@ class AnalysisProcessor:
             # 1. Extração de metadados
             logger.info(f"[{analysis_id}] ===== INICIANDO ETAPA: metadata_extraction =====")
             await AnalysisProcessor._update_step(
-                analysis_id, StepName.metadata_extraction, StepStatus.running, 0, db
+                analysis_uuid, StepName.metadata_extraction, StepStatus.running, 0, db
             )
             
             # Enviar webhook de início da etapa
@@ -108,7 +127,8 @@ class AnalysisProcessor:
                         analysis_id=analysis_id,
                         step_name=StepName.metadata_extraction,
                         is_starting=True,
-                        db=db
+                        db=db,
+                        background=True
                     )
                 except Exception as e:
                     logger.error(f"[{analysis_id}] Erro ao enviar webhook de início: {e}")
@@ -128,9 +148,8 @@ class AnalysisProcessor:
             await db.commit()
             
             await AnalysisProcessor._update_step(
-                analysis_id, StepName.metadata_extraction, StepStatus.completed, 100, db
+                analysis_uuid, StepName.metadata_extraction, StepStatus.completed, 100, db
             )
-            await db.refresh(analysis)
             
             # Enviar webhook de conclusão da etapa
             if analysis.webhook_url:
@@ -141,102 +160,76 @@ class AnalysisProcessor:
                         step_name=StepName.metadata_extraction,
                         is_starting=False,
                         db=db,
-                        step_result={"metadata": metadata}
+                        step_result={"metadata": metadata},
+                        background=True
                     )
                 except Exception as e:
                     logger.error(f"[{analysis_id}] Erro ao enviar webhook de conclusão: {e}")
             
             logger.info(f"[{analysis_id}] ===== ETAPA CONCLUÍDA: metadata_extraction =====")
             
-            # 2. Análise PRNU
-            logger.info(f"[{analysis_id}] ===== INICIANDO ETAPA: prnu =====")
-            await AnalysisProcessor._update_step(
-                analysis_id, StepName.prnu, StepStatus.running, 0, db
-            )
-            
-            # Enviar webhook de início da etapa
-            if analysis.webhook_url:
-                try:
-                    await WebhookService.send_step_update(
-                        webhook_url=analysis.webhook_url,
-                        analysis_id=analysis_id,
-                        step_name=StepName.prnu,
-                        is_starting=True,
-                        db=db
-                    )
-                except Exception as e:
-                    logger.error(f"[{analysis_id}] Erro ao enviar webhook de início: {e}")
+            # 2-3. Análises PRNU e FFT em paralelo: ambas só leem o vídeo e são
+            # independentes; rodam em threads (NumPy/OpenCV liberam o GIL)
+            for step_name in (StepName.prnu, StepName.fft):
+                logger.info(f"[{analysis_id}] ===== INICIANDO ETAPA: {step_name.value} =====")
+                await AnalysisProcessor._update_step(
+                    analysis_uuid, step_name, StepStatus.running, 0, db
+                )
+                
+                # Enviar webhook de início da etapa
+                if analysis.webhook_url:
+                    try:
+                        await WebhookService.send_step_update(
+                            webhook_url=analysis.webhook_url,
+                            analysis_id=analysis_id,
+                            step_name=step_name,
+                            is_starting=True,
+                            db=db,
+                            background=True
+                        )
+                    except Exception as e:
+                        logger.error(f"[{analysis_id}] Erro ao enviar webhook de início: {e}")
             
-            logger.info(f"[{analysis_id}] Analisando PRNU (ruído do sensor)...")
+            logger.info(f"[{analysis_id}] Analisando PRNU (ruído do sensor) e FFT temporal...")
             baseline_profile = None  # TODO: Carregar baseline se disponível
-            prnu_analysis = detect_prnu(str(video_path), baseline_profile)
-            prnu_frame_analysis = prnu_analysis.get("frame_analysis", [])
-            
-            await AnalysisProcessor._update_step(
-                analysis_id, StepName.prnu, StepStatus.completed, 100, db
-            )
-            await db.refresh(analysis)
-            
-            # Enviar webhook de conclusão da etapa
-            if analysis.webhook_url:
-                try:
-                    await WebhookService.send_step_update(
-                        webhook_url=analysis.webhook_url,
-                        analysis_id=analysis_id,
-                        step_name=StepName.prnu,
-                        is_starting=False,
-                        db=db,
-                        step_result=prnu_analysis
-                    )
-                except Exception as e:
-                    logger.error(f"[{analysis_id}] Erro ao enviar webhook de conclusão: {e}")
-            
-            logger.info(f"[{analysis_id}] ===== ETAPA CONCLUÍDA: prnu =====")
-            
-            # 3. Análise FFT
-            logger.info(f"[{analysis_id}] ===== INICIANDO ETAPA: fft =====")
-            await AnalysisProcessor._update_step(
-                analysis_id, StepName.fft, StepStatus.running, 0, db
+            prnu_task = asyncio.ensure_future(
+                asyncio.to_thread(detect_prnu, str(video_path), baseline_profile)
             )
-            
-            # Enviar webhook de início da etapa
-            if analysis.webhook_url:
-                try:
-                    await WebhookService.send_step_update(
-                        webhook_url=analysis.webhook_url,
-                        analysis_id=analysis_id,
-                        step_name=StepName.fft,
-                        is_starting=True,
-                        db=db
-                    )
-                except Exception as e:
-                    logger.error(f"[{analysis_id}] Erro ao enviar webhook de início: {e}")
-            
-            logger.info(f"[{analysis_id}] Analisando FFT temporal...")
-            fft_analysis = detect_diffusion_signature(str(video_path))
-            jitter_analysis = analyze_temporal_jitter(str(video_path))
-            fft_analysis["jitter_analysis"] = jitter_analysis
-            
-            await AnalysisProcessor._update_step(
-                analysis_id, StepName.fft, StepStatus.completed, 100, db
+            fft_task = asyncio.ensure_future(
+                asyncio.to_thread(AnalysisProcessor._analyze_fft, str(video_path))
             )
-            await db.refresh(analysis)
             
-            # Enviar webhook de conclusão da etapa
-            if analysis.webhook_url:
-                try:
-                    await WebhookService.send_step_update(
-                        webhook_url=analysis.webhook_url,
-                        analysis_id=analysis_id,
-                        step_name=StepName.fft,
-                        is_starting=False,
-                        db=db,
-                        step_result=fft_analysis
+            # Se uma das análises falhar, aguardar a outra antes de propagar o erro,
+            # para não deixar a thread órfã nem a exceção sem ser recuperada
+            try:
+                for step_name, task in ((StepName.prnu, prnu_task), (StepName.fft, fft_task)):
+                    step_result = await task
+                    await AnalysisProcessor._update_step(
+                        analysis_uuid, step_name, StepStatus.completed, 100, db
                     )
-                except Exception as e:
-                    logger.error(f"[{analysis_id}] Erro ao enviar webhook de conclusão: {e}")
+                
+                    # Enviar webhook de conclusão da etapa
+                    if analysis.webhook_url:
+                        try:
+                            await WebhookService.send_step_update(
+                                webhook_url=analysis.webhook_url,
+                                analysis_id=analysis_id,
+                                step_name=step_name,
+                                is_starting=False,
+                                db=db,
+                                step_result=step_result,
+                                background=True
+                            )
+                        except Exception as e:
+                            logger.error(f"[{analysis_id}] Erro ao enviar webhook de conclusão: {e}")
+                
+                    logger.info(f"[{analysis_id}] ===== ETAPA CONCLUÍDA: {step_name.value} =====")
+            finally:
+                await asyncio.gather(prnu_task, fft_task, return_exceptions=True)
             
-            logger.info(f"[{analysis_id}] ===== ETAPA CONCLUÍDA: fft =====")
+            prnu_analysis = prnu_task.result()
+            prnu_frame_analysis = prnu_analysis.get("frame_analysis", [])
+            fft_analysis = fft_task.result()
             
             # 4. Integridade de metadados
             metadata_integrity = analyze_metadata_integrity(metadata)
@@ -262,7 +255,7 @@ class AnalysisProcessor:
             # 7. Classificação final
             logger.info(f"[{analysis_id}] ===== INICIANDO ETAPA: classification =====")
             await AnalysisProcessor._update_step(
-                analysis_id, StepName.classification, StepStatus.running, 0, db
+                analysis_uuid, StepName.classification, StepStatus.running, 0, db
             )
             
             # Enviar webhook de início da etapa
@@ -273,7 +266,8 @@ class AnalysisProcessor:
                         analysis_id=analysis_id,
                         step_name=StepName.classification,
                         is_starting=True,
-                        db=db
+                        db=db,
+                        background=True
                     )
                 except Exception as e:
                     logger.error(f"[{analysis_id}] Erro ao enviar webhook de início: {e}")
@@ -293,9 +287,8 @@ class AnalysisProcessor:
             await db.commit()
             
             await AnalysisProcessor._update_step(
-                analysis_id, StepName.classification, StepStatus.completed, 100, db
+                analysis_uuid, StepName.classification, StepStatus.completed, 100, db
             )
-            await db.refresh(analysis)
             
             # Enviar webhook de conclusão da etapa
             if analysis.webhook_url:
@@ -306,7 +299,8 @@ class AnalysisProcessor:
                         step_name=StepName.classification,
                         is_starting=False,
                         db=db,
-                        step_result=classification
+                        step_result=classification,
+                        background=True
                     )
                 except Exception as e:
                     logger.error(f"[{analysis_id}] Erro ao enviar webhook de conclusão: {e}")
@@ -321,7 +315,7 @@ class AnalysisProcessor:
             if analysis.webhook_url:
                 try:
                     stats = await WebhookService._collect_step_statistics(analysis_id, db)
-                    await WebhookService.send_webhook(
+                    WebhookService.send_webhook_background(
                         webhook_url=analysis.webhook_url,
                         event="analysis.step.started",
                         analysis_id=analysis_id,
@@ -395,16 +389,6 @@ class AnalysisProcessor:
                 logger.info(f"[{analysis_id}] Adicionando report_file ao banco: {report_file_id}")
                 db.add(report_file)
                 
-                # Buscar análise novamente para garantir que está na sessão atual
-                logger.info(f"[{analysis_id}] Buscando análise novamente na sessão atual...")
-                result = await db.execute(
-                    select(Analysis).where(Analysis.id == analysis_uuid)
-                )
-                analysis = result.scalar_one_or_none()
-                
-                if not analysis:
-                    raise ValueError(f"Análise não encontrada após buscar novamente: {analysis_id}")
-                
                 logger.info(f"[{analysis_id}] Setando report_file_id na análise: {report_file_id}")
                 analysis.report_file_id = report_file_id
                 
@@ -415,27 +399,10 @@ class AnalysisProcessor:
                 except Exception as commit_error:
                     logger.error(f"[{analysis_id}] ❌ ERRO no commit: {commit_error}", exc_info=True)
                     await db.rollback()
+                    session_rolled_back = True
                     raise
                 
-                logger.info(f"[{analysis_id}] Fazendo refresh da análise...")
-                await db.refresh(analysis)
-                
-                # Verificar se commit realmente funcionou
-                if analysis.report_file_id != report_file_id:
-                    logger.error(f"[{analysis_id}] ⚠️ ATENÇÃO: report_file_id não foi salvo após refresh! Esperado: {report_file_id}, Atual: {analysis.report_file_id}")
-                    # Tentar buscar novamente e atualizar
-                    result = await db.execute(
-                        select(Analysis).where(Analysis.id == analysis_uuid)
-                    )
-                    analysis = result.scalar_one_or_none()
-                    if analysis and not analysis.report_file_id:
-                        logger.info(f"[{analysis_id}] Tentando corrigir: atualizando report_file_id novamente...")
-                        analysis.report_file_id = report_file_id
-                        await db.commit()
-                        await db.refresh(analysis)
-                        logger.info(f"[{analysis_id}] Após correção: report_file_id = {analysis.report_file_id}")
-                
-                logger.info(f"[{analysis_id}] Refresh concluído. report_file_id na análise: {analysis.report_file_id}")
+                logger.info(f"[{analysis_id}] report_file_id na análise: {analysis.report_file_id}")
                 
                 # Upload para CDN se configurado
                 if settings.UPLOAD_TO_CDN and storage_service.s3_client:
@@ -482,7 +449,7 @@ class AnalysisProcessor:
                             cdn_url = report_file_updated.cdn_url
                         
                         stats = await WebhookService._collect_step_statistics(analysis_id, db)
-                        await WebhookService.send_webhook(
+                        WebhookService.send_webhook_background(
                             webhook_url=analysis.webhook_url,
                             event="analysis.step.completed",
                             analysis_id=analysis_id,
@@ -522,6 +489,10 @@ class AnalysisProcessor:
                 logger.info(f"[{analysis_id}] ===== ETAPA CONCLUÍDA: report_generation =====")
             except Exception as report_error:
                 logger.error(f"[{analysis_id}] Erro ao salvar relatório: {report_error}", exc_info=True)
+                if session_rolled_back:
+                    # Rollback expira os objetos da sessão: recarregar análise
+                    await db.refresh(analysis)
+                    session_rolled_back = False
                 logger.warning(f"[{analysis_id}] ===== ETAPA FALHOU: report_generation (continuando análise) =====")
                 # Não falhar análise completa por causa do relatório, apenas logar erro
                 # Continuar processamento mesmo se relatório falhar
@@ -529,7 +500,7 @@ class AnalysisProcessor:
             # 9. Gerar vídeo limpo (opcional, não bloqueia análise se falhar)
             logger.info(f"[{analysis_id}] ===== INICIANDO ETAPA: cleaning =====")
             await AnalysisProcessor._update_step(
-                analysis_id, StepName.cleaning, StepStatus.running, 0, db
+                analysis_uuid, StepName.cleaning, StepStatus.running, 0, db
             )
             
             # Enviar webhook de início da etapa
@@ -540,7 +511,8 @@ class AnalysisProcessor:
                         analysis_id=analysis_id,
                         step_name=StepName.cleaning,
                         is_starting=True,
-                        db=db
+                        db=db,
+                        background=True
                     )
                 except Exception as e:
                     logger.error(f"[{analysis_id}] Erro ao enviar webhook de início: {e}")
@@ -553,9 +525,8 @@ class AnalysisProcessor:
             if not ffmpeg_available:
                 logger.warning(f"[{analysis_id}] FFmpeg não disponível, pulando geração de vídeo limpo")
                 await AnalysisProcessor._update_step(
-                    analysis_id, StepName.cleaning, StepStatus.completed, 100, db
+                    analysis_uuid, StepName.cleaning, StepStatus.completed, 100, db
                 )
-                await db.refresh(analysis)
                 
                 # Enviar webhook de conclusão da etapa (pulada)
                 if analysis.webhook_url:
@@ -566,7 +537,8 @@ class AnalysisProcessor:
                             step_name=StepName.cleaning,
                             is_starting=False,
                             db=db,
-                            step_result={"skipped": True, "reason": "FFmpeg não disponível"}
+                            step_result={"skipped": True, "reason": "FFmpeg não disponível"},
+                            background=True
                         )
                     except Exception as e:
                         logger.error(f"[{analysis_id}] Erro ao enviar webhook de conclusão: {e}")
@@ -591,6 +563,26 @@ class AnalysisProcessor:
                     clean_result = None
                 
                 if clean_result and Path(clean_result).exists():
+                    clean_path = Path(clean_result)
+                    
+                    # Iniciar upload para CDN imediatamente, em paralelo às escritas no banco
+                    upload_task = None
+                    if settings.UPLOAD_TO_CDN and storage_service.s3_client:
+                        logger.info(f"[{analysis_id}] Fazendo upload do vídeo limpo para CDN...")
+                        key = storage_service.generate_key(
+                            str(analysis_id),
+                            "clean_video",
+                            clean_filename
+                        )
+                        upload_task = asyncio.create_task(
+                            storage_service.upload_file_async(
+                                clean_path,
+                                key,
+                                content_type=original_file.mime_type,
+                                analysis_id=str(analysis_id)
+                            )
+                        )
+                    
                     try:
                         clean_file_id = uuid.uuid4()
                         clean_file = File(
@@ -600,9 +592,9 @@ class AnalysisProcessor:
                             original_filename=clean_filename,
                             stored_filename=clean_filename,
                             file_path=str(clean_result),
-                            file_size=Path(clean_result).stat().st_size,
+                            file_size=clean_path.stat().st_size,
                             mime_type=original_file.mime_type,
-                            checksum=FileService.calculate_checksum(Path(clean_result))
+                            checksum=await asyncio.to_thread(FileService.calculate_checksum, clean_path)
                         )
                         logger.info(f"[{analysis_id}] Adicionando clean_file ao banco: {clean_file_id}")
                         db.add(clean_file)
@@ -611,51 +603,32 @@ class AnalysisProcessor:
                         await db.flush()
                         logger.info(f"[{analysis_id}] Flush concluído, clean_file inserido no banco")
                         
-                        # Buscar análise novamente para garantir que está na sessão atual
-                        logger.info(f"[{analysis_id}] Buscando análise novamente na sessão atual...")
-                        result = await db.execute(
-                            select(Analysis).where(Analysis.id == analysis_uuid)
-                        )
-                        analysis = result.scalar_one_or_none()
-                        
-                        if not analysis:
-                            raise ValueError(f"Análise não encontrada após buscar novamente: {analysis_id}")
-                        
                         logger.info(f"[{analysis_id}] Setando clean_video_id na análise: {clean_file_id}")
                         analysis.clean_video_id = clean_file_id
                         
-                        logger.info(f"[{analysis_id}] Fazendo commit do vídeo limpo...")
-                        try:
-                            await db.commit()
-                            logger.info(f"[{analysis_id}] Commit concluído com sucesso")
-                        except Exception as commit_error:
-                            logger.error(f"[{analysis_id}] ❌ ERRO no commit: {commit_error}", exc_info=True)
-                            await db.rollback()
-                            raise
-                        
-                        await db.refresh(analysis)
-                        logger.info(f"[{analysis_id}] Vídeo limpo salvo: {clean_file_id}")
-                        
-                        # Upload para CDN se configurado
-                        if settings.UPLOAD_TO_CDN and storage_service.s3_client:
+                        # Sem CDN, o vídeo limpo é gravado no mesmo commit da conclusão da etapa
+                        if upload_task:
+                            # Persistir antes de aguardar a transferência para não manter
+                            # a transação aberta durante o upload
+                            logger.info(f"[{analysis_id}] Fazendo commit do vídeo limpo...")
                             try:
-                                logger.info(f"[{analysis_id}] Fazendo upload do vídeo limpo para CDN...")
-                                key = storage_service.generate_key(
-                                    str(analysis_id),
-                                    "clean_video",
-                                    clean_filename
-                                )
-                                cdn_url = storage_service.upload_file(
-                                    Path(clean_result),
-                                    key,
-                                    content_type=original_file.mime_type,
-                                    analysis_id=str(analysis_id)
-                                )
+                                await db.commit()
+                                logger.info(f"[{analysis_id}] Commit concluído com sucesso")
+                            except Exception as commit_error:
+                                logger.error(f"[{analysis_id}] ❌ ERRO no commit: {commit_error}", exc_info=True)
+                                await db.rollback()
+                                session_rolled_back = True
+                                raise
+                            
+                            logger.info(f"[{analysis_id}] Vídeo limpo salvo: {clean_file_id}")
+                            
+                            # Aguardar upload para CDN iniciado acima; a URL é gravada
+                            # junto com a conclusão da etapa
+                            try:
+                                cdn_url = await upload_task
                                 if cdn_url:
                                     clean_file.cdn_url = cdn_url
                                     clean_file.cdn_uploaded = True
-                                    await db.commit()
-                                    await db.refresh(clean_file)
                                     logger.info(f"[{analysis_id}] ✅ Vídeo limpo enviado para CDN: {cdn_url}")
                                 else:
                                     logger.warning(f"[{analysis_id}] ⚠️ Falha ao fazer upload do vídeo limpo para CDN")
@@ -667,16 +640,36 @@ class AnalysisProcessor:
                         # Fazer rollback para limpar a sessão
                         try:
                             await db.rollback()
+                            session_rolled_back = True
                             logger.info(f"[{analysis_id}] Rollback executado após erro ao salvar vídeo limpo")
                         except Exception as rollback_error:
                             logger.error(f"[{analysis_id}] Erro ao fazer rollback: {rollback_error}", exc_info=True)
+                        # Não deixar o upload órfão: aguardar término mesmo sem registro no banco
+                        if upload_task and not upload_task.done():
+                            await asyncio.gather(upload_task, return_exceptions=True)
                         # Continuar mesmo se falhar ao salvar no banco - análise pode ser concluída sem vídeo limpo
                         logger.warning(f"[{analysis_id}] Continuando análise sem vídeo limpo devido ao erro")
                 
+                # Conclusão da etapa + escritas pendentes do vídeo limpo em um único commit
                 await AnalysisProcessor._update_step(
-                    analysis_id, StepName.cleaning, StepStatus.completed, 100, db
+                    analysis_uuid, StepName.cleaning, StepStatus.completed, 100, db,
+                    commit=False
                 )
-                await db.refresh(analysis)
+                try:
+                    await db.commit()
+                except Exception as commit_error:
+                    logger.error(f"[{analysis_id}] ❌ Erro ao gravar vídeo limpo com a conclusão da etapa: {commit_error}", exc_info=True)
+                    await db.rollback()
+                    session_rolled_back = True
+                    # Gravar só a conclusão da etapa, sem o registro do vídeo limpo
+                    await AnalysisProcessor._update_step(
+                        analysis_uuid, StepName.cleaning, StepStatus.completed, 100, db
+                    )
+                    logger.warning(f"[{analysis_id}] Continuando análise sem vídeo limpo devido ao erro")
+                if session_rolled_back:
+                    # Rollback ao salvar o vídeo limpo expirou a análise: recarregar
+                    await db.refresh(analysis)
+                    session_rolled_back = False
                 
                 # Enviar webhook de conclusão da etapa
                 if analysis.webhook_url:
@@ -701,7 +694,8 @@ class AnalysisProcessor:
                             step_name=StepName.cleaning,
                             is_starting=False,
                             db=db,
-                            step_result=clean_result_data if clean_result_data else None
+                            step_result=clean_result_data if clean_result_data else None,
+                            background=True
                         )
                     except Exception as e:
                         logger.error(f"[{analysis_id}] Erro ao enviar webhook de conclusão: {e}")
@@ -711,36 +705,32 @@ class AnalysisProcessor:
             # Finalizar análise
             logger.info(f"[{analysis_id}] ===== FINALIZANDO ANÁLISE =====")
             
-            # Buscar análise novamente para garantir que está na sessão atual
+            # UPDATE ... RETURNING: grava o status final e lê os campos necessários
+            # na mesma ida ao banco (dispensa refresh, mesmo após rollback)
             result = await db.execute(
-                select(Analysis).where(Analysis.id == analysis_uuid)
+                update(Analysis)
+                .where(Analysis.id == analysis_uuid)
+                .values(status=AnalysisStatus.completed, completed_at=datetime.utcnow())
+                .returning(Analysis.report_file_id, Analysis.clean_video_id, Analysis.webhook_url)
+                .execution_options(synchronize_session=False)
             )
-            analysis = result.scalar_one_or_none()
-            
-            if not analysis:
-                raise ValueError(f"Análise não encontrada ao finalizar: {analysis_id}")
-            
-            logger.info(f"[{analysis_id}] Status atual: {analysis.status}")
-            logger.info(f"[{analysis_id}] report_file_id atual: {analysis.report_file_id}")
-            
-            analysis.status = AnalysisStatus.completed
-            analysis.completed_at = datetime.utcnow()
+            final_row = result.one()
             await db.commit()
-            await db.refresh(analysis)
+            session_rolled_back = False
             
-            logger.info(f"[{analysis_id}] Após finalizar - report_file_id: {analysis.report_file_id}")
+            logger.info(f"[{analysis_id}] Após finalizar - report_file_id: {final_row.report_file_id}")
             
             logger.info(f"[{analysis_id}] ✅✅✅ ANÁLISE CONCLUÍDA COM SUCESSO! ✅✅✅")
             logger.info(f"[{analysis_id}] - Classificação: {final_classification}")
             logger.info(f"[{analysis_id}] - Confiança: {confidence:.2%}")
-            logger.info(f"[{analysis_id}] - Relatório: {'Sim' if analysis.report_file_id else 'Não'}")
-            logger.info(f"[{analysis_id}] - Vídeo limpo: {'Sim' if analysis.clean_video_id else 'Não'}")
+            logger.info(f"[{analysis_id}] - Relatório: {'Sim' if final_row.report_file_id else 'Não'}")
+            logger.info(f"[{analysis_id}] - Vídeo limpo: {'Sim' if final_row.clean_video_id else 'Não'}")
             
             # Enviar webhook de conclusão
-            if analysis.webhook_url:
+            if final_row.webhook_url:
                 try:
-                    await WebhookService.send_webhook(
-                        webhook_url=analysis.webhook_url,
+                    WebhookService.send_webhook_background(
+                        webhook_url=final_row.webhook_url,
                         event="analysis.completed",
                         analysis_id=analysis_id,
                         data={
@@ -757,22 +747,23 @@ class AnalysisProcessor:
             
             # Marcar como falha
             try:
-                # Buscar análise novamente para garantir que está na sessão atual
-                result = await db.execute(
-                    select(Analysis).where(Analysis.id == uuid.UUID(analysis_id))
-                )
-                analysis = result.scalar_one_or_none()
+                # Reaproveitar a análise já carregada; só buscar novamente se
+                # ela ainda não foi carregada ou se a sessão sofreu rollback
+                if analysis_uuid is not None and (analysis is None or session_rolled_back):
+                    result = await db.execute(
+                        select(Analysis).where(Analysis.id == analysis_uuid)
+                    )
+                    analysis = result.scalar_one_or_none()
                 
                 if analysis:
                     analysis.status = AnalysisStatus.failed
                     analysis.error_message = str(e)
                     await db.commit()
-                    await db.refresh(analysis)
                 
                 # Enviar webhook de falha
-                if analysis.webhook_url:
+                if analysis and analysis.webhook_url:
                     try:
-                        await WebhookService.send_webhook(
+                        WebhookService.send_webhook_background(
                             webhook_url=analysis.webhook_url,
                             event="analysis.failed",
                             analysis_id=analysis_id,
@@ -782,33 +773,56 @@ class AnalysisProcessor:
                         pass
             except:
                 pass
+        
+        finally:
+            # Webhooks saem em background; garantir que todos sejam entregues
+            await WebhookService.flush_pending(analysis_id)
     
     @staticmethod
     async def _update_step(
-        analysis_id: str,
+        analysis_id: uuid.UUID,
         step_name: StepName,
         status: StepStatus,
         progress: int,
-        db: AsyncSession
+        db: AsyncSession,
+        commit: bool = True
     ):
-        """Atualiza status de um step."""
-        analysis_uuid = uuid.UUID(analysis_id)
-        result = await db.execute(
-            select(AnalysisStep)
-            .where(AnalysisStep.analysis_id == analysis_uuid)
+        """
+        Atualiza status de um step.
+        
+        Executa um único UPDATE (sem SELECT prévio); os timestamps são
+        definidos no próprio SQL: started_at só é preenchido se ainda for nulo.
+        Recebe o UUID já convertido por process_analysis.
+        
+        Só altera a linha de AnalysisStep, nunca a Analysis: quem chama não
+        precisa (nem deve) fazer refresh da análise depois. Com commit=False
+        o UPDATE fica na transação corrente, para ser gravado junto com
+        outras escritas pendentes.
+        """
+        now = datetime.utcnow()
+        values = {"status": status, "progress": progress}
+        if status == StepStatus.running:
+            values["started_at"] = func.coalesce(AnalysisStep.started_at, now)
+        if status == StepStatus.completed:
+            values["completed_at"] = now
+        
+        await db.execute(
+            update(AnalysisStep)
+            .where(AnalysisStep.analysis_id == analysis_id)
             .where(AnalysisStep.step_name == step_name)
+            .values(**values)
+            .execution_options(synchronize_session="fetch")
         )
-        step = result.scalar_one_or_none()
-        
-        if step:
-            step.status = status
-            step.progress = progress
-            if status == StepStatus.running and not step.started_at:
-                step.started_at = datetime.utcnow()
-            if status == StepStatus.completed:
-                step.completed_at = datetime.utcnow()
+        if commit:
             await db.commit()
     
+    @staticmethod
+    def _analyze_fft(video_path: str) -> dict:
+        """Executa a análise FFT temporal, incluindo o jitter temporal."""
+        fft_analysis = detect_diffusion_signature(video_path)
+        fft_analysis["jitter_analysis"] = analyze_temporal_jitter(video_path)
+        return fft_analysis
+    
     @staticmethod
     def _create_report(
         video_path: str,
@@ -822,26 +836,28 @@ class AnalysisProcessor:
         tool_signatures: list
     ) -> dict:
         """Cria relatório forense completo."""
-        return {
+        report = {
             "file": Path(video_path).name,
             "file_path": video_path,
-            "codec": metadata.get("codec_name"),
-            "encoder": metadata.get("encoder"),
-            "major_brand": metadata.get("major_brand"),
-            "compatible_brands": metadata.get("compatible_brands", []),
-            "duration": metadata.get("duration"),
-            "bit_rate": metadata.get("bit_rate"),
-            "frame_rate": metadata.get("r_frame_rate"),
-            "width": metadata.get("width"),
-            "height": metadata.get("height"),
+        }
+        # Uma única passada pelos metadados
+        report.update({key: metadata.get(meta_key) for key, meta_key in _META_KEYS})
+        if "compatible_brands" not in metadata:
+            report["compatible_brands"] = []
+        
+        confidence = classification.get("confidence")
+        model_probabilities = classification.get("model_probabilities", {})
+        report.update({
             "gop_estimate": fingerprint.get("gop_analysis", {}).get("gop_size"),
             "qp_pattern": fingerprint.get("qp_analysis", {}).get("pattern"),
             "classification": classification.get("classification"),
-            "confidence": classification.get("confidence"),
-            "confidence_level": AnalysisProcessor._get_confidence_level(classification.get("confidence", 0.0)),
+            "confidence": confidence,
+            "confidence_level": AnalysisProcessor._get_confidence_level(
+                classification.get("confidence", 0.0)
+            ),
             "reason": classification.get("reason"),
-            "most_likely_model": classification.get("model_probabilities", {}),
-            "model_probabilities": classification.get("model_probabilities", {}),
+            "most_likely_model": model_probabilities,
+            "model_probabilities": model_probabilities,
             "prnu_analysis": prnu_analysis,
             "fft_analysis": fft_analysis,
             "metadata_integrity": metadata_integrity,
@@ -850,7 +866,8 @@ class AnalysisProcessor:
             "timeline_summary": timeline_analysis.get("summary", {}),
             "tool_signatures": tool_signatures,
             "fingerprint": fingerprint
-        }
+        })
+        return report
     
     @staticmethod
     def _convert_to_serializable(obj: Any) -> Any:
@@ -1,4 +1,6 @@
 """Serviço de orquestração de análise."""
+import asyncio
+import time
 import uuid
 from pathlib import Path
 from datetime import datetime
@@ -6,7 +8,8 @@ from typing import Optional
 import mimetypes
 import logging
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, insert
+from app.database import AsyncSessionLocal
 from app.models.analysis import Analysis, AnalysisStatus
 from app.models.file import File, FileType
 from app.models.analysis_step import AnalysisStep, StepName, StepStatus
@@ -19,6 +22,20 @@ from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Mapeamento extensão -> MIME type dos formatos de vídeo aceitos
+_MIME_MAP = {
+    '.mp4': 'video/mp4',
+    '.mov': 'video/quicktime',
+    '.avi': 'video/x-msvideo',
+    '.mkv': 'video/x-matroska',
+    '.webm': 'video/webm'
+}
+
+# Cache da verificação de workers Celery (inspect.active() faz RPC a todos os workers)
+_CELERY_CHECK_TTL = 30.0
+_celery_available_until = 0.0
+_celery_workers_active = False
+
 
 class AnalysisService:
     """Serviço para gerenciar análises."""
@@ -36,16 +53,22 @@ class AnalysisService:
             ID da análise criada
         """
         # Obter status do upload
-        upload_status = UploadService.get_upload_status(upload_id)
+        upload_status = await asyncio.to_thread(UploadService.get_upload_status, upload_id)
         if not upload_status or not upload_status["is_complete"]:
             raise ValueError("Upload incompleto")
         
         # Gerar ID da análise (usado também para estruturar o caminho do arquivo)
         analysis_id = uuid.uuid4()
         
-        # Finalizar upload e montar arquivo físico
+        # Finalizar upload e montar arquivo físico, fora do event loop. O
+        # checksum é calculado durante a montagem: os bytes passam uma única
+        # vez pela memória, sem reler o arquivo montado
         output_dir = FileService.generate_storage_path(str(analysis_id), FileType.original)
-        file_path, checksum = UploadService.complete_upload(upload_id, output_dir)
+        file_path, checksum = await asyncio.to_thread(
+            UploadService.complete_upload,
+            upload_id,
+            output_dir
+        )
         
         # Detectar MIME type e tamanho a partir dos metadados do upload
         mime_type = upload_status.get("mime_type")
@@ -55,6 +78,9 @@ class AnalysisService:
             mime_type = "video/mp4"
         file_size = upload_status.get("file_size") or FileService.get_file_size(file_path)
         
+        # O upload para CDN não acontece aqui: é feito em background por
+        # start_processing_background, fora do caminho da requisição
+        
         # 1) Criar e persistir o registro do arquivo antes da análise
         original_file = File(
             id=uuid.uuid4(),
@@ -98,55 +124,38 @@ class AnalysisService:
             )
         )
         
-        # 3) Criar etapas iniciais e vincular arquivo à análise
-        steps = [
-            AnalysisStep(
-                id=uuid.uuid4(),
-                analysis_id=analysis_id,
-                step_name=StepName.upload,
-                status=StepStatus.completed,
-                progress=100,
-                started_at=datetime.utcnow(),
-                completed_at=datetime.utcnow()
-            ),
-            AnalysisStep(
-                id=uuid.uuid4(),
-                analysis_id=analysis_id,
-                step_name=StepName.metadata_extraction,
-                status=StepStatus.pending,
-                progress=0
-            ),
-            AnalysisStep(
-                id=uuid.uuid4(),
-                analysis_id=analysis_id,
-                step_name=StepName.prnu,
-                status=StepStatus.pending,
-                progress=0
-            ),
-            AnalysisStep(
-                id=uuid.uuid4(),
-                analysis_id=analysis_id,
-                step_name=StepName.fft,
-                status=StepStatus.pending,
-                progress=0
-            ),
-            AnalysisStep(
-                id=uuid.uuid4(),
-                analysis_id=analysis_id,
-                step_name=StepName.classification,
-                status=StepStatus.pending,
-                progress=0
-            ),
-            AnalysisStep(
-                id=uuid.uuid4(),
-                analysis_id=analysis_id,
-                step_name=StepName.cleaning,
-                status=StepStatus.pending,
-                progress=0
-            )
+        # 3) Criar etapas iniciais (um único INSERT em lote) e vincular arquivo à análise
+        now = datetime.utcnow()
+        step_rows = [
+            {
+                "id": uuid.uuid4(),
+                "analysis_id": analysis_id,
+                "step_name": StepName.upload,
+                "status": StepStatus.completed,
+                "progress": 100,
+                "started_at": now,
+                "completed_at": now
+            }
         ]
-        for step in steps:
-            db.add(step)
+        step_rows.extend(
+            {
+                "id": uuid.uuid4(),
+                "analysis_id": analysis_id,
+                "step_name": step_name,
+                "status": StepStatus.pending,
+                "progress": 0,
+                "started_at": None,
+                "completed_at": None
+            }
+            for step_name in (
+                StepName.metadata_extraction,
+                StepName.prnu,
+                StepName.fft,
+                StepName.classification,
+                StepName.cleaning
+            )
+        )
+        await db.execute(insert(AnalysisStep), step_rows)
         
         # Atualizar vínculo do arquivo com a análise
         original_file.analysis_id = analysis.id
@@ -154,44 +163,6 @@ class AnalysisService:
         
         await db.commit()
         
-        # Upload para CDN se configurado
-        if settings.UPLOAD_TO_CDN and storage_service.s3_client:
-            try:
-                file_path_obj = Path(file_path)
-                if file_path_obj.exists():
-                    key = storage_service.generate_key(
-                        str(analysis_id),
-                        "original",
-                        original_file.stored_filename
-                    )
-                    cdn_url = storage_service.upload_file(
-                        file_path_obj,
-                        key,
-                        content_type=original_file.mime_type,
-                        analysis_id=str(analysis_id)
-                    )
-                    if cdn_url:
-                        original_file.cdn_url = cdn_url
-                        original_file.cdn_uploaded = True
-                        await db.commit()
-                        await db.refresh(original_file)
-                        logger.info(
-                            format_log_with_context(
-                                "ANALYSIS",
-                                f"Arquivo original enviado para CDN: url={cdn_url}",
-                                analysis_id=str(analysis_id)
-                            )
-                        )
-            except Exception as e:
-                logger.error(
-                    format_log_with_context(
-                        "ANALYSIS",
-                        f"Erro ao fazer upload para CDN: {str(e)}",
-                        analysis_id=str(analysis_id)
-                    ),
-                    exc_info=True
-                )
-        
         # Enviar webhook de upload completo
         if webhook_url:
             try:
@@ -202,7 +173,7 @@ class AnalysisService:
                     data={
                         "status": "pending",
                         "file_size": original_file.file_size,
-                        "cdn_url": original_file.cdn_url if original_file.cdn_uploaded else None
+                        "cdn_url": None  # enviada depois em analysis.original.cdn_uploaded
                     }
                 )
             except Exception as e:
@@ -212,6 +183,107 @@ class AnalysisService:
         # Isso garante que a sessão do banco está commitada antes de iniciar processamento
         return analysis_id
     
+    @staticmethod
+    async def _upload_original_to_cdn(
+        file_path: Path,
+        mime_type: str,
+        analysis_id: uuid.UUID
+    ) -> Optional[str]:
+        """Envia o arquivo original para a CDN. Retorna a URL ou None se falhar."""
+        try:
+            key = storage_service.generate_key(
+                str(analysis_id),
+                "original",
+                file_path.name
+            )
+            cdn_url = await storage_service.upload_file_async(
+                file_path,
+                key,
+                content_type=mime_type,
+                analysis_id=str(analysis_id)
+            )
+            if cdn_url:
+                logger.info(
+                    format_log_with_context(
+                        "ANALYSIS",
+                        f"Arquivo original enviado para CDN: url={cdn_url}",
+                        analysis_id=str(analysis_id)
+                    )
+                )
+            return cdn_url
+        except Exception as e:
+            logger.error(
+                format_log_with_context(
+                    "ANALYSIS",
+                    f"Erro ao fazer upload para CDN: {str(e)}",
+                    analysis_id=str(analysis_id)
+                ),
+                exc_info=True
+            )
+            return None
+    
+    @staticmethod
+    async def _upload_original_background(analysis_id: str) -> None:
+        """
+        Envia o arquivo original para a CDN fora do caminho da requisição.
+        
+        Usa sessões curtas antes e depois do envio (nenhuma conexão ou
+        transação fica presa durante a transferência) e grava a URL com um
+        UPDATE direto. Arquivos já
+        enviados (ex.: reprocessamento) são ignorados. Com webhook_url, avisa
+        a URL da CDN pelo evento analysis.original.cdn_uploaded, já que
+        analysis.upload.completed sai antes do envio terminar.
+        """
+        if not (settings.UPLOAD_TO_CDN and storage_service.s3_client):
+            return
+        
+        analysis_uuid = uuid.UUID(analysis_id)
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(File.id, File.file_path, File.mime_type, Analysis.webhook_url)
+                    .join(Analysis, Analysis.original_file_id == File.id)
+                    .where(Analysis.id == analysis_uuid)
+                    .where(File.cdn_uploaded.is_(False))
+                )
+                row = result.one_or_none()
+            if row is None:
+                return
+            
+            # Transferência sem sessão aberta: pode levar minutos em arquivos grandes
+            cdn_url = await AnalysisService._upload_original_to_cdn(
+                Path(row.file_path),
+                row.mime_type,
+                analysis_uuid
+            )
+            if not cdn_url:
+                return
+            
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(File)
+                    .where(File.id == row.id)
+                    .values(cdn_url=cdn_url, cdn_uploaded=True)
+                )
+                await db.commit()
+            
+            if row.webhook_url:
+                await WebhookService.send_webhook(
+                    webhook_url=row.webhook_url,
+                    event="analysis.original.cdn_uploaded",
+                    analysis_id=analysis_id,
+                    data={"cdn_url": cdn_url}
+                )
+        except Exception as e:
+            logger.error(
+                format_log_with_context(
+                    "ANALYSIS",
+                    f"Erro ao registrar upload do original na CDN: {str(e)}",
+                    analysis_id=analysis_id
+                ),
+                exc_info=True
+            )
+    
     @staticmethod
     async def start_processing_background(analysis_id: str):
         """
@@ -221,26 +293,38 @@ class AnalysisService:
         Cria sua própria sessão de banco de dados.
         """
         from app.services.analysis_processor import AnalysisProcessor
-        from app.database import AsyncSessionLocal
         
         logger.info(f"[{analysis_id}] ========================================")
         logger.info(f"[{analysis_id}] INICIANDO PROCESSAMENTO EM BACKGROUND")
         logger.info(f"[{analysis_id}] ========================================")
         
+        global _celery_available_until, _celery_workers_active
+        
+        # Upload do original para CDN em paralelo com o processamento
+        cdn_task = asyncio.create_task(
+            AnalysisService._upload_original_background(str(analysis_id))
+        )
+        
         # Tentar Celery primeiro (apenas se worker estiver rodando)
-        use_celery = False
         try:
             from app.tasks.analysis_tasks import process_analysis
             from celery import current_app
             
-            # Verificar se há workers ativos
-            inspect = current_app.control.inspect()
-            active_workers = inspect.active()
+            # Verificar se há workers ativos (resultado reutilizado por _CELERY_CHECK_TTL segundos)
+            now = time.monotonic()
+            if now < _celery_available_until:
+                active_workers = _celery_workers_active
+            else:
+                inspect = current_app.control.inspect()
+                active_workers = bool(inspect.active())
+                _celery_workers_active = active_workers
+                _celery_available_until = now + _CELERY_CHECK_TTL
             
             if active_workers:
                 # Há workers ativos, usar Celery
                 process_analysis.delay(str(analysis_id))
                 logger.info(f"✅ Task Celery iniciada para análise {analysis_id}")
+                await cdn_task
                 return
             else:
                 logger.info(f"⚠️  Celery disponível mas sem workers ativos, usando processamento direto")
@@ -269,6 +353,7 @@ class AnalysisService:
                 except Exception as db_error:
                     logger.error(f"Erro ao salvar falha no banco: {db_error}")
         
+        await cdn_task
         return analysis_id
     
     @staticmethod
@@ -291,9 +376,6 @@ class AnalysisService:
             db: Sessão do banco de dados
             mime_type: Tipo MIME do arquivo (opcional, será detectado se não fornecido)
         """
-        import mimetypes
-        from pathlib import Path
-        
         file_size = len(file_content)
         
         # Validar tamanho
@@ -308,17 +390,7 @@ class AnalysisService:
         
         # Detectar MIME type se não fornecido
         if not mime_type:
-            mime_type, _ = mimetypes.guess_type(filename)
-            if not mime_type or not mime_type.startswith('video/'):
-                ext = Path(filename).suffix.lower()
-                mime_map = {
-                    '.mp4': 'video/mp4',
-                    '.mov': 'video/quicktime',
-                    '.avi': 'video/x-msvideo',
-                    '.mkv': 'video/x-matroska',
-                    '.webm': 'video/webm'
-                }
-                mime_type = mime_map.get(ext, 'video/mp4')
+            mime_type = _MIME_MAP.get(Path(filename).suffix.lower(), 'video/mp4')
         
         logger.info(
             format_log_with_context(
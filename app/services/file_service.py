@@ -1,11 +1,12 @@
 """Serviço de gerenciamento de arquivos."""
+import os
 import uuid
-import hashlib
 from pathlib import Path
 from datetime import datetime
 from typing import Optional
 from app.config import settings
 from app.models.file import FileType
+from app.utils.checksum import file_checksum
 
 
 class FileService:
@@ -54,14 +55,10 @@ class FileService:
     
     @staticmethod
     def calculate_checksum(file_path: Path) -> str:
-        """Calcula SHA256 do arquivo."""
-        sha256 = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                sha256.update(chunk)
-        return sha256.hexdigest()
+        """Calcula o checksum do arquivo (SHA256 ou BLAKE3, conforme CHECKSUM_ALGO)."""
+        return file_checksum(file_path)
     
     @staticmethod
     def get_file_size(file_path: Path) -> int:
         """Obtém tamanho do arquivo."""
-        return file_path.stat().st_size
+        return os.path.getsize(file_path)
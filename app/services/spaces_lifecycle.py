@@ -1,9 +1,8 @@
 """Configuração de lifecycle policy para DigitalOcean Spaces."""
-import boto3
 from botocore.exceptions import ClientError
 from app.config import settings
+from app.services._s3 import get_s3_client
 import logging
-import json
 
 logger = logging.getLogger(__name__)
 
@@ -13,27 +12,17 @@ class SpacesLifecycleService:
     
     def __init__(self):
         """Inicializa cliente S3 para DigitalOcean Spaces."""
-        if not all([
-            settings.DO_SPACES_ENDPOINT,
-            settings.DO_SPACES_KEY,
-            settings.DO_SPACES_SECRET,
-            settings.DO_SPACES_BUCKET
-        ]):
+        if not (
+            settings.DO_SPACES_ENDPOINT
+            and settings.DO_SPACES_KEY
+            and settings.DO_SPACES_SECRET
+            and settings.DO_SPACES_BUCKET
+        ):
             self.s3_client = None
             logger.warning("DigitalOcean Spaces não configurado")
             return
         
-        self.s3_client = boto3.client(
-            's3',
-            endpoint_url=settings.DO_SPACES_ENDPOINT,
-            aws_access_key_id=settings.DO_SPACES_KEY,
-            aws_secret_access_key=settings.DO_SPACES_SECRET,
-            config=boto3.session.Config(
-                signature_version='s3v4',
-                region_name=settings.DO_SPACES_REGION,
-                s3={'addressing_style': 'path'}
-            )
-        )
+        self.s3_client = get_s3_client()
         self.bucket = settings.DO_SPACES_BUCKET
     
     def setup_lifecycle_policy(self, expiration_days: int = 7):
@@ -64,6 +53,18 @@ class SpacesLifecycleService:
             ]
         }
         
+        # Evitar PUT (e uma ida ao S3) se a regra já estiver configurada
+        current_rules = self.get_lifecycle_policy() or []
+        for rule in current_rules:
+            if (
+                rule.get('ID') == 'vid-finger-auto-delete'
+                and rule.get('Status') == 'Enabled'
+                and rule.get('Filter', {}).get('Prefix') == f'{prefix}/'
+                and rule.get('Expiration', {}).get('Days') == expiration_days
+            ):
+                logger.info(f"Lifecycle policy já configurada: arquivos em '{prefix}/' expiram após {expiration_days} dias")
+                return True
+        
         try:
             self.s3_client.put_bucket_lifecycle_configuration(
                 Bucket=self.bucket,
@@ -91,6 +92,6 @@ class SpacesLifecycleService:
             return None
 
 
-# Instância global
+# Instância global: use sempre lifecycle_service em vez de criar SpacesLifecycleService()
 lifecycle_service = SpacesLifecycleService()
 
@@ -1,26 +1,51 @@
 """Serviço de armazenamento em CDN (DigitalOcean Spaces)."""
-import boto3
-from botocore.config import Config
+import asyncio
+import os
+import threading
+from boto3.s3.transfer import TransferConfig
 from pathlib import Path
 from typing import Optional
 from app.config import settings
 import logging
 from app.utils.context import format_log_with_context
+from app.services._s3 import get_s3_client
 
 logger = logging.getLogger(__name__)
 
+# Arquivos até este tamanho vão em um único put_object (multipart, o
+# TransferManager e suas threads só adicionam overhead)
+SINGLE_PUT_MAX_SIZE = 16 * 1024 * 1024
+# Limites das partes no multipart: mínimo do S3 (5MB), alinhamento e margem
+# abaixo do limite de 10.000 partes do S3
+MIN_PART_SIZE = 5 * 1024 * 1024
+PART_SIZE_ALIGNMENT = 4 * 1024 * 1024
+MAX_PARTS = 9500
+
 
 class StorageService:
     """Serviço para upload em DigitalOcean Spaces."""
     
     def __init__(self):
         """Inicializa cliente S3 para DigitalOcean Spaces."""
-        if not all([
-            settings.DO_SPACES_ENDPOINT,
-            settings.DO_SPACES_KEY,
-            settings.DO_SPACES_SECRET,
-            settings.DO_SPACES_BUCKET
-        ]):
+        # Multipart paralelo para vídeos grandes: partes grandes enviadas por
+        # várias conexões simultâneas em vez de um único PUT sequencial
+        self._transfer_config = TransferConfig(
+            multipart_threshold=settings.S3_MULTIPART_PART_SIZE,
+            multipart_chunksize=settings.S3_MULTIPART_PART_SIZE,
+            max_concurrency=settings.S3_MULTIPART_CONCURRENCY,
+            io_chunksize=1024 * 1024,
+            use_threads=True
+        )
+        # Valores fixos durante a vida do serviço: resolvidos uma vez aqui
+        self._key_prefix = f"{settings.OUTPUT_PREFIX}/analyses"
+        self._url_prefix = None
+        
+        if not (
+            settings.DO_SPACES_ENDPOINT
+            and settings.DO_SPACES_KEY
+            and settings.DO_SPACES_SECRET
+            and settings.DO_SPACES_BUCKET
+        ):
             self.s3_client = None
             logger.warning(
                 format_log_with_context(
@@ -38,18 +63,9 @@ class StorageService:
         )
         
         try:
-            self.s3_client = boto3.client(
-                's3',
-                endpoint_url=settings.DO_SPACES_ENDPOINT,
-                aws_access_key_id=settings.DO_SPACES_KEY,
-                aws_secret_access_key=settings.DO_SPACES_SECRET,
-                config=Config(
-                    signature_version='s3v4',
-                    region_name=settings.DO_SPACES_REGION,
-                    s3={'addressing_style': 'path'}
-                )
-            )
+            self.s3_client = get_s3_client()
             self.bucket = settings.DO_SPACES_BUCKET
+            self._url_prefix = f"{settings.DO_SPACES_ENDPOINT}/{self.bucket}"
             
             logger.info(
                 format_log_with_context(
@@ -67,6 +83,35 @@ class StorageService:
                 exc_info=True
             )
     
+    def _choose_transfer_config(self, file_size: int) -> TransferConfig:
+        """
+        Escolhe a configuração do multipart pelo tamanho do arquivo.
+        
+        Só usada acima de SINGLE_PUT_MAX_SIZE (abaixo, upload_file faz um único
+        put_object). A parte é S3_MULTIPART_PART_SIZE, reduzido para arquivos
+        médios (de modo que as partes ainda sejam distribuídas entre as
+        conexões) e ajustado só para os limites do S3: no mínimo 5MB e grande
+        o bastante para ficar abaixo de MAX_PARTS.
+        """
+        def align(size: int) -> int:
+            return -(-size // PART_SIZE_ALIGNMENT) * PART_SIZE_ALIGNMENT
+        
+        concurrency = self._transfer_config.max_concurrency
+        part_size = max(
+            MIN_PART_SIZE,
+            align(-(-file_size // MAX_PARTS)),
+            min(self._transfer_config.multipart_chunksize, align(-(-file_size // concurrency)))
+        )
+        if part_size == self._transfer_config.multipart_chunksize:
+            return self._transfer_config
+        return TransferConfig(
+            multipart_threshold=SINGLE_PUT_MAX_SIZE,
+            multipart_chunksize=part_size,
+            max_concurrency=concurrency,
+            io_chunksize=self._transfer_config.io_chunksize,
+            use_threads=True
+        )
+    
     def upload_file(
         self,
         file_path: Path,
@@ -96,8 +141,18 @@ class StorageService:
             )
             return None
         
-        # Obter tamanho do arquivo
-        file_size = file_path.stat().st_size if file_path.exists() else 0
+        # Obter tamanho do arquivo (um único stat; reaproveitado na escolha do modo de envio)
+        try:
+            file_size = os.stat(file_path).st_size
+        except OSError as e:
+            logger.error(
+                format_log_with_context(
+                    "STORAGE",
+                    f"Arquivo não disponível para upload: file_path={file_path}, error={str(e)}",
+                    analysis_id=analysis_id
+                )
+            )
+            return None
         
         logger.info(
             format_log_with_context(
@@ -112,9 +167,23 @@ class StorageService:
             if content_type:
                 extra_args['ContentType'] = content_type
             
-            # Callback para progresso (se arquivo for grande)
-            def upload_progress(bytes_transferred):
-                if file_size > 0:
+            # Callback para progresso: só registrado com DEBUG ativo e
+            # limitado a um log a cada 5% do arquivo
+            upload_progress = None
+            if logger.isEnabledFor(logging.DEBUG) and file_size > 0:
+                log_step = max(file_size // 20, 1)
+                progress_state = {"transferred": 0, "next_log": log_step}
+                progress_lock = threading.Lock()
+                
+                def upload_progress(bytes_amount):
+                    # boto3 informa o incremento desde a última chamada, a partir
+                    # de várias threads, e não o total transferido
+                    with progress_lock:
+                        progress_state["transferred"] += bytes_amount
+                        bytes_transferred = progress_state["transferred"]
+                        if bytes_transferred < progress_state["next_log"]:
+                            return
+                        progress_state["next_log"] = bytes_transferred + log_step
                     progress = (bytes_transferred / file_size) * 100
                     logger.debug(
                         format_log_with_context(
@@ -124,25 +193,37 @@ class StorageService:
                         )
                     )
             
-            # Upload com multipart para arquivos grandes
-            logger.debug(
-                format_log_with_context(
-                    "STORAGE",
-                    f"Executando upload_file: bucket={self.bucket}, key={key}",
-                    analysis_id=analysis_id
+            # Upload com multipart paralelo para arquivos grandes
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    format_log_with_context(
+                        "STORAGE",
+                        f"Executando upload_file: bucket={self.bucket}, key={key}",
+                        analysis_id=analysis_id
+                    )
                 )
-            )
             
-            self.s3_client.upload_file(
-                str(file_path),
-                self.bucket,
-                key,
-                ExtraArgs=extra_args,
-                Callback=upload_progress if file_size > 5 * 1024 * 1024 else None  # Só callback para arquivos > 5MB
-            )
+            if file_size <= SINGLE_PUT_MAX_SIZE:
+                # Arquivo pequeno (ex: relatório JSON): uma única requisição
+                with open(file_path, "rb") as body:
+                    self.s3_client.put_object(
+                        Bucket=self.bucket,
+                        Key=key,
+                        Body=body,
+                        **extra_args
+                    )
+            else:
+                self.s3_client.upload_file(
+                    str(file_path),
+                    self.bucket,
+                    key,
+                    ExtraArgs=extra_args,
+                    Callback=upload_progress,
+                    Config=self._choose_transfer_config(file_size)
+                )
             
             # Gerar URL pública
-            url = f"{settings.DO_SPACES_ENDPOINT}/{self.bucket}/{key}"
+            url = f"{self._url_prefix}/{key}"
             
             logger.info(
                 format_log_with_context(
@@ -167,12 +248,32 @@ class StorageService:
             )
             return None
     
+    async def upload_file_async(
+        self,
+        file_path: Path,
+        key: str,
+        content_type: Optional[str] = None,
+        analysis_id: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Versão awaitable de upload_file.
+        
+        O upload do boto3 é bloqueante; executá-lo em thread libera o event loop
+        e permite sobrepor o envio com outras operações (ex: cálculo de checksum).
+        """
+        return await asyncio.to_thread(
+            self.upload_file,
+            file_path,
+            key,
+            content_type,
+            analysis_id
+        )
+    
     def generate_key(self, analysis_id: str, file_type: str, filename: str) -> str:
         """Gera chave S3 para arquivo."""
-        prefix = settings.OUTPUT_PREFIX
-        return f"{prefix}/analyses/{analysis_id}/{file_type}/{filename}"
+        return f"{self._key_prefix}/{analysis_id}/{file_type}/{filename}"
 
 
-# Instância global
+# Instância global: use sempre storage_service em vez de criar StorageService()
 storage_service = StorageService()
 
@@ -1,16 +1,42 @@
 """Serviço de gerenciamento de uploads."""
 import uuid
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Union
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.utils.chunked_upload import ChunkedUploadManager
-from app.utils.validators import validate_file_type, validate_file_size, sanitize_filename
+from app.utils.chunked_upload import ChunkedUploadManager, DirectChunkedUploadManager, iter_bulk_frames
+from app.utils.validators import validate_upload, sanitize_filename
 from app.utils.context import format_log_with_context
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Threads de escrita dos chunks em upload_file_direct
+DIRECT_UPLOAD_WRITERS = 4
+
+# Máximo de chunks em um único POST de envio em lote
+MAX_BULK_CHUNKS = 16
+
+
+def _count_chunks(file_size: int, chunk_size: int) -> int:
+    """
+    Número de chunks (divisão com arredondamento para cima).
+    
+    Com CHUNK_SIZE potência de dois usa deslocamento de bits. O expoente é
+    derivado a cada chamada, pois settings.CHUNK_SIZE pode mudar em runtime.
+    """
+    if chunk_size & (chunk_size - 1) == 0:
+        return (file_size + chunk_size - 1) >> (chunk_size.bit_length() - 1)
+    return (file_size + chunk_size - 1) // chunk_size
+
+
+def _new_manager(upload_id: str) -> ChunkedUploadManager:
+    """Cria o gerenciador de um novo upload conforme UPLOAD_DIRECT_WRITE."""
+    if settings.UPLOAD_DIRECT_WRITE:
+        return DirectChunkedUploadManager(upload_id)
+    return ChunkedUploadManager(upload_id)
+
 
 class UploadService:
     """Serviço para gerenciar uploads."""
@@ -31,31 +57,21 @@ class UploadService:
         Returns:
             (upload_id, chunk_size, total_chunks)
         """
-        logger.debug(
-            format_log_with_context(
-                "UPLOAD_SERVICE",
-                f"Inicializando upload: filename={filename}, size={file_size}, mime_type={mime_type}"
-            )
-        )
-        
-        # Validar tipo de arquivo
-        is_valid, error = validate_file_type(filename, mime_type)
-        if not is_valid:
-            logger.warning(
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
                 format_log_with_context(
                     "UPLOAD_SERVICE",
-                    f"Validação de tipo falhou: {error}"
+                    f"Inicializando upload: filename={filename}, size={file_size}, mime_type={mime_type}"
                 )
             )
-            raise ValueError(error)
         
-        # Validar tamanho
-        is_valid, error = validate_file_size(file_size, settings.MAX_FILE_SIZE)
-        if not is_valid:
+        # Validar tipo e tamanho; o nome sanitizado fica salvo para a montagem
+        stored_filename, error = validate_upload(filename, file_size, mime_type, settings.MAX_FILE_SIZE)
+        if error:
             logger.warning(
                 format_log_with_context(
                     "UPLOAD_SERVICE",
-                    f"Validação de tamanho falhou: {error}"
+                    f"Validação do upload falhou: {error}"
                 )
             )
             raise ValueError(error)
@@ -65,7 +81,7 @@ class UploadService:
         
         # Calcular chunks
         chunk_size = settings.CHUNK_SIZE
-        total_chunks = (file_size + chunk_size - 1) // chunk_size
+        total_chunks = _count_chunks(file_size, chunk_size)
         
         logger.info(
             format_log_with_context(
@@ -76,21 +92,22 @@ class UploadService:
         )
         
         # Inicializar manager
-        manager = ChunkedUploadManager(upload_id)
-        manager.init_upload(filename, file_size, total_chunks, mime_type)
+        manager = _new_manager(upload_id)
+        manager.init_upload(filename, file_size, total_chunks, mime_type, stored_filename)
         
-        logger.debug(
-            format_log_with_context(
-                "UPLOAD_SERVICE",
-                f"Upload inicializado: upload_id={upload_id}",
-                upload_id=upload_id
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                format_log_with_context(
+                    "UPLOAD_SERVICE",
+                    f"Upload inicializado: upload_id={upload_id}",
+                    upload_id=upload_id
+                )
             )
-        )
         
         return upload_id, chunk_size, total_chunks
     
     @staticmethod
-    def save_chunk(upload_id: str, chunk_number: int, chunk_data: bytes) -> Tuple[int, float]:
+    def save_chunk(upload_id: str, chunk_number: int, chunk_data: Union[bytes, memoryview]) -> Tuple[int, float]:
         """
         Salva chunk individual.
         
@@ -98,13 +115,14 @@ class UploadService:
             (chunks_received, progress)
         """
         chunk_size = len(chunk_data)
-        logger.debug(
-            format_log_with_context(
-                "UPLOAD_SERVICE",
-                f"Recebendo chunk: upload_id={upload_id}, chunk_number={chunk_number}, size={chunk_size}",
-                upload_id=upload_id
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                format_log_with_context(
+                    "UPLOAD_SERVICE",
+                    f"Recebendo chunk: upload_id={upload_id}, chunk_number={chunk_number}, size={chunk_size}",
+                    upload_id=upload_id
+                )
             )
-        )
         
         manager = ChunkedUploadManager.load_upload(upload_id)
         if not manager:
@@ -118,7 +136,7 @@ class UploadService:
             raise ValueError(f"Upload não encontrado: {upload_id}")
         
         # Validar número do chunk
-        if manager.total_chunks and chunk_number >= manager.total_chunks:
+        if chunk_number < 0 or (manager.total_chunks and chunk_number >= manager.total_chunks):
             logger.warning(
                 format_log_with_context(
                     "UPLOAD_SERVICE",
@@ -154,10 +172,80 @@ class UploadService:
         return chunks_received, progress
     
     @staticmethod
-    def complete_upload(upload_id: str, output_dir: Path) -> Tuple[Path, str]:
+    def save_chunks_bulk(upload_id: str, body: Union[bytes, memoryview]) -> Tuple[int, float]:
+        """
+        Salva vários chunks enviados em um único corpo (ver iter_bulk_frames).
+        
+        Todos os frames são validados antes de gravar qualquer chunk.
+        
+        Returns:
+            (chunks_received, progress)
+        """
+        manager = ChunkedUploadManager.load_upload(upload_id)
+        if not manager:
+            logger.error(
+                format_log_with_context(
+                    "UPLOAD_SERVICE",
+                    f"Upload não encontrado: upload_id={upload_id}",
+                    upload_id=upload_id
+                )
+            )
+            raise ValueError(f"Upload não encontrado: {upload_id}")
+        
+        frames = list(iter_bulk_frames(body))
+        if len(frames) > MAX_BULK_CHUNKS:
+            raise ValueError(f"Lote com mais de {MAX_BULK_CHUNKS} chunks")
+        for chunk_number, _ in frames:
+            if chunk_number < 0 or (manager.total_chunks and chunk_number >= manager.total_chunks):
+                logger.warning(
+                    format_log_with_context(
+                        "UPLOAD_SERVICE",
+                        f"Chunk número inválido: chunk_number={chunk_number}, total_chunks={manager.total_chunks}",
+                        upload_id=upload_id
+                    )
+                )
+                raise ValueError(f"Chunk número inválido: {chunk_number}")
+        
+        for chunk_number, chunk_data in frames:
+            if not manager.save_chunk(chunk_number, chunk_data):
+                logger.error(
+                    format_log_with_context(
+                        "UPLOAD_SERVICE",
+                        f"Falha ao salvar chunk: upload_id={upload_id}, chunk_number={chunk_number}",
+                        upload_id=upload_id
+                    )
+                )
+                raise RuntimeError("Falha ao salvar chunk")
+        
+        chunks_received = manager.get_received_chunks()
+        progress = manager.get_progress()
+        
+        logger.info(
+            format_log_with_context(
+                "UPLOAD_SERVICE",
+                f"Lote de {len(frames)} chunks salvo: progresso={progress:.1f}% ({chunks_received}/{manager.total_chunks} chunks)",
+                upload_id=upload_id
+            )
+        )
+        
+        return chunks_received, progress
+    
+    @staticmethod
+    def complete_upload(
+        upload_id: str,
+        output_dir: Path,
+        calculate_checksum: bool = True
+    ) -> Tuple[Path, Optional[str]]:
         """
         Finaliza upload e monta arquivo.
         
+        Args:
+            upload_id: ID do upload
+            output_dir: Diretório de destino do arquivo montado
+            calculate_checksum: Se False, apenas monta o arquivo e retorna
+                checksum None (o chamador calcula depois, ex: em paralelo
+                com o upload para CDN)
+        
         Returns:
             (file_path, checksum)
         """
@@ -195,21 +283,28 @@ class UploadService:
         # Criar diretório de saída
         output_dir.mkdir(parents=True, exist_ok=True)
         
-        # Sanitizar nome do arquivo
-        sanitized_name = sanitize_filename(manager.filename)
+        # Nome sanitizado em init_upload (uploads antigos não o têm salvo)
+        sanitized_name = manager.stored_filename or sanitize_filename(manager.filename)
         output_path = output_dir / sanitized_name
         
-        logger.debug(
-            format_log_with_context(
-                "UPLOAD_SERVICE",
-                f"Montando arquivo: upload_id={upload_id}, output_path={output_path}",
-                upload_id=upload_id
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                format_log_with_context(
+                    "UPLOAD_SERVICE",
+                    f"Montando arquivo: upload_id={upload_id}, output_path={output_path}",
+                    upload_id=upload_id
+                )
             )
-        )
         
         # Montar arquivo
-        checksum = manager.assemble_file(output_path)
-        if not checksum:
+        if calculate_checksum:
+            checksum = manager.assemble_file(output_path)
+            assembled = bool(checksum)
+        else:
+            checksum = None
+            assembled = manager.concatenate_chunks(output_path)
+        
+        if not assembled:
             logger.error(
                 format_log_with_context(
                     "UPLOAD_SERVICE",
@@ -222,7 +317,7 @@ class UploadService:
         logger.info(
             format_log_with_context(
                 "UPLOAD_SERVICE",
-                f"Upload finalizado: upload_id={upload_id}, file_path={output_path}, checksum=sha256:{checksum[:16]}...",
+                f"Upload finalizado: upload_id={upload_id}, file_path={output_path}, checksum={f'{checksum[:23]}...' if checksum else 'pendente'}",
                 upload_id=upload_id
             )
         )
@@ -261,14 +356,9 @@ class UploadService:
         """
         file_size = len(file_content)
         
-        # Validar tipo de arquivo
-        is_valid, error = validate_file_type(filename, mime_type)
-        if not is_valid:
-            raise ValueError(error)
-        
-        # Validar tamanho
-        is_valid, error = validate_file_size(file_size, settings.MAX_FILE_SIZE)
-        if not is_valid:
+        # Validar tipo e tamanho
+        stored_filename, error = validate_upload(filename, file_size, mime_type, settings.MAX_FILE_SIZE)
+        if error:
             raise ValueError(error)
         
         # Gerar upload ID
@@ -276,21 +366,27 @@ class UploadService:
         
         # Calcular chunks
         chunk_size = settings.CHUNK_SIZE
-        total_chunks = (file_size + chunk_size - 1) // chunk_size
+        total_chunks = _count_chunks(file_size, chunk_size)
         
         # Inicializar manager
-        manager = ChunkedUploadManager(upload_id)
-        manager.init_upload(filename, file_size, total_chunks, mime_type)
+        manager = _new_manager(upload_id)
+        manager.init_upload(filename, file_size, total_chunks, mime_type, stored_filename)
         
         # Salvar arquivo em chunks se necessário
         if file_size <= chunk_size:
             # Arquivo cabe em um chunk, salvar diretamente
             manager.save_chunk(0, file_content)
         else:
-            # Arquivo grande - salvar em múltiplos chunks
-            for i in range(0, file_size, chunk_size):
-                chunk_data = file_content[i:i + chunk_size]
-                chunk_number = i // chunk_size
-                manager.save_chunk(chunk_number, chunk_data)
+            # Arquivo grande - salvar em múltiplos chunks.
+            # memoryview: fatias sem cópia do conteúdo já em memória; cada chunk
+            # vai para um arquivo próprio, então as escritas podem se sobrepor
+            buffer = memoryview(file_content)
+            offsets = range(0, file_size, chunk_size)
+            with ThreadPoolExecutor(max_workers=DIRECT_UPLOAD_WRITERS) as executor:
+                list(executor.map(
+                    manager.save_chunk,
+                    (i // chunk_size for i in offsets),
+                    (buffer[i:i + chunk_size] for i in offsets)
+                ))
         
         return upload_id
@@ -1,6 +1,12 @@
 """Serviço de webhooks."""
 import httpx
 import asyncio
+import importlib.util
+import json
+import random
+import time
+import uuid
+from collections import OrderedDict
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -10,17 +16,246 @@ from app.models.analysis import Analysis
 from app.models.analysis_step import AnalysisStep, StepName, StepStatus
 import logging
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson é opcional
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 # Ordem fixa das etapas para cálculo de progresso
-STEP_ORDER = [
+STEP_ORDER = (
     StepName.upload,
     StepName.metadata_extraction,
     StepName.prnu,
     StepName.fft,
     StepName.classification,
     StepName.cleaning,
-]
+)
+STEP_INDEX = {name: i for i, name in enumerate(STEP_ORDER)}
+
+_JSON_HEADERS = {"content-type": "application/json"}
+
+
+def _encode_body(body: Dict[str, Any]) -> bytes:
+    """
+    Serializa o corpo do webhook uma única vez (reaproveitado nas retentativas).
+    
+    Usa orjson quando instalado: mais rápido e aceita tipos NumPy e chaves
+    não-str (ex.: histogramas indexados por int) vindos dos resultados das
+    etapas (PRNU/FFT). O que o orjson recusar cai no json da stdlib, com
+    str() nos valores não serializáveis, em vez de descartar o evento.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                body,
+                option=(
+                    orjson.OPT_SERIALIZE_NUMPY
+                    | orjson.OPT_NON_STR_KEYS
+                    | orjson.OPT_NAIVE_UTC
+                    | orjson.OPT_UTC_Z
+                )
+            )
+        except TypeError:
+            pass
+    return json.dumps(body, default=str).encode("utf-8")
+
+
+# Cliente HTTP compartilhado (keep-alive entre webhooks e tentativas).
+# Um AsyncClient pertence ao event loop em que foi criado: workers Celery
+# criam loops próprios, então o cliente é recriado quando o loop muda.
+_client: Optional[httpx.AsyncClient] = None
+# HTTP/2 (pacote h2, via httpx[http2]): POSTs concorrentes para o mesmo host
+# multiplexados em uma conexão TLS; receptores só HTTP/1.1 negociam via ALPN
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Retorna o cliente HTTP compartilhado do event loop atual."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        if (
+            _client is not None
+            and not _client.is_closed
+            and _client_loop is not None
+            and _client_loop.is_running()
+        ):
+            # Cliente de outro loop ainda ativo: fechar no próprio loop para
+            # liberar o pool de conexões (loop já encerrado levou as conexões)
+            asyncio.run_coroutine_threadsafe(_client.aclose(), _client_loop)
+        _client = httpx.AsyncClient(
+            http2=_HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(settings.WEBHOOK_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=100,
+                max_keepalive_connections=20,
+                keepalive_expiry=300
+            )
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_http_client() -> None:
+    """Fecha o cliente HTTP compartilhado (shutdown da aplicação)."""
+    global _client, _client_loop
+    await _batcher.flush()
+    if _client is not None and _client_loop is asyncio.get_running_loop():
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
+
+# Deduplicação de webhooks de etapa: (analysis_id, etapa, início/fim) -> monotonic
+# do último envio. LRU limitado para não crescer indefinidamente.
+STEP_EVENT_DEDUP_TTL = 2.0
+STEP_EVENT_DEDUP_MAX = 1024
+_recent_step_events: "OrderedDict[tuple, float]" = OrderedDict()
+
+
+def _is_duplicate_step_event(key: tuple) -> bool:
+    """Registra o evento e indica se um idêntico foi enviado há menos de STEP_EVENT_DEDUP_TTL."""
+    now = time.monotonic()
+    last = _recent_step_events.get(key)
+    if last is not None and now - last < STEP_EVENT_DEDUP_TTL:
+        return True
+    _recent_step_events[key] = now
+    _recent_step_events.move_to_end(key)
+    if len(_recent_step_events) > STEP_EVENT_DEDUP_MAX:
+        _recent_step_events.popitem(last=False)
+    return False
+
+
+# Circuit breaker por URL: {"failures": falhas consecutivas, "opened_at": monotonic ou None,
+# "probe_at": monotonic da sondagem meio-aberta em andamento ou None}.
+# Só URLs com falhas recentes ficam aqui; um envio bem-sucedido remove a entrada.
+_circuit_state: Dict[str, Dict[str, Any]] = {}
+
+
+def _circuit_allows(webhook_url: str) -> bool:
+    """Indica se a URL pode receber uma tentativa agora."""
+    state = _circuit_state.get(webhook_url)
+    if state is None or state["opened_at"] is None:
+        return True
+    now = time.monotonic()
+    if now - state["opened_at"] < settings.WEBHOOK_CIRCUIT_COOLDOWN:
+        return False
+    # Meio-aberto: uma única sondagem por vez; as demais falham rápido até
+    # ela terminar. Sondagem sem desfecho por um cooldown inteiro (ex: task
+    # cancelada) é dada como perdida e outra é liberada.
+    probe_at = state["probe_at"]
+    if probe_at is not None and now - probe_at < settings.WEBHOOK_CIRCUIT_COOLDOWN:
+        return False
+    state["probe_at"] = now
+    return True
+
+
+def _circuit_record_failure(webhook_url: str) -> None:
+    state = _circuit_state.setdefault(
+        webhook_url, {"failures": 0, "opened_at": None, "probe_at": None}
+    )
+    state["failures"] += 1
+    if state["probe_at"] is not None:
+        # Sondagem falhou: o circuito reabre por mais um cooldown
+        state["probe_at"] = None
+        state["opened_at"] = time.monotonic()
+        logger.warning(
+            f"Circuito reaberto para webhook {webhook_url}: sondagem falhou, "
+            f"novas tentativas em {settings.WEBHOOK_CIRCUIT_COOLDOWN:.0f}s"
+        )
+    elif state["failures"] >= settings.WEBHOOK_CIRCUIT_THRESHOLD and state["opened_at"] is None:
+        state["opened_at"] = time.monotonic()
+        logger.warning(
+            f"Circuito aberto para webhook {webhook_url}: {state['failures']} falhas consecutivas, "
+            f"novas tentativas em {settings.WEBHOOK_CIRCUIT_COOLDOWN:.0f}s"
+        )
+
+
+class WebhookBatcher:
+    """
+    Agrupa eventos de webhook por URL e os entrega em lotes.
+    
+    Cada URL tem uma fila e uma task de envio, que acumula eventos por até
+    WEBHOOK_BATCH_WINDOW segundos (no máximo WEBHOOK_BATCH_MAX) e faz um único
+    POST com {"deliveries": [...]}. Um evento isolado sai no formato simples.
+    A task termina quando a fila esvazia.
+    """
+    
+    def __init__(self):
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._tasks: set = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def submit(self, webhook_url: str, payload: Dict[str, Any]) -> None:
+        """Enfileira um evento para entrega em lote."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Filas pertencem ao loop em que foram criadas
+            self._queues = {}
+            self._tasks = set()
+            self._loop = loop
+        
+        queue = self._queues.get(webhook_url)
+        if queue is None:
+            queue = asyncio.Queue()
+            self._queues[webhook_url] = queue
+            task = asyncio.create_task(self._drain(webhook_url, queue))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        queue.put_nowait(payload)
+    
+    async def _drain(self, webhook_url: str, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + settings.WEBHOOK_BATCH_WINDOW
+            while len(batch) < settings.WEBHOOK_BATCH_MAX:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                if len(batch) == 1:
+                    await WebhookService._deliver(webhook_url, batch[0], batch[0]["event"])
+                else:
+                    await WebhookService._deliver(
+                        webhook_url,
+                        {"deliveries": batch},
+                        f"lote de {len(batch)} eventos"
+                    )
+            except Exception as e:
+                logger.error(f"Erro ao entregar lote de webhooks: {e}", exc_info=True)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+            
+            if queue.empty():
+                # Sem await entre a verificação e a remoção: nenhum evento se perde
+                if self._queues.get(webhook_url) is queue:
+                    del self._queues[webhook_url]
+                return
+    
+    async def flush(self) -> None:
+        """Aguarda a entrega de todos os eventos enfileirados no loop atual."""
+        if self._loop is not asyncio.get_running_loop():
+            return
+        for queue in list(self._queues.values()):
+            await queue.join()
+
+
+_batcher = WebhookBatcher()
+
+
+# Último webhook enviado em background por análise. Cada envio aguarda o
+# anterior da mesma análise, preservando a ordem dos eventos no receptor.
+_pending_webhooks: Dict[str, asyncio.Task] = {}
 
 
 class WebhookService:
@@ -43,7 +278,8 @@ class WebhookService:
             data: Dados adicionais
             
         Returns:
-            True se sucesso, False caso contrário
+            True se sucesso, False caso contrário. Com WEBHOOK_BATCHING ativo o
+            evento é apenas enfileirado e True é retornado.
         """
         payload = {
             "event": event,
@@ -52,25 +288,96 @@ class WebhookService:
             "data": data or {}
         }
         
+        if settings.WEBHOOK_BATCHING:
+            _batcher.submit(webhook_url, payload)
+            return True
+        
+        return await WebhookService._deliver(
+            webhook_url,
+            payload,
+            f"{event} para {analysis_id}"
+        )
+    
+    @staticmethod
+    async def _deliver(webhook_url: str, body: Dict[str, Any], description: str) -> bool:
+        """Faz o POST do corpo com retentativas (respeitando o circuit breaker da URL)."""
+        try:
+            content = _encode_body(body)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Webhook não enviado (corpo não serializável): {description}: {e}")
+            return False
+        client = get_client()
         for attempt in range(settings.WEBHOOK_RETRY_ATTEMPTS):
+            if not _circuit_allows(webhook_url):
+                logger.warning(f"Webhook não enviado (circuito aberto): {description}")
+                return False
             try:
-                async with httpx.AsyncClient(timeout=settings.WEBHOOK_TIMEOUT) as client:
-                    response = await client.post(
-                        webhook_url,
-                        json=payload
-                    )
-                    response.raise_for_status()
-                    logger.info(f"Webhook enviado com sucesso: {event} para {analysis_id}")
-                    return True
+                response = await client.post(
+                    webhook_url,
+                    content=content,
+                    headers=_JSON_HEADERS
+                )
+                response.raise_for_status()
+                _circuit_state.pop(webhook_url, None)
+                logger.info(f"Webhook enviado com sucesso: {description}")
+                return True
             except Exception as e:
                 logger.warning(f"Tentativa {attempt + 1} de webhook falhou: {e}")
+                _circuit_record_failure(webhook_url)
                 if attempt < settings.WEBHOOK_RETRY_ATTEMPTS - 1:
-                    await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                    # Backoff exponencial com jitter total: tentativas de várias
+                    # análises contra o mesmo receptor não ficam sincronizadas
+                    delay = min(settings.WEBHOOK_BACKOFF_CAP, settings.WEBHOOK_BACKOFF_BASE * (2 ** attempt))
+                    await asyncio.sleep(random.uniform(0, delay))
                 else:
                     logger.error(f"Falha ao enviar webhook após {settings.WEBHOOK_RETRY_ATTEMPTS} tentativas")
         
         return False
     
+    @staticmethod
+    def send_webhook_background(
+        webhook_url: str,
+        event: str,
+        analysis_id: str,
+        data: Optional[Dict[str, Any]] = None
+    ) -> asyncio.Task:
+        """
+        Agenda o envio do webhook sem bloquear quem chama.
+        
+        Os envios de uma mesma análise são encadeados (ordem preservada).
+        Use flush_pending para aguardar os envios antes de encerrar.
+        """
+        previous = _pending_webhooks.get(analysis_id)
+        
+        async def _send() -> bool:
+            if previous is not None:
+                await asyncio.gather(previous, return_exceptions=True)
+            return await WebhookService.send_webhook(
+                webhook_url=webhook_url,
+                event=event,
+                analysis_id=analysis_id,
+                data=data
+            )
+        
+        task = asyncio.create_task(_send())
+        _pending_webhooks[analysis_id] = task
+        
+        def _discard(done: asyncio.Task) -> None:
+            if _pending_webhooks.get(analysis_id) is done:
+                del _pending_webhooks[analysis_id]
+        
+        task.add_done_callback(_discard)
+        return task
+    
+    @staticmethod
+    async def flush_pending(analysis_id: str) -> None:
+        """Aguarda todos os webhooks em background de uma análise."""
+        task = _pending_webhooks.get(analysis_id)
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+        if settings.WEBHOOK_BATCHING:
+            await _batcher.flush()
+    
     @staticmethod
     async def send_step_started(
         webhook_url: str,
@@ -138,14 +445,14 @@ class WebhookService:
         )
     
     @staticmethod
-    def _calculate_step_duration(step: AnalysisStep) -> Optional[float]:
-        """Calcula duração de uma etapa em segundos."""
+    def _calculate_step_duration(step: AnalysisStep, now: Optional[datetime] = None) -> Optional[float]:
+        """Calcula duração de uma etapa em segundos (etapas em andamento: até `now`)."""
         if step.started_at and step.completed_at:
             delta = step.completed_at - step.started_at
             return delta.total_seconds()
         elif step.started_at:
             # Etapa em andamento, calcular até agora
-            delta = datetime.utcnow() - step.started_at
+            delta = (now or datetime.utcnow()) - step.started_at
             return delta.total_seconds()
         return None
     
@@ -153,7 +460,8 @@ class WebhookService:
     def _get_step_result(
         step_name: StepName,
         analysis: Analysis,
-        step_data: Optional[Dict[str, Any]] = None
+        step_data: Optional[Dict[str, Any]] = None,
+        parsed_metadata: Optional[Dict[str, Any]] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Extrai resultados específicos de cada etapa quando disponíveis.
@@ -162,17 +470,17 @@ class WebhookService:
             step_name: Nome da etapa
             analysis: Objeto Analysis com dados da análise
             step_data: Dados adicionais da etapa (ex: metadados, resultados de análise)
+            parsed_metadata: video_metadata já decodificado (evita novo json.loads)
         """
         result = {}
         
         if step_name == StepName.metadata_extraction:
             if analysis.video_metadata:
                 try:
-                    import json
-                    if isinstance(analysis.video_metadata, str):
-                        metadata = json.loads(analysis.video_metadata)
+                    if parsed_metadata is not None:
+                        metadata = parsed_metadata
                     else:
-                        metadata = analysis.video_metadata
+                        metadata = WebhookService._parse_video_metadata(analysis)
                     result = {
                         "metadata_extracted": True,
                         "codec": metadata.get("codec_name"),
@@ -213,6 +521,13 @@ class WebhookService:
         
         return result if result else None
     
+    @staticmethod
+    def _parse_video_metadata(analysis: Analysis) -> Dict[str, Any]:
+        """Decodifica analysis.video_metadata (JSON em texto ou dict)."""
+        if isinstance(analysis.video_metadata, str):
+            return json.loads(analysis.video_metadata)
+        return analysis.video_metadata or {}
+    
     @staticmethod
     async def _collect_step_statistics(
         analysis_id: str,
@@ -226,25 +541,27 @@ class WebhookService:
         Returns:
             Dicionário com estatísticas completas das etapas
         """
-        import uuid
-        
-        # Buscar análise
+        # Buscar análise e etapas em uma única consulta (LEFT JOIN)
         analysis_uuid = uuid.UUID(analysis_id)
         result = await db.execute(
-            select(Analysis).where(Analysis.id == analysis_uuid)
+            select(Analysis, AnalysisStep)
+            .join(AnalysisStep, AnalysisStep.analysis_id == Analysis.id, isouter=True)
+            .where(Analysis.id == analysis_uuid)
+            .order_by(AnalysisStep.started_at)
         )
-        analysis = result.scalar_one_or_none()
+        rows = result.all()
         
-        if not analysis:
+        if not rows:
             return {}
         
-        # Buscar todas as etapas
-        result = await db.execute(
-            select(AnalysisStep)
-            .where(AnalysisStep.analysis_id == analysis_uuid)
-            .order_by(AnalysisStep.started_at)
-        )
-        steps = result.scalars().all()
+        analysis = rows[0][0]
+        steps = [step for _, step in rows if step is not None]
+        
+        # Decodificar metadados uma única vez por coleta
+        try:
+            parsed_metadata = WebhookService._parse_video_metadata(analysis)
+        except Exception:
+            parsed_metadata = None
         
         # Criar dicionário de etapas por nome
         steps_by_name = {step.step_name: step for step in steps}
@@ -254,21 +571,28 @@ class WebhookService:
         pending_steps = []
         current_step_info = None
         total_duration = 0.0
+        # Um único instante de referência para toda a coleta
+        now = datetime.utcnow()
+        # Posição da etapa atual calculada uma vez (-1 quando não há etapa atual)
+        cur_pos = STEP_INDEX.get(current_step_name, -1)
+        has_step_result = step_result is not None
         
-        for step_name in STEP_ORDER:
+        for pos, step_name in enumerate(STEP_ORDER):
             step = steps_by_name.get(step_name)
+            is_current = pos == cur_pos
             
             # Usar step_result se for a etapa atual sendo processada
-            use_step_result = (step_name == current_step_name and step_result is not None)
+            use_step_result = is_current and has_step_result
             
             if step and step.status == StepStatus.completed:
-                duration = WebhookService._calculate_step_duration(step) or 0.0
+                duration = WebhookService._calculate_step_duration(step, now) or 0.0
                 total_duration += duration
                 
                 step_result_data = WebhookService._get_step_result(
                     step_name,
                     analysis,
-                    step_result if use_step_result else None
+                    step_result if use_step_result else None,
+                    parsed_metadata
                 )
                 
                 completed_steps.append({
@@ -280,12 +604,13 @@ class WebhookService:
                     "result": step_result_data
                 })
             elif step and step.status == StepStatus.running:
-                duration = WebhookService._calculate_step_duration(step) or 0.0
+                duration = WebhookService._calculate_step_duration(step, now) or 0.0
                 
                 step_result_data = WebhookService._get_step_result(
                     step_name,
                     analysis,
-                    step_result if use_step_result else None
+                    step_result if use_step_result else None,
+                    parsed_metadata
                 )
                 
                 current_step_info = {
@@ -296,12 +621,12 @@ class WebhookService:
                     "duration_seconds": round(duration, 2),
                     "result": step_result_data
                 }
-            elif step_name == current_step_name and not step:
+            elif is_current and not step:
                 # Etapa atual que ainda não foi criada no banco (pode acontecer no início)
                 current_step_info = {
                     "name": step_name.value,
                     "status": "running",
-                    "started_at": datetime.utcnow().isoformat() + "Z",
+                    "started_at": now.isoformat() + "Z",
                     "completed_at": None,
                     "duration_seconds": 0.0,
                     "result": step_result if use_step_result else None
@@ -353,11 +678,16 @@ class WebhookService:
         step_name: StepName,
         is_starting: bool,
         db: AsyncSession,
-        step_result: Optional[Dict[str, Any]] = None
+        step_result: Optional[Dict[str, Any]] = None,
+        background: bool = False
     ) -> bool:
         """
         Envia webhook detalhado de atualização de etapa.
         
+        As estatísticas são sempre coletadas na hora (a sessão não pode ser
+        compartilhada entre tasks); com background=True apenas o HTTP sai do
+        caminho crítico, via send_webhook_background.
+        
         Args:
             webhook_url: URL do webhook
             analysis_id: ID da análise
@@ -365,7 +695,13 @@ class WebhookService:
             is_starting: True se está iniciando, False se está concluindo
             db: Sessão do banco de dados
             step_result: Dados específicos do resultado da etapa (opcional)
+            background: Se True, agenda o envio e retorna imediatamente
         """
+        # Evento repetido (retentativa/corrida): evita nova consulta e novo POST
+        if _is_duplicate_step_event((str(analysis_id), step_name, is_starting)):
+            logger.debug(f"Webhook de etapa duplicado ignorado: {step_name} ({analysis_id})")
+            return True
+        
         try:
             # Coletar estatísticas
             # Se está concluindo, ainda passamos o step_name para incluir resultados
@@ -380,6 +716,14 @@ class WebhookService:
             event = "analysis.step.started" if is_starting else "analysis.step.completed"
             
             # Enviar webhook
+            if background:
+                WebhookService.send_webhook_background(
+                    webhook_url=webhook_url,
+                    event=event,
+                    analysis_id=analysis_id,
+                    data=stats
+                )
+                return True
             return await WebhookService.send_webhook(
                 webhook_url=webhook_url,
                 event=event,
@@ -1,5 +1,5 @@
 """Tasks Celery para análise."""
-from app.tasks.celery_app import celery_app
+from app.tasks.celery_app import celery_app, run_in_worker_loop
 from app.services.analysis_service import AnalysisService
 from app.services.webhook_service import WebhookService
 from app.core.ffprobe_reader import extract_metadata, estimate_gop_size, estimate_gop_regularity
@@ -23,7 +23,6 @@ def process_analysis(self, analysis_id: str):
     """
     Task principal que orquestra todas as etapas da análise.
     """
-    import asyncio
     from app.services.analysis_processor import AnalysisProcessor
     from app.database import AsyncSessionLocal
     
@@ -32,17 +31,8 @@ def process_analysis(self, analysis_id: str):
         async with AsyncSessionLocal() as db:
             await AnalysisProcessor.process_analysis(analysis_id, db)
     
-    # Executar em novo loop se necessário
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            # Se já há loop rodando, criar task
-            asyncio.create_task(run())
-        else:
-            loop.run_until_complete(run())
-    except RuntimeError:
-        # Criar novo loop
-        asyncio.run(run())
+    # Loop persistente do worker: a task só retorna quando o processamento termina
+    run_in_worker_loop(run())
 
 
 @celery_app.task(name="extract_metadata_task")
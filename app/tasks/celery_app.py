@@ -1,5 +1,10 @@
 """Configuração do Celery."""
+import asyncio
+import os
+import threading
+from typing import Any, Coroutine, Optional
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 from app.config import settings
 
 celery_app = Celery(
@@ -9,9 +14,13 @@ celery_app = Celery(
 )
 
 celery_app.conf.update(
-    task_serializer="json",
-    accept_content=["json"],
-    result_serializer="json",
+    # msgpack: mensagens menores e (de)serialização mais rápida que json;
+    # json segue aceito para tasks enfileiradas antes da troca
+    task_serializer="msgpack",
+    accept_content=["msgpack", "json"],
+    result_serializer="msgpack",
+    # O resultado das tasks não é lido (o estado fica no banco): não gravar no backend
+    task_ignore_result=True,
     timezone="UTC",
     enable_utc=True,
     task_track_started=True,
@@ -21,3 +30,65 @@ celery_app.conf.update(
     worker_max_tasks_per_child=50
 )
 
+# Event loop persistente do processo worker, rodando em thread dedicada.
+# Reaproveitado entre tasks: pool do banco e cliente HTTP dos webhooks
+# (ambos presos ao loop) sobrevivem de uma task para a outra.
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+_worker_loop_pid: Optional[int] = None
+_worker_loop_lock = threading.Lock()
+
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    """
+    Retorna o event loop do processo atual, iniciando-o se necessário.
+    
+    O pid é conferido porque threads não sobrevivem ao fork do pool prefork:
+    cada processo filho precisa do seu próprio loop.
+    """
+    global _worker_loop, _worker_loop_pid
+    pid = os.getpid()
+    if _worker_loop is None or _worker_loop_pid != pid:
+        with _worker_loop_lock:
+            if _worker_loop is None or _worker_loop_pid != pid:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever,
+                    name="celery-asyncio-loop",
+                    daemon=True
+                ).start()
+                _worker_loop, _worker_loop_pid = loop, pid
+    return _worker_loop
+
+
+def run_in_worker_loop(coro: Coroutine[Any, Any, Any]) -> Any:
+    """
+    Executa a coroutine no loop do worker e aguarda o resultado (até task_time_limit).
+    
+    Se a espera for interrompida (timeout ou limite da task), a coroutine é
+    cancelada no loop antes de propagar o erro, para não seguir rodando órfã.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_worker_loop())
+    try:
+        return future.result(timeout=celery_app.conf.task_time_limit)
+    except BaseException:
+        future.cancel()
+        raise
+
+
+@worker_process_init.connect
+def _start_worker_loop(**kwargs):
+    """Inicia o loop assim que o processo worker é criado."""
+    get_worker_loop()
+
+
+@worker_process_shutdown.connect
+def _stop_worker_loop(**kwargs):
+    """Fecha o cliente HTTP compartilhado e encerra o loop do processo."""
+    if _worker_loop is None or _worker_loop_pid != os.getpid():
+        return
+    from app.services.webhook_service import close_http_client
+    try:
+        asyncio.run_coroutine_threadsafe(close_http_client(), _worker_loop).result(timeout=10)
+    except Exception:
+        pass
+    _worker_loop.call_soon_threadsafe(_worker_loop.stop)
@@ -0,0 +1,57 @@
+"""Cálculo de checksums de arquivos."""
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _blake3_module():
+    """Retorna o módulo blake3 se CHECKSUM_ALGO=blake3 e o pacote estiver instalado."""
+    if settings.CHECKSUM_ALGO != "blake3":
+        return None
+    try:
+        import blake3
+        return blake3
+    except ImportError:
+        logger.warning("CHECKSUM_ALGO=blake3, mas o pacote blake3 não está instalado; usando SHA256")
+        return None
+
+
+def new_hasher() -> Any:
+    """
+    Cria o hasher incremental configurado em CHECKSUM_ALGO.
+
+    O resultado deve ser finalizado com format_digest para incluir o
+    identificador do algoritmo quando necessário.
+    """
+    blake3 = _blake3_module()
+    if blake3 is not None:
+        # Árvore de hash com SIMD e várias threads em buffers grandes
+        return blake3.blake3(max_threads=blake3.blake3.AUTO)
+    return hashlib.sha256()
+
+
+def format_digest(hasher: Any) -> str:
+    """
+    Formata o digest de um hasher criado por new_hasher.
+
+    SHA256 continua como hex puro (formato já gravado no banco); BLAKE3 é
+    prefixado com "blake3:" para que verificadores saibam qual algoritmo usar.
+    """
+    if hasher.name == "blake3":
+        return f"blake3:{hasher.hexdigest()}"
+    return hasher.hexdigest()
+
+
+def file_checksum(file_path: Path) -> str:
+    """Calcula o checksum do arquivo com o algoritmo de CHECKSUM_ALGO."""
+    blake3 = _blake3_module()
+    if blake3 is not None:
+        hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+        hasher.update_mmap(str(file_path))
+        return format_digest(hasher)
+    with open(file_path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
@@ -1,14 +1,148 @@
 """Utilitários para upload em chunks."""
 import hashlib
+import json
 import os
 import logging
+import shutil
+import struct
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Iterator, List, Optional, Union
+import numpy as np
 from app.config import settings
-from app.utils.context import format_log_with_context
+from app.utils.checksum import new_hasher, format_digest
+from app.utils.context import get_correlation_id
 
 logger = logging.getLogger(__name__)
 
+# Leituras de chunks mantidas em andamento durante a montagem com hash
+ASSEMBLY_READ_AHEAD = 4
+
+# Envio em lote (POST /upload/chunk_bulk): cada chunk do corpo é um frame
+# <tamanho uint32><chunk_number uint32><dados><blake2b-128 dos dados>
+BULK_CONTENT_TYPE = "application/vid-finger-chunks"
+BULK_FRAME_HEADER = struct.Struct("<II")
+BULK_DIGEST_SIZE = 16
+
+
+def iter_bulk_frames(body: Union[bytes, memoryview]) -> Iterator[tuple]:
+    """
+    Percorre os frames de um corpo de envio em lote.
+    
+    Retorna (chunk_number, dados) com os dados como memoryview (sem cópia).
+    Levanta ValueError em frame truncado, maior que CHUNK_SIZE ou com hash
+    divergente.
+    """
+    view = memoryview(body)
+    offset = 0
+    while offset < len(view):
+        if offset + BULK_FRAME_HEADER.size > len(view):
+            raise ValueError("Frame de chunk truncado")
+        size, chunk_number = BULK_FRAME_HEADER.unpack_from(view, offset)
+        if size > settings.CHUNK_SIZE:
+            raise ValueError(f"Chunk {chunk_number} maior que {settings.CHUNK_SIZE} bytes")
+        start = offset + BULK_FRAME_HEADER.size
+        end = start + size
+        if end + BULK_DIGEST_SIZE > len(view):
+            raise ValueError(f"Frame do chunk {chunk_number} truncado")
+        data = view[start:end]
+        if hashlib.blake2b(data, digest_size=BULK_DIGEST_SIZE).digest() != view[end:end + BULK_DIGEST_SIZE]:
+            raise ValueError(f"Hash do chunk {chunk_number} não confere")
+        yield chunk_number, data
+        offset = end + BULK_DIGEST_SIZE
+
+
+def _read_chunks_ahead(chunk_files: List[Path], depth: int = ASSEMBLY_READ_AHEAD) -> Iterator[bytes]:
+    """
+    Lê os chunks em ordem, mantendo até `depth` leituras em paralelo.
+    
+    Enquanto o chamador processa um chunk (hash + escrita), os próximos já
+    estão sendo lidos do disco; a janela limita a memória a `depth` chunks.
+    """
+    def read(path: Path) -> bytes:
+        with open(path, "rb") as f:
+            _advise_sequential(f.fileno())
+            return f.read()
+    
+    with ThreadPoolExecutor(max_workers=depth) as executor:
+        pending = deque()
+        files = iter(chunk_files)
+        for path in files:
+            pending.append(executor.submit(read, path))
+            if len(pending) >= depth:
+                break
+        while pending:
+            data = pending.popleft().result()
+            next_path = next(files, None)
+            if next_path is not None:
+                pending.append(executor.submit(read, next_path))
+            yield data
+
+
+def _advise_sequential(fd: int):
+    """Indica ao kernel leitura sequencial do arquivo inteiro (read-ahead agressivo)."""
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+
+
+def _preallocate(fd: int, size: Optional[int]):
+    """Reserva size bytes para o arquivo de uma vez (menos atualizações de metadados e extents contíguos)."""
+    if size and hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size)
+        except OSError:
+            # Sistema de arquivos sem suporte (ex: tmpfs antigo, NFS): segue sem reserva
+            pass
+
+
+def _copy_fd(in_fd: int, out_fd: int) -> int:
+    """
+    Copia todo o conteúdo de in_fd para a posição atual de out_fd.
+    
+    Usa copy_file_range (Linux, permite reflink em btrfs/XFS) ou sendfile,
+    com read/write como último recurso. Retorna o número de bytes copiados.
+    """
+    size = os.fstat(in_fd).st_size
+    offset = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while offset < size:
+                n = os.copy_file_range(in_fd, out_fd, size - offset, offset)
+                if n == 0:
+                    break
+                offset += n
+            return offset
+        except OSError:
+            # Ex: sistemas de arquivos distintos em kernels antigos (EXDEV)
+            if offset:
+                raise
+    if hasattr(os, "sendfile"):
+        try:
+            while offset < size:
+                n = os.sendfile(out_fd, in_fd, offset, size - offset)
+                if n == 0:
+                    break
+                offset += n
+            return offset
+        except OSError:
+            if offset:
+                raise
+    while True:
+        data = os.read(in_fd, 1 << 20)
+        if not data:
+            return offset
+        # os.write pode gravar menos que o pedido: repetir até esgotar o bloco
+        view = memoryview(data)
+        while view:
+            n = os.write(out_fd, view)
+            view = view[n:]
+        offset += len(data)
+
 
 class ChunkedUploadManager:
     """Gerenciador de uploads em chunks."""
@@ -18,123 +152,211 @@ class ChunkedUploadManager:
         self.upload_id = upload_id
         self.upload_dir = Path(settings.STORAGE_PATH) / "uploads" / upload_id
         self.upload_dir.mkdir(parents=True, exist_ok=True)
-        self.chunks_received: Dict[int, bool] = {}
+        # Prefixo de log fixo deste upload, montado uma vez (ver _log)
+        self._log_prefix = f"[CHUNKED_UPLOAD] [UPLOAD_ID:{upload_id}]"
+        # Manifesto de chunks recebidos: um byte por chunk (1 = recebido).
+        # Cada chunk grava só o próprio byte, sem ler-modificar-escrever,
+        # então requisições concorrentes do mesmo upload não se sobrescrevem
+        self.manifest_path = self.upload_dir / "manifest.bin"
+        # Bitmap de chunks recebidos (1 bit por chunk) e contagem de bits ligados.
+        # upload_file_direct grava chunks do mesmo manager em várias threads:
+        # o lock protege o ler-modificar-escrever de ambos
+        self.chunks_received = bytearray()
+        self._received_count = 0
+        self._received_lock = threading.Lock()
         self.total_chunks: Optional[int] = None
         self.file_size: Optional[int] = None
         self.filename: Optional[str] = None
+        self.stored_filename: Optional[str] = None
         self.mime_type: Optional[str] = None
     
-    def init_upload(self, filename: str, file_size: int, total_chunks: int, mime_type: Optional[str] = None):
-        """Inicializa upload."""
+    def init_upload(
+        self,
+        filename: str,
+        file_size: int,
+        total_chunks: int,
+        mime_type: Optional[str] = None,
+        stored_filename: Optional[str] = None
+    ):
+        """
+        Inicializa upload.
+        
+        stored_filename é o nome já sanitizado usado ao montar o arquivo final.
+        """
         self.filename = filename
+        self.stored_filename = stored_filename
         self.file_size = file_size
         self.total_chunks = total_chunks
         self.mime_type = mime_type
+        self._reserve_bitmap(total_chunks)
         
-        logger.debug(
-            format_log_with_context(
-                "CHUNKED_UPLOAD",
-                f"Inicializando: upload_id={self.upload_id}, dir={self.upload_dir}, filename={filename}, size={file_size}, chunks={total_chunks}",
-                upload_id=self.upload_id
+        if logger.isEnabledFor(logging.DEBUG):
+            self._log(
+                logging.DEBUG,
+                f"Inicializando: upload_id={self.upload_id}, dir={self.upload_dir}, filename={filename}, size={file_size}, chunks={total_chunks}"
             )
-        )
         
-        # Salvar metadados
+        # Criar manifesto vazio (ausência dele indica upload de versão anterior)
+        self.manifest_path.touch()
+        
+        # Salvar metadados de forma atômica: grava em arquivo temporário e
+        # renomeia, para que load_upload nunca leia um metadata.json parcial
         metadata_file = self.upload_dir / "metadata.json"
-        import json
-        with open(metadata_file, "w") as f:
-            json.dump({
-                "filename": filename,
-                "file_size": file_size,
-                "total_chunks": total_chunks,
-                "mime_type": mime_type
-            }, f)
-        
-        logger.debug(
-            format_log_with_context(
-                "CHUNKED_UPLOAD",
-                f"Metadados salvos: upload_id={self.upload_id}, metadata_file={metadata_file}",
-                upload_id=self.upload_id
+        tmp_file = self.upload_dir / "metadata.json.tmp"
+        payload = json.dumps(self._metadata()).encode("utf-8")
+        with open(tmp_file, "wb") as f:
+            f.write(payload)
+            os.fsync(f.fileno())
+        os.replace(tmp_file, metadata_file)
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            self._log(
+                logging.DEBUG,
+                f"Metadados salvos: upload_id={self.upload_id}, metadata_file={metadata_file}"
             )
-        )
     
-    def save_chunk(self, chunk_number: int, chunk_data: bytes) -> bool:
+    def _metadata(self) -> dict:
+        """Campos persistidos em metadata.json."""
+        return {
+            "filename": self.filename,
+            "file_size": self.file_size,
+            "total_chunks": self.total_chunks,
+            "mime_type": self.mime_type,
+            "stored_filename": self.stored_filename
+        }
+    
+    def _record_chunk(self, chunk_number: int):
+        """Registra o chunk no manifesto (já gravado no disco) e no bitmap."""
+        fd = os.open(self.manifest_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            os.pwrite(fd, b"\x01", chunk_number)
+        finally:
+            os.close(fd)
+        self._mark_received(chunk_number)
+    
+    def _log(self, level: int, message: str, exc_info: bool = False):
+        """
+        Loga com o mesmo formato de format_log_with_context("CHUNKED_UPLOAD", ...).
+        
+        Só o Correlation ID varia entre chamadas; o restante do prefixo é
+        pré-calculado no __init__.
+        """
+        if not logger.isEnabledFor(level):
+            return
+        correlation_id = get_correlation_id()
+        if correlation_id:
+            prefix = f"[CHUNKED_UPLOAD] [CORRELATION:{correlation_id}] [UPLOAD_ID:{self.upload_id}]"
+        else:
+            prefix = self._log_prefix
+        logger.log(level, f"{prefix} {message}", exc_info=exc_info)
+    
+    def save_chunk(self, chunk_number: int, chunk_data: Union[bytes, memoryview]) -> bool:
         """Salva chunk individual."""
         chunk_file = self.upload_dir / f"chunk_{chunk_number:05d}"
         chunk_size = len(chunk_data)
         
-        logger.debug(
-            format_log_with_context(
-                "CHUNKED_UPLOAD",
-                f"Salvando chunk: upload_id={self.upload_id}, chunk_number={chunk_number}, size={chunk_size}, file={chunk_file.name}",
-                upload_id=self.upload_id
+        if logger.isEnabledFor(logging.DEBUG):
+            self._log(
+                logging.DEBUG,
+                f"Salvando chunk: upload_id={self.upload_id}, chunk_number={chunk_number}, size={chunk_size}, file={chunk_file.name}"
             )
-        )
         
         try:
             with open(chunk_file, "wb") as f:
                 f.write(chunk_data)
             
-            self.chunks_received[chunk_number] = True
+            # Registrar no manifesto só depois que o chunk está no disco
+            self._record_chunk(chunk_number)
             
-            logger.debug(
-                format_log_with_context(
-                    "CHUNKED_UPLOAD",
-                    f"Chunk salvo: upload_id={self.upload_id}, chunk_number={chunk_number}, chunks_received={len(self.chunks_received)}/{self.total_chunks or '?'}",
-                    upload_id=self.upload_id
+            if logger.isEnabledFor(logging.DEBUG):
+                self._log(
+                    logging.DEBUG,
+                    f"Chunk salvo: upload_id={self.upload_id}, chunk_number={chunk_number}, chunks_received={self._received_count}/{self.total_chunks or '?'}"
                 )
-            )
             
             return True
         except Exception as e:
-            logger.error(
-                format_log_with_context(
-                    "CHUNKED_UPLOAD",
-                    f"Erro ao salvar chunk: upload_id={self.upload_id}, chunk_number={chunk_number}, error={str(e)}",
-                    upload_id=self.upload_id
-                ),
+            self._log(
+                logging.ERROR,
+                f"Erro ao salvar chunk: upload_id={self.upload_id}, chunk_number={chunk_number}, error={str(e)}",
                 exc_info=True
             )
             return False
     
+    def _reserve_bitmap(self, total_chunks: int):
+        """Garante espaço no bitmap para total_chunks chunks."""
+        needed = (total_chunks + 7) >> 3
+        if needed > len(self.chunks_received):
+            self.chunks_received.extend(bytes(needed - len(self.chunks_received)))
+    
+    def _mark_received(self, chunk_number: int):
+        """Liga o bit do chunk, contando-o apenas na primeira vez."""
+        byte, bit = chunk_number >> 3, 1 << (chunk_number & 7)
+        with self._received_lock:
+            self._reserve_bitmap(chunk_number + 1)
+            if not self.chunks_received[byte] & bit:
+                self.chunks_received[byte] |= bit
+                self._received_count += 1
+    
     def has_chunk(self, chunk_number: int) -> bool:
         """Verifica se chunk foi recebido."""
-        return chunk_number in self.chunks_received
+        byte = chunk_number >> 3
+        if chunk_number < 0 or byte >= len(self.chunks_received):
+            return False
+        return bool((self.chunks_received[byte] >> (chunk_number & 7)) & 1)
     
     def get_received_chunks(self) -> int:
         """Retorna número de chunks recebidos."""
-        return len(self.chunks_received)
+        return self._received_count
     
     def get_progress(self) -> float:
         """Retorna progresso do upload (0-100)."""
         if not self.total_chunks:
             return 0.0
-        return (len(self.chunks_received) / self.total_chunks) * 100.0
+        return (self._received_count / self.total_chunks) * 100.0
     
     def is_complete(self) -> bool:
         """Verifica se todos os chunks foram recebidos."""
         if not self.total_chunks:
             return False
-        return len(self.chunks_received) == self.total_chunks
+        return self._received_count == self.total_chunks
     
     def assemble_file(self, output_path: Path) -> Optional[str]:
-        """Monta arquivo final a partir dos chunks."""
-        if not self.is_complete():
-            logger.warning(
-                format_log_with_context(
-                    "CHUNKED_UPLOAD",
-                    f"Tentativa de montar arquivo incompleto: upload_id={self.upload_id}, chunks_received={len(self.chunks_received)}/{self.total_chunks or '?'}",
-                    upload_id=self.upload_id
-                )
-            )
+        """
+        Monta arquivo final a partir dos chunks e retorna seu checksum.
+        
+        O hash é atualizado chunk a chunk durante a escrita, evitando
+        reler o arquivo montado do disco.
+        """
+        hasher = new_hasher()
+        if not self.concatenate_chunks(output_path, hasher=hasher):
             return None
         
-        logger.info(
-            format_log_with_context(
-                "CHUNKED_UPLOAD",
-                f"Montando arquivo: upload_id={self.upload_id}, output_path={output_path}, chunks={self.total_chunks}",
-                upload_id=self.upload_id
+        checksum = format_digest(hasher)
+        self._log(
+            logging.INFO,
+            f"Arquivo montado com sucesso: upload_id={self.upload_id}, output_path={output_path}, checksum={checksum[:23]}..."
+        )
+        return checksum
+    
+    def concatenate_chunks(self, output_path: Path, hasher=None) -> bool:
+        """
+        Concatena os chunks no arquivo final.
+        
+        Sem hasher, não calcula checksum, permitindo que o chamador o calcule
+        em paralelo com outras operações (ex: upload para CDN). Com hasher
+        (ex: checksum.new_hasher()), cada chunk alimenta o hash antes de ser escrito.
+        """
+        if not self.is_complete():
+            self._log(
+                logging.WARNING,
+                f"Tentativa de montar arquivo incompleto: upload_id={self.upload_id}, chunks_received={self._received_count}/{self.total_chunks or '?'}"
             )
+            return False
+        
+        self._log(
+            logging.INFO,
+            f"Montando arquivo: upload_id={self.upload_id}, output_path={output_path}, chunks={self.total_chunks}"
         )
         
         try:
@@ -144,85 +366,61 @@ class ChunkedUploadManager:
                 for i in range(self.total_chunks)
             ])
             
-            logger.debug(
-                format_log_with_context(
-                    "CHUNKED_UPLOAD",
-                    f"Chunks encontrados: upload_id={self.upload_id}, count={len(chunk_files)}",
-                    upload_id=self.upload_id
+            if logger.isEnabledFor(logging.DEBUG):
+                self._log(
+                    logging.DEBUG,
+                    f"Chunks encontrados: upload_id={self.upload_id}, count={len(chunk_files)}"
                 )
-            )
+            
+            missing = next((f for f in chunk_files if not f.exists()), None)
+            if missing is not None:
+                self._log(
+                    logging.ERROR,
+                    f"Chunk não encontrado: upload_id={self.upload_id}, chunk_file={missing.name}"
+                )
+                return False
             
             # Montar arquivo
             total_bytes = 0
             with open(output_path, "wb") as outfile:
-                for chunk_file in chunk_files:
-                    if not chunk_file.exists():
-                        logger.error(
-                            format_log_with_context(
-                                "CHUNKED_UPLOAD",
-                                f"Chunk não encontrado: upload_id={self.upload_id}, chunk_file={chunk_file.name}",
-                                upload_id=self.upload_id
-                            )
-                        )
-                        return None
-                    with open(chunk_file, "rb") as infile:
-                        chunk_data = infile.read()
+                out_fd = outfile.fileno()
+                _preallocate(out_fd, self.file_size)
+                if hasher is None:
+                    # Cópia feita pelo kernel, sem passar pelo espaço do usuário
+                    for chunk_file in chunk_files:
+                        with open(chunk_file, "rb") as infile:
+                            _advise_sequential(infile.fileno())
+                            total_bytes += _copy_fd(infile.fileno(), out_fd)
+                else:
+                    for chunk_data in _read_chunks_ahead(chunk_files):
+                        hasher.update(chunk_data)
                         outfile.write(chunk_data)
                         total_bytes += len(chunk_data)
+                if self.file_size and total_bytes != self.file_size:
+                    # Chunks somam tamanho diferente do declarado: descarta a sobra reservada
+                    outfile.truncate(total_bytes)
             
-            logger.debug(
-                format_log_with_context(
-                    "CHUNKED_UPLOAD",
-                    f"Arquivo montado: upload_id={self.upload_id}, total_bytes={total_bytes}",
-                    upload_id=self.upload_id
-                )
-            )
-            
-            # Calcular checksum
-            logger.debug(
-                format_log_with_context(
-                    "CHUNKED_UPLOAD",
-                    f"Calculando checksum: upload_id={self.upload_id}",
-                    upload_id=self.upload_id
+            if logger.isEnabledFor(logging.DEBUG):
+                self._log(
+                    logging.DEBUG,
+                    f"Arquivo montado: upload_id={self.upload_id}, total_bytes={total_bytes}"
                 )
-            )
-            checksum = self._calculate_checksum(output_path)
             
             # Limpar chunks
             self.cleanup()
             
-            logger.info(
-                format_log_with_context(
-                    "CHUNKED_UPLOAD",
-                    f"Arquivo montado com sucesso: upload_id={self.upload_id}, output_path={output_path}, checksum=sha256:{checksum[:16]}...",
-                    upload_id=self.upload_id
-                )
-            )
-            
-            return checksum
+            return True
         except Exception as e:
-            logger.error(
-                format_log_with_context(
-                    "CHUNKED_UPLOAD",
-                    f"Erro ao montar arquivo: upload_id={self.upload_id}, error={str(e)}",
-                    upload_id=self.upload_id
-                ),
+            self._log(
+                logging.ERROR,
+                f"Erro ao montar arquivo: upload_id={self.upload_id}, error={str(e)}",
                 exc_info=True
             )
-            return None
-    
-    def _calculate_checksum(self, file_path: Path) -> str:
-        """Calcula SHA256 do arquivo."""
-        sha256 = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                sha256.update(chunk)
-        return sha256.hexdigest()
+            return False
     
     def cleanup(self):
         """Remove chunks temporários."""
         try:
-            import shutil
             shutil.rmtree(self.upload_dir)
         except Exception:
             pass
@@ -234,22 +432,169 @@ class ChunkedUploadManager:
         if not upload_dir.exists():
             return None
         
-        manager = ChunkedUploadManager(upload_id)
-        
         # Carregar metadados
         metadata_file = upload_dir / "metadata.json"
-        if metadata_file.exists():
-            import json
+        try:
             with open(metadata_file, "r") as f:
                 metadata = json.load(f)
-                manager.filename = metadata.get("filename")
-                manager.file_size = metadata.get("file_size")
-                manager.total_chunks = metadata.get("total_chunks")
-                manager.mime_type = metadata.get("mime_type")
+        except FileNotFoundError:
+            metadata = None
+        
+        # Uploads com escrita direta gravam o tamanho do chunk nos metadados
+        if metadata and metadata.get("chunk_size"):
+            manager = DirectChunkedUploadManager(upload_id)
+            manager.chunk_size = metadata["chunk_size"]
+        else:
+            manager = ChunkedUploadManager(upload_id)
+        
+        if metadata:
+            manager.filename = metadata.get("filename")
+            manager.file_size = metadata.get("file_size")
+            manager.total_chunks = metadata.get("total_chunks")
+            manager.mime_type = metadata.get("mime_type")
+            manager.stored_filename = metadata.get("stored_filename")
+            manager._reserve_bitmap(manager.total_chunks or 0)
+        
+        # Carregar chunks recebidos do manifesto, em uma única leitura
+        try:
+            with open(manager.manifest_path, "rb") as f:
+                manifest = f.read()
+        except FileNotFoundError:
+            manifest = None
         
-        # Carregar chunks recebidos
-        for chunk_file in upload_dir.glob("chunk_*"):
-            chunk_num = int(chunk_file.stem.split("_")[1])
-            manager.chunks_received[chunk_num] = True
+        if manifest is not None:
+            flags = np.frombuffer(manifest, dtype=np.uint8) != 0
+            manager.chunks_received = bytearray(np.packbits(flags, bitorder="little").tobytes())
+            manager._received_count = int(np.count_nonzero(flags))
+            manager._reserve_bitmap(manager.total_chunks or 0)
+        else:
+            # Upload iniciado antes do manifesto: reconstruir pelos arquivos de chunk.
+            # scandir lê nome e tipo da própria entrada do diretório, sem stat por arquivo.
+            with os.scandir(upload_dir) as entries:
+                for entry in entries:
+                    if entry.name.startswith("chunk_"):
+                        manager._mark_received(int(entry.name[6:]))
         
         return manager
+
+
+class DirectChunkedUploadManager(ChunkedUploadManager):
+    """
+    Upload em chunks gravados direto no arquivo final.
+    
+    Cada chunk vai com um único pwrite para a posição chunk_number * chunk_size
+    de data.bin, sem arquivo por chunk; a montagem vira apenas um rename.
+    Exige chunks de tamanho fixo (exceto o último); protocolos com chunks de
+    tamanho variável continuam no ChunkedUploadManager.
+    """
+    
+    def __init__(self, upload_id: str):
+        """Inicializa gerenciador de upload com escrita direta."""
+        super().__init__(upload_id)
+        self.data_path = self.upload_dir / "data.bin"
+        self.chunk_size: Optional[int] = None
+    
+    def init_upload(
+        self,
+        filename: str,
+        file_size: int,
+        total_chunks: int,
+        mime_type: Optional[str] = None,
+        stored_filename: Optional[str] = None,
+        chunk_size: Optional[int] = None
+    ):
+        """Inicializa upload e reserva o arquivo de destino com o tamanho final."""
+        self.chunk_size = chunk_size or settings.CHUNK_SIZE
+        super().init_upload(filename, file_size, total_chunks, mime_type, stored_filename)
+        
+        fd = os.open(self.data_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            _preallocate(fd, file_size)
+        finally:
+            os.close(fd)
+    
+    def _metadata(self) -> dict:
+        """Campos persistidos em metadata.json, incluindo o tamanho do chunk."""
+        metadata = super()._metadata()
+        metadata["chunk_size"] = self.chunk_size
+        return metadata
+    
+    def save_chunk(self, chunk_number: int, chunk_data: Union[bytes, memoryview]) -> bool:
+        """Grava o chunk na sua posição do arquivo final."""
+        offset = chunk_number * self.chunk_size
+        expected = min(self.chunk_size, (self.file_size or 0) - offset)
+        if len(chunk_data) != expected:
+            self._log(
+                logging.ERROR,
+                f"Tamanho de chunk inválido: upload_id={self.upload_id}, chunk_number={chunk_number}, size={len(chunk_data)}, expected={expected}"
+            )
+            return False
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            self._log(
+                logging.DEBUG,
+                f"Gravando chunk: upload_id={self.upload_id}, chunk_number={chunk_number}, size={expected}, offset={offset}"
+            )
+        
+        try:
+            view = memoryview(chunk_data)
+            fd = os.open(self.data_path, os.O_WRONLY | os.O_CREAT, 0o644)
+            try:
+                while view:
+                    written = os.pwrite(fd, view, offset)
+                    view = view[written:]
+                    offset += written
+            finally:
+                os.close(fd)
+            
+            self._record_chunk(chunk_number)
+            return True
+        except Exception as e:
+            self._log(
+                logging.ERROR,
+                f"Erro ao salvar chunk: upload_id={self.upload_id}, chunk_number={chunk_number}, error={str(e)}",
+                exc_info=True
+            )
+            return False
+    
+    def concatenate_chunks(self, output_path: Path, hasher=None) -> bool:
+        """
+        Move data.bin para output_path (os chunks já estão em ordem nele).
+        
+        Com hasher, o arquivo é lido uma vez para calcular o checksum.
+        """
+        if not self.is_complete():
+            self._log(
+                logging.WARNING,
+                f"Tentativa de montar arquivo incompleto: upload_id={self.upload_id}, chunks_received={self._received_count}/{self.total_chunks or '?'}"
+            )
+            return False
+        
+        self._log(
+            logging.INFO,
+            f"Finalizando arquivo: upload_id={self.upload_id}, output_path={output_path}, chunks={self.total_chunks}"
+        )
+        
+        try:
+            try:
+                os.replace(self.data_path, output_path)
+            except OSError:
+                # Destino em outro sistema de arquivos: cópia pelo kernel
+                with open(self.data_path, "rb") as infile, open(output_path, "wb") as outfile:
+                    _preallocate(outfile.fileno(), self.file_size)
+                    _copy_fd(infile.fileno(), outfile.fileno())
+            
+            if hasher is not None:
+                with open(output_path, "rb") as f:
+                    _advise_sequential(f.fileno())
+                    hashlib.file_digest(f, lambda: hasher)
+            
+            self.cleanup()
+            return True
+        except Exception as e:
+            self._log(
+                logging.ERROR,
+                f"Erro ao montar arquivo: upload_id={self.upload_id}, error={str(e)}",
+                exc_info=True
+            )
+            return False
@@ -1,6 +1,28 @@
 """Formatação de respostas."""
-from datetime import datetime
-from typing import Optional, Dict, Any
+import time
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Tuple
+
+# Último timestamp formatado: (milissegundo, texto). Respostas geradas no
+# mesmo milissegundo reaproveitam o texto em vez de formatar a data de novo
+_ts_cache: Tuple[int, str] = (-1, "")
+
+
+def _now_iso() -> str:
+    """Retorna o instante atual em ISO 8601 UTC com milissegundos (sufixo Z)."""
+    global _ts_cache
+    now = time.time()
+    millis = int(now * 1000)
+    cached_millis, cached = _ts_cache
+    if millis == cached_millis:
+        return cached
+    # Construído a partir de inteiros: millis / 1000 passaria por float e poderia
+    # arredondar para .xxx999, truncado para o milissegundo anterior
+    text = datetime.fromtimestamp(millis // 1000, timezone.utc).replace(
+        microsecond=(millis % 1000) * 1000, tzinfo=None
+    ).isoformat(timespec="milliseconds") + "Z"
+    _ts_cache = (millis, text)
+    return text
 
 
 def format_success_response(
@@ -22,7 +44,7 @@ def format_success_response(
     response = {
         "success": True,
         "message": message,
-        "timestamp": datetime.utcnow().isoformat() + "Z"
+        "timestamp": _now_iso()
     }
     
     if data:
@@ -53,7 +75,7 @@ def format_error_response(
     response = {
         "success": False,
         "message": message,
-        "timestamp": datetime.utcnow().isoformat() + "Z"
+        "timestamp": _now_iso()
     }
     
     if error_code:
@@ -1,26 +1,33 @@
 """Validações de arquivo."""
+import functools
 import mimetypes
 from pathlib import Path
 from typing import Tuple, Optional
 
 
 # Tipos MIME permitidos
-ALLOWED_MIME_TYPES = {
+ALLOWED_MIME_TYPES = frozenset({
     "video/mp4",
     "video/quicktime",  # MOV
     "video/x-msvideo",  # AVI
     "video/x-matroska",  # MKV
     "video/webm",
-}
+})
 
 # Extensões permitidas
-ALLOWED_EXTENSIONS = {
+ALLOWED_EXTENSIONS = frozenset({
     ".mp4",
     ".mov",
     ".avi",
     ".mkv",
     ".webm",
-}
+})
+
+
+@functools.lru_cache(maxsize=32)
+def _guess_mime_for_ext(file_ext: str) -> Optional[str]:
+    """MIME type esperado para a extensão (determinístico: calculado uma vez por extensão)."""
+    return mimetypes.guess_type(f"file{file_ext}")[0]
 
 
 def validate_file_type(filename: str, mime_type: Optional[str] = None) -> Tuple[bool, Optional[str]]:
@@ -41,7 +48,7 @@ def validate_file_type(filename: str, mime_type: Optional[str] = None) -> Tuple[
             return False, f"Tipo MIME não permitido: {mime_type}"
         
         # Verificar consistência entre extensão e MIME type
-        expected_mime = mimetypes.guess_type(filename)[0]
+        expected_mime = _guess_mime_for_ext(file_ext)
         if expected_mime and expected_mime != mime_type:
             return False, f"MIME type inconsistente: esperado {expected_mime}, recebido {mime_type}"
     
@@ -64,14 +71,14 @@ def validate_file_size(file_size: int, max_size: int) -> Tuple[bool, Optional[st
     return True, None
 
 
+# Caracteres perigosos em nomes de arquivo, trocados por "_" em uma única passada
+_SANITIZE_TABLE = str.maketrans({c: '_' for c in '/\\<>:"|?*'})
+
+
 def sanitize_filename(filename: str) -> str:
     """Sanitiza nome de arquivo."""
-    # Remover caracteres perigosos
-    dangerous_chars = ['/', '\\', '..', '<', '>', ':', '"', '|', '?', '*']
-    sanitized = filename
-    
-    for char in dangerous_chars:
-        sanitized = sanitized.replace(char, '_')
+    # Remover caracteres perigosos (".." não é um caractere: tratado à parte)
+    sanitized = filename.translate(_SANITIZE_TABLE).replace('..', '_')
     
     # Limitar tamanho
     max_length = 255
@@ -81,3 +88,26 @@ def sanitize_filename(filename: str) -> str:
     
     return sanitized
 
+
+def validate_upload(
+    filename: str,
+    file_size: int,
+    mime_type: Optional[str],
+    max_size: int
+) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Valida tipo e tamanho do upload e sanitiza o nome em uma única chamada.
+    
+    Returns:
+        (sanitized_filename, None) se válido, (None, error_message) caso contrário
+    """
+    is_valid, error = validate_file_type(filename, mime_type)
+    if not is_valid:
+        return None, error
+    
+    is_valid, error = validate_file_size(file_size, max_size)
+    if not is_valid:
+        return None, error
+    
+    return sanitize_filename(filename), None
+
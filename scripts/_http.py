@@ -0,0 +1,61 @@
+"""Utilitários HTTP compartilhados pelos scripts de teste."""
+import json
+import time
+from typing import Any, Callable, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# Polling de status: intervalo cresce enquanto nada muda e volta ao mínimo a cada mudança
+POLL_MIN_INTERVAL = 1.0
+POLL_MAX_INTERVAL = 10.0
+POLL_BACKOFF = 1.5
+
+_session: Optional[requests.Session] = None
+
+
+def get_session() -> requests.Session:
+    """
+    Retorna a sessão HTTP compartilhada do processo.
+    
+    Conexões keep-alive são reaproveitadas entre requisições; o pool comporta
+    os envios paralelos de chunks e falhas de conexão têm até 3 retentativas.
+    """
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=Retry(total=3, backoff_factor=0.2))
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _session = session
+    return _session
+
+
+def response_json(response: requests.Response) -> Any:
+    """Decodifica o corpo JSON da resposta direto dos bytes (orjson quando instalado)."""
+    return json_loads(response.content)
+
+
+def poll_until(check: Callable[[], Tuple[Any, bool]], max_wait: Optional[float] = None) -> Any:
+    """
+    Chama `check` até ele produzir um resultado, com intervalo adaptativo.
+    
+    `check` retorna (resultado, mudou): um resultado diferente de None encerra
+    o polling e é retornado; `mudou` volta o intervalo ao mínimo, senão ele
+    cresce até POLL_MAX_INTERVAL. Retorna None se `max_wait` (s) esgotar.
+    """
+    start = time.monotonic()
+    interval = POLL_MIN_INTERVAL
+    while max_wait is None or time.monotonic() - start < max_wait:
+        result, changed = check()
+        if result is not None:
+            return result
+        interval = POLL_MIN_INTERVAL if changed else min(interval * POLL_BACKOFF, POLL_MAX_INTERVAL)
+        time.sleep(interval)
+    return None
@@ -2,17 +2,27 @@
 """Script para monitorar processamento de análises."""
 import sys
 import time
-import requests
+from _http import get_session
 from datetime import datetime
 from typing import Optional
 
 API_BASE_URL = "http://localhost:8000"
 
+# Ícones de status das etapas
+STEP_STATUS_ICON = {
+    "pending": "⏳",
+    "running": "🔄",
+    "completed": "✅",
+    "failed": "❌"
+}
+
+SESSION = get_session()
+
 
 def get_analysis_status(analysis_id: str) -> Optional[dict]:
     """Obtém status da análise."""
     try:
-        response = requests.get(f"{API_BASE_URL}/api/v1/analysis/{analysis_id}")
+        response = SESSION.get(f"{API_BASE_URL}/api/v1/analysis/{analysis_id}")
         if response.status_code == 200:
             return response.json()
         else:
@@ -40,7 +50,7 @@ def monitor_analysis(analysis_id: str, interval: int = 2):
     print(f"🔍 Monitorando Análise: {analysis_id}")
     print(f"{'='*60}\n")
     
-    start_time = time.time()
+    start_time = time.monotonic()
     last_status = None
     
     while True:
@@ -56,10 +66,13 @@ def monitor_analysis(analysis_id: str, interval: int = 2):
         current_step = data.get("current_step")
         steps = data.get("steps", [])
         
+        # Saída do tick acumulada e escrita de uma vez no fim
+        out = []
+        
         # Mostrar mudanças de status
         if status != last_status:
-            elapsed = time.time() - start_time
-            print(f"\n[{datetime.now().strftime('%H:%M:%S')}] {format_status(status)} ({elapsed:.1f}s)")
+            elapsed = time.monotonic() - start_time
+            out.append(f"\n[{datetime.now().strftime('%H:%M:%S')}] {format_status(status)} ({elapsed:.1f}s)\n")
             last_status = status
         
         # Mostrar progresso
@@ -67,32 +80,30 @@ def monitor_analysis(analysis_id: str, interval: int = 2):
             bar_length = 30
             filled = int(bar_length * progress / 100)
             bar = "█" * filled + "░" * (bar_length - filled)
-            print(f"   Progresso: [{bar}] {progress}%", end="\r")
+            out.append(f"   Progresso: [{bar}] {progress}%\r")
         
         # Mostrar step atual
         if current_step:
-            print(f"\n   📍 Etapa atual: {current_step}")
+            out.append(f"\n   📍 Etapa atual: {current_step}\n")
         
         # Mostrar detalhes dos steps
         if steps:
-            print("\n   📊 Etapas:")
+            out.append("\n   📊 Etapas:\n")
             for step in steps:
                 step_name = step.get("name", "unknown")
                 step_status = step.get("status", "pending")
                 step_progress = step.get("progress", 0)
                 
-                status_icon = {
-                    "pending": "⏳",
-                    "running": "🔄",
-                    "completed": "✅",
-                    "failed": "❌"
-                }.get(step_status, "❓")
+                status_icon = STEP_STATUS_ICON.get(step_status, "❓")
                 
-                print(f"      {status_icon} {step_name}: {step_progress}%")
+                out.append(f"      {status_icon} {step_name}: {step_progress}%\n")
+        
+        sys.stdout.write("".join(out))
+        sys.stdout.flush()
         
         # Verificar se completou ou falhou
         if status == "completed":
-            elapsed = time.time() - start_time
+            elapsed = time.monotonic() - start_time
             print(f"\n\n{'='*60}")
             print(f"✅ Análise Completa! Tempo total: {elapsed:.1f}s")
             print(f"{'='*60}\n")
@@ -119,7 +130,7 @@ def monitor_analysis(analysis_id: str, interval: int = 2):
             break
         
         if status == "failed":
-            elapsed = time.time() - start_time
+            elapsed = time.monotonic() - start_time
             error_message = data.get("error_message", "Erro desconhecido")
             print(f"\n\n{'='*60}")
             print(f"❌ Análise Falhou após {elapsed:.1f}s")
@@ -133,7 +144,7 @@ def monitor_analysis(analysis_id: str, interval: int = 2):
 def list_pending_analyses():
     """Lista análises pendentes."""
     try:
-        response = requests.get(f"{API_BASE_URL}/api/v1/analysis?page=1&page_size=10")
+        response = SESSION.get(f"{API_BASE_URL}/api/v1/analysis?page=1&page_size=10")
         if response.status_code == 200:
             data = response.json()
             items = data.get("items", [])
@@ -2,22 +2,47 @@
 """Script de teste completo da API local."""
 import sys
 import os
+import hashlib
+import importlib.util
+import queue
+import struct
+import threading
+import time
+import httpx
 import requests
-import json
+from _http import get_session, response_json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 # Configuração
 API_BASE_URL = "http://localhost:8000"
 TEST_VIDEO = "/Users/leandrobosaipo/Downloads/andando-pela-cua.mp4"
+# Chunks enviados em paralelo (o servidor aceita chunks em qualquer ordem)
+UPLOAD_CONCURRENCY = 8
+# Chunks por requisição no envio em lote (--bulk); servidor aceita até 16
+UPLOAD_BULK_BATCH = 8
+# Intervalo mínimo (s) entre atualizações da linha de progresso do upload
+PROGRESS_INTERVAL = 0.2
+
+SESSION = get_session()
+
+# Cliente dos chunks: com HTTP/2 (API atrás de TLS com h2) os envios paralelos
+# são multiplexados em uma conexão; em http:// simples usa um pool HTTP/1.1
+CHUNK_CLIENT = httpx.Client(
+    http2=importlib.util.find_spec("h2") is not None,
+    limits=httpx.Limits(max_connections=UPLOAD_CONCURRENCY, max_keepalive_connections=UPLOAD_CONCURRENCY),
+    timeout=300
+)
+
 
 def test_health():
     """Testa health check."""
     print("=" * 60)
     print("1. Testando Health Check")
     print("=" * 60)
-    response = requests.get(f"{API_BASE_URL}/health")
+    response = SESSION.get(f"{API_BASE_URL}/health")
     print(f"Status: {response.status_code}")
-    print(f"Response: {response.json()}")
+    print(f"Response: {response_json(response)}")
     return response.status_code == 200
 
 def test_upload_init(filename, file_size, mime_type):
@@ -25,7 +50,7 @@ def test_upload_init(filename, file_size, mime_type):
     print("\n" + "=" * 60)
     print("2. Testando Upload Init")
     print("=" * 60)
-    response = requests.post(
+    response = SESSION.post(
         f"{API_BASE_URL}/api/v1/upload/init",
         json={
             "filename": filename,
@@ -35,7 +60,7 @@ def test_upload_init(filename, file_size, mime_type):
     )
     print(f"Status: {response.status_code}")
     if response.status_code == 201:
-        data = response.json()
+        data = response_json(response)
         print(f"Upload ID: {data['upload_id']}")
         print(f"Chunk Size: {data['chunk_size']}")
         print(f"Total Chunks: {data['total_chunks']}")
@@ -50,28 +75,102 @@ def test_upload_chunks(upload_id, file_path, chunk_size):
     print("3. Testando Upload de Chunks")
     print("=" * 60)
     
-    with open(file_path, 'rb') as f:
-        chunk_num = 0
-        while True:
-            chunk_data = f.read(chunk_size)
-            if not chunk_data:
-                break
-            
-            response = requests.post(
-                f"{API_BASE_URL}/api/v1/upload/chunk/{upload_id}",
-                data={"chunk_number": chunk_num},
-                files={"chunk": (f"chunk_{chunk_num}.bin", chunk_data, "application/octet-stream")}
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                print(f"Chunk {chunk_num}: OK - Progress: {data['progress']:.1f}%")
-            else:
-                print(f"Chunk {chunk_num}: ERROR - {response.text[:200]}")
-                return False
-            
-            chunk_num += 1
+    file_size = os.path.getsize(file_path)
+    fd = os.open(file_path, os.O_RDONLY)
+    
+    def upload_one(chunk_num):
+        # pread: cada thread lê o próprio trecho sem disputar a posição do arquivo
+        chunk_data = os.pread(fd, chunk_size, chunk_num * chunk_size)
+        # Corpo binário direto (sem multipart): sem boundary nem cópia extra do chunk
+        return CHUNK_CLIENT.put(
+            f"{API_BASE_URL}/api/v1/upload/chunk/{upload_id}/{chunk_num}",
+            content=chunk_data,
+            headers={'Content-Type': 'application/octet-stream'}
+        )
+    
+    try:
+        total_chunks = (file_size + chunk_size - 1) // chunk_size
+        done = 0
+        last_print = 0.0
+        with ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY) as executor:
+            futures = {executor.submit(upload_one, n): n for n in range(total_chunks)}
+            for future in as_completed(futures):
+                chunk_num = futures[future]
+                response = future.result()
+                
+                if response.status_code == 200:
+                    data = response_json(response)
+                    done += 1
+                    # Progresso em uma única linha, reescrita no máximo a cada PROGRESS_INTERVAL
+                    now = time.monotonic()
+                    if now - last_print >= PROGRESS_INTERVAL or done == total_chunks:
+                        sys.stdout.write(f"\rChunks: {done}/{total_chunks} - Progress: {data['progress']:5.1f}%")
+                        sys.stdout.flush()
+                        last_print = now
+                else:
+                    print(f"\nChunk {chunk_num}: ERROR - {response.text[:200]}")
+                    for pending in futures:
+                        pending.cancel()
+                    return False
+    finally:
+        os.close(fd)
+    
+    sys.stdout.write("\n")
+    return True
+
+def test_upload_chunks_bulk(upload_id, file_path, chunk_size, batch_size=UPLOAD_BULK_BATCH):
+    """Testa upload de chunks em lote (vários chunks por requisição)."""
+    print("\n" + "=" * 60)
+    print("3. Testando Upload de Chunks em Lote")
+    print("=" * 60)
+    
+    # Leitura e montagem dos lotes em outra thread: o próximo lote fica pronto
+    # enquanto o atual é enviado (fila limitada a 2 lotes em memória)
+    batches = queue.Queue(maxsize=2)
+    
+    def reader():
+        with open(file_path, 'rb') as f:
+            chunk_num = 0
+            while True:
+                # Frame por chunk: <tamanho uint32><chunk_number uint32><dados><blake2b-128>
+                body = bytearray()
+                first = chunk_num
+                for _ in range(batch_size):
+                    chunk_data = f.read(chunk_size)
+                    if not chunk_data:
+                        break
+                    body += struct.pack('<II', len(chunk_data), chunk_num)
+                    body += chunk_data
+                    body += hashlib.blake2b(chunk_data, digest_size=16).digest()
+                    chunk_num += 1
+                if not body:
+                    break
+                batches.put((first, chunk_num - 1, bytes(body)))
+        batches.put(None)
+    
+    threading.Thread(target=reader, daemon=True).start()
+    
+    last_print = 0.0
+    while (batch := batches.get()) is not None:
+        first, last, body = batch
+        response = SESSION.post(
+            f"{API_BASE_URL}/api/v1/upload/chunk_bulk/{upload_id}",
+            data=body,
+            headers={'Content-Type': 'application/vid-finger-chunks'}
+        )
+        
+        if response.status_code == 200:
+            data = response_json(response)
+            now = time.monotonic()
+            if now - last_print >= PROGRESS_INTERVAL or data['progress'] >= 100:
+                sys.stdout.write(f"\rChunks: {last + 1} - Progress: {data['progress']:5.1f}%")
+                sys.stdout.flush()
+                last_print = now
+        else:
+            print(f"\nChunks {first}-{last}: ERROR - {response.text[:200]}")
+            return False
     
+    sys.stdout.write("\n")
     return True
 
 def test_complete_upload(upload_id, webhook_url=None):
@@ -84,14 +183,14 @@ def test_complete_upload(upload_id, webhook_url=None):
     if webhook_url:
         params["webhook_url"] = webhook_url
     
-    response = requests.post(
+    response = SESSION.post(
         f"{API_BASE_URL}/api/v1/upload/complete/{upload_id}",
         params=params
     )
     
     print(f"Status: {response.status_code}")
     if response.status_code == 200:
-        data = response.json()
+        data = response_json(response)
         print(f"Analysis ID: {data['analysis_id']}")
         print(f"Status: {data['status']}")
         print(f"Message: {data['message']}")
@@ -106,11 +205,11 @@ def test_get_analysis(analysis_id):
     print("5. Testando Get Analysis Status")
     print("=" * 60)
     
-    response = requests.get(f"{API_BASE_URL}/api/v1/analysis/{analysis_id}")
+    response = SESSION.get(f"{API_BASE_URL}/api/v1/analysis/{analysis_id}")
     print(f"Status: {response.status_code}")
     
     if response.status_code == 200:
-        data = response.json()
+        data = response_json(response)
         print(f"Analysis ID: {data['id']}")
         print(f"Status: {data['status']}")
         print(f"Progress: {data['progress']}%")
@@ -158,8 +257,9 @@ def main():
     upload_id = upload_data['upload_id']
     chunk_size = upload_data['chunk_size']
     
-    # 2. Upload chunks
-    if not test_upload_chunks(upload_id, TEST_VIDEO, chunk_size):
+    # 2. Upload chunks (--bulk: vários chunks por requisição)
+    upload_chunks = test_upload_chunks_bulk if "--bulk" in sys.argv else test_upload_chunks
+    if not upload_chunks(upload_id, TEST_VIDEO, chunk_size):
         print("\nFalha no upload de chunks. Abortando.")
         sys.exit(1)
     
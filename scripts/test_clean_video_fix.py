@@ -2,14 +2,15 @@
 """Script para testar correção do bug de Foreign Key no vídeo limpo."""
 import sys
 import os
-import requests
+from _http import get_session, poll_until
 import json
-import time
 from pathlib import Path
 
 # Configuração
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
 
+SESSION = get_session()
+
 def test_clean_video_save(video_path: str):
     """Testa salvamento do vídeo limpo."""
     print("=" * 60)
@@ -20,14 +21,15 @@ def test_clean_video_save(video_path: str):
     print()
     
     # Verificar se arquivo existe
-    if not Path(video_path).exists():
+    video_file = Path(video_path)
+    if not video_file.exists():
         print(f"❌ Arquivo não encontrado: {video_path}")
         return False
     
     # Verificar saúde da API
     print("1. Verificando saúde da API...")
     try:
-        response = requests.get(f"{API_BASE_URL}/health", timeout=5)
+        response = SESSION.get(f"{API_BASE_URL}/health", timeout=5)
         if response.status_code != 200:
             print(f"❌ API não está respondendo: {response.status_code}")
             return False
@@ -40,10 +42,10 @@ def test_clean_video_save(video_path: str):
     print("\n2. Enviando análise...")
     try:
         with open(video_path, 'rb') as f:
-            files = {'file': (Path(video_path).name, f, 'video/mp4')}
+            files = {'file': (video_file.name, f, 'video/mp4')}
             data = {}
             
-            response = requests.post(
+            response = SESSION.post(
                 f"{API_BASE_URL}/api/v1/upload/analyze",
                 files=files,
                 data=data,
@@ -65,45 +67,54 @@ def test_clean_video_save(video_path: str):
     # Monitorar progresso
     print("\n3. Monitorando progresso da análise...")
     max_wait = 300  # 5 minutos
-    start_time = time.time()
     last_status = None
+    etag = None
     
-    while time.time() - start_time < max_wait:
+    def check():
+        nonlocal last_status, etag
         try:
-            response = requests.get(
+            # GET condicional: 304 significa que o status não mudou desde o último ETag
+            response = SESSION.get(
                 f"{API_BASE_URL}/api/v1/analysis/{analysis_id}",
+                headers={"If-None-Match": etag} if etag else {},
                 timeout=10
             )
+            if response.status_code != 200:
+                return None, False
             
-            if response.status_code == 200:
-                analysis = response.json()
-                status = analysis.get('status')
-                
-                if status != last_status:
-                    print(f"   Status: {status}")
-                    last_status = status
-                
-                if status == 'completed':
-                    print("\n✅ Análise concluída!")
-                    
-                    # Verificar se clean_video_id foi salvo
-                    clean_video_id = analysis.get('clean_video_id')
-                    if clean_video_id:
-                        print(f"✅ clean_video_id salvo: {clean_video_id}")
-                        return True
-                    else:
-                        print("⚠️  clean_video_id não foi salvo (pode ser normal se FFmpeg não estiver disponível)")
-                        return True  # Não é erro se FFmpeg não estiver disponível
-                
-                elif status == 'failed':
-                    error_msg = analysis.get('error_message', 'N/A')
-                    print(f"\n❌ Análise falhou: {error_msg}")
-                    return False
+            etag = response.headers.get("ETag")
+            analysis = response.json()
+            status = analysis.get('status')
+            
+            changed = status != last_status
+            if changed:
+                print(f"   Status: {status}")
+                last_status = status
+            
+            if status == 'completed':
+                print("\n✅ Análise concluída!")
                 
-            time.sleep(2)
+                # Verificar se clean_video_id foi salvo
+                clean_video_id = analysis.get('clean_video_id')
+                if clean_video_id:
+                    print(f"✅ clean_video_id salvo: {clean_video_id}")
+                else:
+                    print("⚠️  clean_video_id não foi salvo (pode ser normal se FFmpeg não estiver disponível)")
+                return True, changed  # Não é erro se FFmpeg não estiver disponível
+            
+            elif status == 'failed':
+                error_msg = analysis.get('error_message', 'N/A')
+                print(f"\n❌ Análise falhou: {error_msg}")
+                return False, changed
+            
+            return None, changed
         except Exception as e:
             print(f"⚠️  Erro ao verificar status: {e}")
-            time.sleep(2)
+            return None, False
+    
+    result = poll_until(check, max_wait)
+    if result is not None:
+        return result
     
     print(f"\n⏱️  Timeout após {max_wait} segundos")
     return False
@@ -3,18 +3,47 @@
 import sys
 import time
 import requests
-import json
+from _http import get_session, json_loads, poll_until, response_json
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
 BASE_URL = "http://localhost:8000"
 API_BASE = f"{BASE_URL}/api/v1"
 
+# Ícones de status da análise e das etapas
+STATUS_EMOJI = {
+    "pending": "⏳",
+    "analyzing": "🔄",
+    "completed": "✅",
+    "failed": "❌"
+}
+STEP_STATUS_EMOJI = {
+    "pending": "⏳",
+    "running": "🔄",
+    "completed": "✅",
+    "failed": "❌"
+}
 
-def check_server():
-    """Verifica se servidor está rodando."""
+# Resumo da análise concluída, escrito de uma vez
+DONE_TMPL = (
+    "\n✅ Análise concluída em {elapsed}s!\n"
+    "\n📊 Resultados:\n"
+    "   Classificação: {classification}\n"
+    "   Confiança: {confidence:.2%}\n"
+)
+
+SESSION = get_session()
+
+
+def check_server(pending: Optional[Future] = None):
+    """
+    Verifica se servidor está rodando.
+    
+    `pending` é um GET /health já disparado (ver main); sem ele, faz a requisição.
+    """
     try:
-        response = requests.get(f"{BASE_URL}/health", timeout=5)
+        response = pending.result() if pending else SESSION.get(f"{BASE_URL}/health", timeout=5)
         if response.status_code == 200:
             print("✅ Servidor está rodando")
             return True
@@ -27,12 +56,16 @@ def check_server():
     return False
 
 
-def check_dependencies():
-    """Verifica dependências via endpoint."""
+def check_dependencies(pending: Optional[Future] = None):
+    """
+    Verifica dependências via endpoint.
+    
+    `pending` é um GET /health/dependencies já disparado; sem ele, faz a requisição.
+    """
     try:
-        response = requests.get(f"{BASE_URL}/health/dependencies", timeout=10)
+        response = pending.result() if pending else SESSION.get(f"{BASE_URL}/health/dependencies", timeout=10)
         if response.status_code == 200:
-            data = response.json()
+            data = response_json(response)
             deps = data.get("data", {}).get("dependencies", {})
             all_ok = data.get("data", {}).get("all_dependencies_ok", False)
             
@@ -57,20 +90,21 @@ def upload_video(video_path: Path) -> Optional[str]:
         print(f"❌ Arquivo não encontrado: {video_path}")
         return None
     
-    print(f"\n📤 Fazendo upload de: {video_path.name}")
+    video_name = video_path.name
+    print(f"\n📤 Fazendo upload de: {video_name}")
     print(f"   Tamanho: {video_path.stat().st_size / 1024 / 1024:.2f} MB")
     
     try:
         with open(video_path, 'rb') as f:
-            files = {'file': (video_path.name, f, 'video/mp4')}
-            response = requests.post(
+            files = {'file': (video_name, f, 'video/mp4')}
+            response = SESSION.post(
                 f"{API_BASE}/upload/analyze",
                 files=files,
                 timeout=300
             )
         
         if response.status_code == 202:
-            data = response.json()
+            data = response_json(response)
             analysis_id = data.get("data", {}).get("analysis_id") or data.get("analysis_id")
             print(f"✅ Upload concluído!")
             print(f"   Analysis ID: {analysis_id}")
@@ -85,143 +119,211 @@ def upload_video(video_path: Path) -> Optional[str]:
         return None
 
 
-def get_analysis_status(analysis_id: str) -> Optional[dict]:
-    """Obtém status da análise."""
+def _extract_analysis(status_data: dict) -> dict:
+    """Normaliza a resposta de status (envelope {"data": {"analysis": ...}} ou análise direta)."""
+    data = status_data.get("data")
+    if data is None:
+        return status_data
+    return data.get("analysis") or data
+
+
+def get_analysis_status(
+    analysis_id: str,
+    etag: Optional[str] = None,
+    cached: Optional[dict] = None
+) -> Tuple[Optional[str], Optional[dict]]:
+    """
+    Obtém status da análise com GET condicional.
+    
+    Retorna (etag, análise) com a resposta já decodificada e normalizada
+    uma única vez. Em 304 (nada mudou) devolve o `cached` recebido.
+    """
     try:
-        response = requests.get(f"{API_BASE}/analysis/{analysis_id}", timeout=10)
+        headers = {"If-None-Match": etag} if etag else {}
+        response = SESSION.get(f"{API_BASE}/analysis/{analysis_id}", headers=headers, timeout=10)
+        if response.status_code == 304:
+            return etag, cached
         if response.status_code == 200:
-            return response.json()
+            return response.headers.get("ETag"), _extract_analysis(response_json(response))
         elif response.status_code == 404:
             print(f"⚠️  Análise não encontrada: {analysis_id}")
-            return None
+            return None, None
         else:
             print(f"❌ Erro ao obter status: {response.status_code}")
-            return None
+            return None, None
     except Exception as e:
         print(f"❌ Erro ao obter status: {e}")
-        return None
+        return None, None
 
 
 def get_debug_status(analysis_id: str) -> Optional[dict]:
     """Obtém status detalhado de debug."""
     try:
-        response = requests.get(f"{API_BASE}/debug/analysis/{analysis_id}/status", timeout=10)
+        response = SESSION.get(f"{API_BASE}/debug/analysis/{analysis_id}/status", timeout=10)
         if response.status_code == 200:
-            return response.json()
+            return response_json(response)
         return None
     except Exception as e:
         print(f"⚠️  Erro ao obter debug status: {e}")
         return None
 
 
+def print_progress(analysis: dict, elapsed: int):
+    """Mostra status, progresso e etapa atual da análise."""
+    current_status = analysis.get("status")
+    emoji = STATUS_EMOJI.get(current_status, "❓")
+    lines = [f"   [{elapsed:4d}s] {emoji} Status: {current_status} | Progresso: {analysis.get('progress', 0)}%"]
+    
+    # Mostrar etapas se disponível
+    steps = analysis.get("steps", [])
+    if steps:
+        current_step = None
+        for step in steps:
+            if step.get("status") == "running":
+                current_step = step.get("name")
+                break
+        if current_step:
+            lines.append(f"            → Etapa atual: {current_step}")
+    
+    # Uma única escrita por atualização
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
+
+
+def report_result(analysis_id: str, analysis: dict, elapsed: int) -> bool:
+    """Mostra o resultado final da análise (completed/failed)."""
+    if analysis.get("status") == "completed":
+        # Mostrar resultados
+        sys.stdout.write(DONE_TMPL.format_map({
+            "elapsed": elapsed,
+            "classification": analysis.get('classification', 'N/A'),
+            "confidence": analysis.get('confidence', 0)
+        }))
+        sys.stdout.flush()
+        
+        # Verificar arquivos
+        debug_data = get_debug_status(analysis_id)
+        if debug_data and "data" in debug_data:
+            files = debug_data["data"].get("files", {})
+            file_ids = debug_data["data"].get("file_ids", {})
+            
+            print("\n📁 Arquivos gerados:")
+            if file_ids.get("original_file_id"):
+                print("   ✅ Arquivo original")
+            if file_ids.get("report_file_id"):
+                print("   ✅ Relatório JSON")
+            else:
+                print("   ❌ Relatório JSON não gerado")
+            if file_ids.get("clean_video_id"):
+                print("   ✅ Vídeo limpo")
+            else:
+                print("   ⚠️  Vídeo limpo não gerado (pode ser normal se FFmpeg não disponível)")
+        
+        return True
+    
+    print(f"\n❌ Análise falhou após {elapsed}s")
+    error_msg = analysis.get("error_message", "Erro desconhecido")
+    print(f"   Erro: {error_msg}")
+    
+    # Mostrar status detalhado
+    debug_data = get_debug_status(analysis_id)
+    if debug_data and "data" in debug_data:
+        steps = debug_data["data"].get("steps", [])
+        print("\n📋 Status das etapas:")
+        for step in steps:
+            emoji = STEP_STATUS_EMOJI.get(step.get("status"), "❓")
+            print(f"   {emoji} {step.get('step_name')}: {step.get('status')} ({step.get('progress')}%)")
+            if step.get("error"):
+                print(f"      Erro: {step.get('error')}")
+    
+    return False
+
+
 def monitor_analysis(analysis_id: str, max_wait: int = 600):
     """Monitora análise até completar ou falhar."""
     print(f"\n🔍 Monitorando análise: {analysis_id}")
     print("   Aguardando processamento...")
     
-    start_time = time.time()
+    start_time = time.monotonic()
     last_status = None
     last_progress = -1
+    etag = None
+    analysis = None
     
-    while True:
-        elapsed = int(time.time() - start_time)
-        if elapsed > max_wait:
-            print(f"\n⏱️  Timeout após {max_wait}s")
-            return False
-        
-        status_data = get_analysis_status(analysis_id)
-        if not status_data:
-            time.sleep(2)
-            continue
-        
-        # Extrair dados da resposta
-        if "data" in status_data:
-            analysis = status_data["data"].get("analysis", {}) or status_data["data"]
-        else:
-            analysis = status_data
+    def check():
+        nonlocal last_status, last_progress, etag, analysis
+        elapsed = int(time.monotonic() - start_time)
+        etag, analysis = get_analysis_status(analysis_id, etag, analysis)
+        if not analysis:
+            return None, False
         
         current_status = analysis.get("status")
         progress = analysis.get("progress", 0)
         
         # Mostrar progresso apenas se mudou
-        if current_status != last_status or progress != last_progress:
-            status_emoji = {
-                "pending": "⏳",
-                "analyzing": "🔄",
-                "completed": "✅",
-                "failed": "❌"
-            }
-            emoji = status_emoji.get(current_status, "❓")
-            print(f"   [{elapsed:4d}s] {emoji} Status: {current_status} | Progresso: {progress}%")
-            
-            # Mostrar etapas se disponível
-            steps = analysis.get("steps", [])
-            if steps:
-                current_step = None
-                for step in steps:
-                    if step.get("status") == "running":
-                        current_step = step.get("name")
-                        break
-                if current_step:
-                    print(f"            → Etapa atual: {current_step}")
+        changed = current_status != last_status or progress != last_progress
+        if changed:
+            print_progress(analysis, elapsed)
         
         last_status = current_status
         last_progress = progress
         
         # Verificar se completou ou falhou
-        if current_status == "completed":
-            print(f"\n✅ Análise concluída em {elapsed}s!")
-            
-            # Mostrar resultados
-            print("\n📊 Resultados:")
-            print(f"   Classificação: {analysis.get('classification', 'N/A')}")
-            print(f"   Confiança: {analysis.get('confidence', 0):.2%}")
-            
-            # Verificar arquivos
-            debug_data = get_debug_status(analysis_id)
-            if debug_data and "data" in debug_data:
-                files = debug_data["data"].get("files", {})
-                file_ids = debug_data["data"].get("file_ids", {})
-                
-                print("\n📁 Arquivos gerados:")
-                if file_ids.get("original_file_id"):
-                    print("   ✅ Arquivo original")
-                if file_ids.get("report_file_id"):
-                    print("   ✅ Relatório JSON")
-                else:
-                    print("   ❌ Relatório JSON não gerado")
-                if file_ids.get("clean_video_id"):
-                    print("   ✅ Vídeo limpo")
-                else:
-                    print("   ⚠️  Vídeo limpo não gerado (pode ser normal se FFmpeg não disponível)")
-            
-            return True
-        
-        if current_status == "failed":
-            print(f"\n❌ Análise falhou após {elapsed}s")
-            error_msg = analysis.get("error_message", "Erro desconhecido")
-            print(f"   Erro: {error_msg}")
-            
-            # Mostrar status detalhado
-            debug_data = get_debug_status(analysis_id)
-            if debug_data and "data" in debug_data:
-                steps = debug_data["data"].get("steps", [])
-                print("\n📋 Status das etapas:")
-                for step in steps:
-                    status_emoji = {
-                        "pending": "⏳",
-                        "running": "🔄",
-                        "completed": "✅",
-                        "failed": "❌"
-                    }
-                    emoji = status_emoji.get(step.get("status"), "❓")
-                    print(f"   {emoji} {step.get('step_name')}: {step.get('status')} ({step.get('progress')}%)")
-                    if step.get("error"):
-                        print(f"      Erro: {step.get('error')}")
+        if current_status in ("completed", "failed"):
+            return report_result(analysis_id, analysis, elapsed), changed
+        return None, changed
+    
+    result = poll_until(check, max_wait)
+    if result is None:
+        print(f"\n⏱️  Timeout após {max_wait}s")
+        return False
+    return result
+
+
+def monitor_analysis_sse(analysis_id: str, max_wait: int = 600):
+    """
+    Monitora análise pelo stream de eventos (SSE) do servidor.
+    
+    Uma única conexão recebe cada mudança de status assim que ocorre. Se o
+    servidor não oferecer o stream (404/501), volta ao polling.
+    """
+    try:
+        response = SESSION.get(
+            f"{API_BASE}/analysis/{analysis_id}/events",
+            headers={"Accept": "text/event-stream"},
+            stream=True,
+            timeout=(5, 60)
+        )
+    except Exception as e:
+        print(f"⚠️  Stream de eventos indisponível ({e}), usando polling")
+        return monitor_analysis(analysis_id, max_wait)
+    
+    if response.status_code != 200:
+        response.close()
+        if response.status_code not in (404, 501):
+            print(f"⚠️  Stream de eventos retornou {response.status_code}, usando polling")
+        return monitor_analysis(analysis_id, max_wait)
+    
+    print(f"\n🔍 Monitorando análise (stream): {analysis_id}")
+    print("   Aguardando processamento...")
+    
+    start_time = time.monotonic()
+    with response:
+        for line in response.iter_lines(decode_unicode=True):
+            elapsed = int(time.monotonic() - start_time)
+            if elapsed > max_wait:
+                print(f"\n⏱️  Timeout após {max_wait}s")
+                return False
+            if not line or not line.startswith("data: "):
+                continue
             
-            return False
-        
-        time.sleep(2)
+            analysis = _extract_analysis(json_loads(line[6:]))
+            print_progress(analysis, elapsed)
+            if analysis.get("status") in ("completed", "failed"):
+                return report_result(analysis_id, analysis, elapsed)
+    
+    # Conexão encerrada antes do fim da análise: continuar por polling
+    return monitor_analysis(analysis_id, max_wait)
 
 
 def main():
@@ -238,13 +340,19 @@ def main():
     print("TESTE END-TO-END - VID-FINGER")
     print("=" * 70)
     
-    # 1. Verificar servidor
-    if not check_server():
-        sys.exit(1)
-    
-    # 2. Verificar dependências
-    if not check_dependencies():
-        print("\n⚠️  Continuando mesmo com algumas dependências não OK...")
+    # 1 e 2. Health e dependências são independentes: as duas requisições
+    # saem juntas e os resultados são mostrados na ordem de sempre
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        health = executor.submit(SESSION.get, f"{BASE_URL}/health", timeout=5)
+        dependencies = executor.submit(SESSION.get, f"{BASE_URL}/health/dependencies", timeout=10)
+        
+        # 1. Verificar servidor
+        if not check_server(health):
+            sys.exit(1)
+        
+        # 2. Verificar dependências
+        if not check_dependencies(dependencies):
+            print("\n⚠️  Continuando mesmo com algumas dependências não OK...")
     
     # 3. Fazer upload
     analysis_id = upload_video(video_path)
@@ -252,7 +360,7 @@ def main():
         sys.exit(1)
     
     # 4. Monitorar processamento
-    success = monitor_analysis(analysis_id)
+    success = monitor_analysis_sse(analysis_id)
     
     # 5. Resultado final
     print("\n" + "=" * 70)
@@ -1,13 +1,15 @@
 #!/usr/bin/env python3
 """Script para testar análise completa."""
 import sys
-import requests
+from _http import get_session, poll_until, response_json
 import time
 from pathlib import Path
 
 API_URL = "http://localhost:8000"
 TEST_VIDEO = "/Users/leandrobosaipo/Downloads/andando-neutro-time-square.mp4"
 
+SESSION = get_session()
+
 if len(sys.argv) > 1:
     TEST_VIDEO = sys.argv[1]
 
@@ -17,6 +19,7 @@ print("╚═══════════════════════
 print()
 
 # Verificar se arquivo existe
+video_name = Path(TEST_VIDEO).name
 if not Path(TEST_VIDEO).exists():
     print(f"❌ Arquivo não encontrado: {TEST_VIDEO}")
     sys.exit(1)
@@ -27,15 +30,15 @@ print()
 # 1. Upload e análise
 print("1️⃣  Enviando arquivo...")
 with open(TEST_VIDEO, 'rb') as f:
-    files = {'file': (Path(TEST_VIDEO).name, f, 'video/mp4')}
-    response = requests.post(f"{API_URL}/api/v1/upload/analyze", files=files)
+    files = {'file': (video_name, f, 'video/mp4')}
+    response = SESSION.post(f"{API_URL}/api/v1/upload/analyze", files=files)
 
 if response.status_code != 202:
     print(f"❌ Erro no upload: {response.status_code}")
     print(response.text)
     sys.exit(1)
 
-data = response.json()
+data = response_json(response)
 analysis_id = data['analysis_id']
 print(f"✅ Analysis ID: {analysis_id}")
 print()
@@ -44,26 +47,37 @@ print()
 print("2️⃣  Monitorando processamento...")
 print()
 
-start_time = time.time()
+start_time = time.monotonic()
 last_status = None
+last_progress = None
+etag = None
+data = None
+
 
-while True:
-    response = requests.get(f"{API_URL}/api/v1/analysis/{analysis_id}")
-    if response.status_code != 200:
+def check():
+    global last_status, last_progress, etag, data
+    # GET condicional: 304 significa que o status não mudou desde o último ETag
+    headers = {"If-None-Match": etag} if etag else {}
+    response = SESSION.get(f"{API_URL}/api/v1/analysis/{analysis_id}", headers=headers)
+    if response.status_code == 200:
+        etag = response.headers.get("ETag")
+        data = response_json(response)
+    elif response.status_code != 304:
         print(f"❌ Erro ao obter status: {response.status_code}")
-        break
+        return False, False
     
-    data = response.json()
     status = data.get('status')
     progress = data.get('progress', 0)
+    changed = status != last_status or progress != last_progress
+    last_progress = progress
     
     if status != last_status:
-        elapsed = time.time() - start_time
+        elapsed = time.monotonic() - start_time
         print(f"[{elapsed:.1f}s] Status: {status} ({progress}%)")
         last_status = status
     
     if status == 'completed':
-        elapsed = time.time() - start_time
+        elapsed = time.monotonic() - start_time
         print()
         print("="*60)
         print("✅ ANÁLISE COMPLETA!")
@@ -78,17 +92,20 @@ while True:
         print(f"  Clean Video: {data.get('clean_video_url')}")
         print(f"  Report: {data.get('report_url')}")
         print(f"  Original: {data.get('original_video_url')}")
-        break
+        return True, changed
     
     if status == 'failed':
-        elapsed = time.time() - start_time
+        elapsed = time.monotonic() - start_time
         print()
         print("="*60)
         print("❌ ANÁLISE FALHOU")
         print("="*60)
         print(f"Tempo: {elapsed:.1f}s")
         print(f"Erro: {data.get('error_message', 'N/A')}")
-        break
+        return False, changed
     
-    time.sleep(2)
+    return None, changed
+
+
+poll_until(check)
 
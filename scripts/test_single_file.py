@@ -2,13 +2,21 @@
 """Script de teste para um arquivo específico."""
 import sys
 import os
+import queue
+import threading
+import time
 import requests
+from _http import get_session
 import json
 from pathlib import Path
 
 # Configuração
 API_BASE_URL = "http://localhost:8000"
 TEST_VIDEO = sys.argv[1] if len(sys.argv) > 1 else "/Users/leandrobosaipo/Downloads/andando-neutro-time-square.mp4"
+# Intervalo mínimo (s) entre atualizações da linha de progresso do upload
+PROGRESS_INTERVAL = 0.2
+
+SESSION = get_session()
 
 def test_health():
     """Testa health check."""
@@ -16,7 +24,7 @@ def test_health():
     print("1. Testando Health Check")
     print("=" * 60)
     try:
-        response = requests.get(f"{API_BASE_URL}/health", timeout=5)
+        response = SESSION.get(f"{API_BASE_URL}/health", timeout=5)
         print(f"Status: {response.status_code}")
         print(f"Response: {response.json()}")
         return response.status_code == 200
@@ -30,7 +38,7 @@ def test_upload_init(filename, file_size, mime_type):
     print("\n" + "=" * 60)
     print("2. Testando Upload Init")
     print("=" * 60)
-    response = requests.post(
+    response = SESSION.post(
         f"{API_BASE_URL}/api/v1/upload/init",
         json={
             "filename": filename,
@@ -55,28 +63,39 @@ def test_upload_chunks(upload_id, file_path, chunk_size):
     print("3. Testando Upload de Chunks")
     print("=" * 60)
     
-    with open(file_path, 'rb') as f:
-        chunk_num = 0
-        while True:
-            chunk_data = f.read(chunk_size)
-            if not chunk_data:
-                break
-            
-            response = requests.post(
-                f"{API_BASE_URL}/api/v1/upload/chunk/{upload_id}",
-                data={"chunk_number": chunk_num},
-                files={"chunk": (f"chunk_{chunk_num}.bin", chunk_data, "application/octet-stream")}
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                print(f"Chunk {chunk_num}: OK - Progress: {data['progress']:.1f}% ({data['chunks_received']}/{data['total_chunks']})")
-            else:
-                print(f"Chunk {chunk_num}: ERROR - {response.text[:200]}")
-                return False
-            
-            chunk_num += 1
-    
+    # Leitura do disco em outra thread, à frente do envio (até 4 chunks em memória)
+    chunks = queue.Queue(maxsize=4)
+    
+    def reader():
+        with open(file_path, 'rb') as f:
+            for chunk_num, chunk_data in enumerate(iter(lambda: f.read(chunk_size), b"")):
+                chunks.put((chunk_num, chunk_data))
+        chunks.put(None)
+    
+    threading.Thread(target=reader, daemon=True).start()
+    
+    last_print = 0.0
+    while (item := chunks.get()) is not None:
+        chunk_num, chunk_data = item
+        response = SESSION.post(
+            f"{API_BASE_URL}/api/v1/upload/chunk/{upload_id}",
+            data={"chunk_number": chunk_num},
+            files={"chunk": (f"chunk_{chunk_num}.bin", chunk_data, "application/octet-stream")}
+        )
+        
+        if response.status_code == 200:
+            data = response.json()
+            # Progresso em uma única linha, reescrita no máximo a cada PROGRESS_INTERVAL
+            now = time.monotonic()
+            if now - last_print >= PROGRESS_INTERVAL or data['chunks_received'] == data['total_chunks']:
+                sys.stdout.write(f"\rChunk {chunk_num}: OK - Progress: {data['progress']:5.1f}% ({data['chunks_received']}/{data['total_chunks']})")
+                sys.stdout.flush()
+                last_print = now
+        else:
+            print(f"\nChunk {chunk_num}: ERROR - {response.text[:200]}")
+            return False
+    
+    sys.stdout.write("\n")
     return True
 
 def test_complete_upload(upload_id, webhook_url=None):
@@ -89,7 +108,7 @@ def test_complete_upload(upload_id, webhook_url=None):
     if webhook_url:
         params["webhook_url"] = webhook_url
     
-    response = requests.post(
+    response = SESSION.post(
         f"{API_BASE_URL}/api/v1/upload/complete/{upload_id}",
         params=params
     )
@@ -111,7 +130,7 @@ def test_get_analysis(analysis_id):
     print("5. Testando Get Analysis Status")
     print("=" * 60)
     
-    response = requests.get(f"{API_BASE_URL}/api/v1/analysis/{analysis_id}")
+    response = SESSION.get(f"{API_BASE_URL}/api/v1/analysis/{analysis_id}")
     print(f"Status: {response.status_code}")
     
     if response.status_code == 200:
@@ -1,13 +1,22 @@
 #!/usr/bin/env python3
 """Script para testar upload e processamento completo."""
-import requests
-import time
-import json
+from _http import get_session, poll_until, response_json
 import sys
 from pathlib import Path
 
 API_BASE = "http://localhost:8000"
 
+# Resumo final, escrito de uma vez
+DONE_TMPL = (
+    "\n✅✅✅ PROCESSAMENTO CONCLUÍDO! ✅✅✅\n\n"
+    "   Classificação: {classification}\n"
+    "   Confiança: {confidence:.2%}\n"
+    "   Relatório: {report_url}\n"
+    "   Vídeo Limpo: {clean_video_url}\n"
+)
+
+SESSION = get_session()
+
 def test_upload_and_process(video_path: str):
     """Testa upload e aguarda processamento completo."""
     print(f"\n{'='*70}")
@@ -28,13 +37,13 @@ def test_upload_and_process(video_path: str):
     try:
         with open(video_path, 'rb') as f:
             files = {'file': (video_file.name, f, 'video/mp4')}
-            response = requests.post(
+            response = SESSION.post(
                 f"{API_BASE}/api/v1/upload/analyze",
                 files=files,
                 timeout=60
             )
             response.raise_for_status()
-            result = response.json()
+            result = response_json(response)
             analysis_id = result.get('analysis_id')
             print(f"✅ Upload concluído!")
             print(f"   Analysis ID: {analysis_id}")
@@ -46,24 +55,33 @@ def test_upload_and_process(video_path: str):
     # 2. Monitorar processamento
     print("2️⃣ Monitorando processamento...")
     max_wait = 600  # 10 minutos máximo
-    start_time = time.time()
     last_status = None
+    last_progress = None
+    etag = None
+    analysis = None
     
-    while time.time() - start_time < max_wait:
+    def check():
+        nonlocal last_status, last_progress, etag, analysis
         try:
-            response = requests.get(
+            # GET condicional: 304 significa que o status não mudou desde o último ETag
+            response = SESSION.get(
                 f"{API_BASE}/api/v1/analysis/{analysis_id}",
+                headers={"If-None-Match": etag} if etag else {},
                 timeout=10
             )
-            response.raise_for_status()
-            analysis = response.json()
+            if response.status_code != 304:
+                response.raise_for_status()
+                etag = response.headers.get("ETag")
+                analysis = response_json(response)
             
             status = analysis.get('status')
             progress = analysis.get('progress', 0)
+            changed = status != last_status or progress != last_progress
+            last_progress = progress
             
             # Mostrar mudanças de status
             if status != last_status:
-                print(f"\n   Status: {status} (Progresso: {progress}%)")
+                lines = [f"\n   Status: {status} (Progresso: {progress}%)"]
                 last_status = status
                 
                 # Mostrar etapas
@@ -73,32 +91,41 @@ def test_upload_and_process(video_path: str):
                     step_name = step.get('name')
                     step_progress = step.get('progress', 0)
                     if step_status == 'running':
-                        print(f"   ⏳ {step_name}: {step_progress}%")
+                        lines.append(f"   ⏳ {step_name}: {step_progress}%")
                     elif step_status == 'completed':
-                        print(f"   ✅ {step_name}: {step_progress}%")
+                        lines.append(f"   ✅ {step_name}: {step_progress}%")
                     elif step_status == 'failed':
-                        print(f"   ❌ {step_name}: FALHOU")
+                        lines.append(f"   ❌ {step_name}: FALHOU")
+                
+                # Uma única escrita por mudança de status
+                sys.stdout.write("\n".join(lines) + "\n")
+                sys.stdout.flush()
             
             # Verificar se completou
             if status == 'completed':
-                print(f"\n✅✅✅ PROCESSAMENTO CONCLUÍDO! ✅✅✅\n")
-                print(f"   Classificação: {analysis.get('classification')}")
-                print(f"   Confiança: {analysis.get('confidence', 0) * 100:.2f}%")
-                print(f"   Relatório: {analysis.get('report_url', 'N/A')}")
-                print(f"   Vídeo Limpo: {analysis.get('clean_video_url', 'N/A')}")
-                return True
+                sys.stdout.write(DONE_TMPL.format_map({
+                    "classification": analysis.get('classification'),
+                    "confidence": analysis.get('confidence', 0),
+                    "report_url": analysis.get('report_url', 'N/A'),
+                    "clean_video_url": analysis.get('clean_video_url', 'N/A')
+                }))
+                sys.stdout.flush()
+                return True, changed
             
             # Verificar se falhou
             if status == 'failed':
                 print(f"\n❌ PROCESSAMENTO FALHOU!\n")
                 print(f"   Erro: {analysis.get('error_message', 'N/A')}")
-                return False
-            
-            time.sleep(2)  # Aguardar 2 segundos antes de verificar novamente
+                return False, changed
             
+            return None, changed
         except Exception as e:
             print(f"⚠️ Erro ao verificar status: {e}")
-            time.sleep(5)
+            return None, False
+    
+    result = poll_until(check, max_wait)
+    if result is not None:
+        return result
     
     print(f"\n⏱️ Timeout: Processamento não completou em {max_wait}s")
     return False
@@ -106,12 +133,12 @@ def test_upload_and_process(video_path: str):
 def get_detailed_status(analysis_id: str):
     """Obtém status detalhado via endpoint de debug."""
     try:
-        response = requests.get(
+        response = SESSION.get(
             f"{API_BASE}/api/v1/debug/analysis/{analysis_id}/status",
             timeout=10
         )
         response.raise_for_status()
-        return response.json()
+        return response_json(response)
     except Exception as e:
         print(f"Erro ao obter status detalhado: {e}")
         return None
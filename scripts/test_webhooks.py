@@ -2,7 +2,7 @@
 """Script para testar webhooks por etapa."""
 import sys
 import os
-import requests
+from _http import get_session
 import json
 import time
 from pathlib import Path
@@ -11,6 +11,8 @@ from pathlib import Path
 API_BASE_URL = "http://localhost:8000"
 WEBHOOK_URL = os.getenv("WEBHOOK_URL", "https://webhook.site/unique-id")
 
+SESSION = get_session()
+
 def test_webhook_analysis(video_path: str, webhook_url: str):
     """Testa análise com webhook."""
     print("=" * 60)
@@ -33,7 +35,7 @@ def test_webhook_analysis(video_path: str, webhook_url: str):
             files = {'file': (Path(video_path).name, f, 'video/mp4')}
             data = {'webhook_url': webhook_url}
             
-            response = requests.post(
+            response = SESSION.post(
                 f"{API_BASE_URL}/api/v1/upload/analyze",
                 files=files,
                 data=data,
@@ -2,7 +2,7 @@
 """Script de teste com upload para CDN."""
 import sys
 import os
-import requests
+from _http import get_session
 import json
 from pathlib import Path
 
@@ -10,6 +10,8 @@ from pathlib import Path
 API_BASE_URL = "http://localhost:8000"
 TEST_VIDEO = sys.argv[1] if len(sys.argv) > 1 else "/Users/leandrobosaipo/Downloads/andando-neutro-time-square.mp4"
 
+SESSION = get_session()
+
 def test_upload_with_cdn():
     """Testa upload completo com CDN."""
     print("=" * 60)
@@ -29,7 +31,7 @@ def test_upload_with_cdn():
     
     # 1. Init upload
     print("\n1. Iniciando upload...")
-    response = requests.post(
+    response = SESSION.post(
         f"{API_BASE_URL}/api/v1/upload/init",
         json={
             "filename": filename,
@@ -57,7 +59,7 @@ def test_upload_with_cdn():
             if not chunk_data:
                 break
             
-            response = requests.post(
+            response = SESSION.post(
                 f"{API_BASE_URL}/api/v1/upload/chunk/{upload_id}",
                 data={"chunk_number": chunk_num},
                 files={"chunk": (f"chunk_{chunk_num}.bin", chunk_data, "application/octet-stream")}
@@ -75,7 +77,7 @@ def test_upload_with_cdn():
     # 3. Complete upload (com webhook de teste)
     print("\n3. Finalizando upload (com CDN e webhook)...")
     webhook_url = "https://webhook.site/unique-id"  # URL de teste
-    response = requests.post(
+    response = SESSION.post(
         f"{API_BASE_URL}/api/v1/upload/complete/{upload_id}",
         params={"webhook_url": webhook_url}
     )
@@ -91,7 +93,7 @@ def test_upload_with_cdn():
     
     # 4. Verificar status
     print("\n4. Verificando status da análise...")
-    response = requests.get(f"{API_BASE_URL}/api/v1/analysis/{analysis_id}")
+    response = SESSION.get(f"{API_BASE_URL}/api/v1/analysis/{analysis_id}")
     
     if response.status_code == 200:
         data = response.json()
@@ -0,0 +1,61 @@
+"""Testes para AnalysisProcessor."""
+import asyncio
+import uuid
+from sqlalchemy import select
+from app.database import Base
+from app.models import Analysis, AnalysisStep, File, FileType, StepName, StepStatus
+from app.services.analysis_processor import AnalysisProcessor
+from tests.conftest import test_engine, TestSessionLocal
+
+
+async def _create_analysis_with_step(db, step_name: StepName) -> Analysis:
+    """Cria análise mínima com uma única etapa pendente."""
+    original_file = File(
+        id=uuid.uuid4(),
+        file_type=FileType.original,
+        original_filename="sample-video.mp4",
+        stored_filename="sample-video.mp4",
+        file_path="/tmp/sample-video.mp4",
+        file_size=1024,
+        mime_type="video/mp4",
+        checksum="0" * 64
+    )
+    db.add(original_file)
+    await db.flush()
+    
+    analysis = Analysis(id=uuid.uuid4(), original_file_id=original_file.id)
+    db.add(analysis)
+    db.add(AnalysisStep(analysis_id=analysis.id, step_name=step_name))
+    await db.commit()
+    return analysis
+
+
+def test_update_step_sets_timestamps_once():
+    """_update_step deve preservar started_at e preencher completed_at ao concluir."""
+    async def scenario():
+        async with test_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        try:
+            async with TestSessionLocal() as db:
+                analysis = await _create_analysis_with_step(db, StepName.prnu)
+                analysis_id = analysis.id
+                
+                await AnalysisProcessor._update_step(analysis_id, StepName.prnu, StepStatus.running, 0, db)
+                step = (await db.execute(select(AnalysisStep))).scalar_one()
+                first_started_at = step.started_at
+                assert step.status == StepStatus.running
+                assert first_started_at is not None
+                assert step.completed_at is None
+                
+                await AnalysisProcessor._update_step(analysis_id, StepName.prnu, StepStatus.running, 50, db)
+                await AnalysisProcessor._update_step(analysis_id, StepName.prnu, StepStatus.completed, 100, db)
+                step = (await db.execute(select(AnalysisStep))).scalar_one()
+                assert step.status == StepStatus.completed
+                assert step.progress == 100
+                assert step.started_at == first_started_at
+                assert step.completed_at is not None
+        finally:
+            async with test_engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
+    
+    asyncio.run(scenario())
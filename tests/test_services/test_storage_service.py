@@ -0,0 +1,48 @@
+"""Testes para StorageService."""
+from app.config import settings
+from app.services.storage_service import StorageService, MAX_PARTS, MIN_PART_SIZE
+
+
+def test_choose_transfer_config_by_file_size():
+    """Arquivos grandes usam multipart e respeitam o limite de partes."""
+    service = StorageService()
+
+    medium = service._choose_transfer_config(100 * 1024 * 1024)
+    assert medium.multipart_threshold <= 100 * 1024 * 1024
+    assert medium.multipart_chunksize >= 5 * 1024 * 1024
+
+    huge_size = 700 * 1024 * 1024 * 1024
+    huge = service._choose_transfer_config(huge_size)
+    assert huge_size / huge.multipart_chunksize <= MAX_PARTS
+
+
+def test_configured_part_size_is_respected(monkeypatch):
+    """S3_MULTIPART_PART_SIZE abaixo de 16MB é usado; só o mínimo de 5MB do S3 se impõe."""
+    monkeypatch.setattr(settings, "S3_MULTIPART_PART_SIZE", 8 * 1024 * 1024)
+    monkeypatch.setattr(settings, "S3_MULTIPART_CONCURRENCY", 4)
+    assert StorageService()._choose_transfer_config(1024 * 1024 * 1024).multipart_chunksize == 8 * 1024 * 1024
+
+    monkeypatch.setattr(settings, "S3_MULTIPART_PART_SIZE", 1024 * 1024)
+    assert StorageService()._choose_transfer_config(1024 * 1024 * 1024).multipart_chunksize == MIN_PART_SIZE
+
+
+def test_small_file_uses_single_put_object(tmp_path):
+    """Arquivos até SINGLE_PUT_MAX_SIZE saem em um único put_object."""
+    calls = []
+
+    class FakeS3Client:
+        def put_object(self, **kwargs):
+            calls.append(("put_object", kwargs["Key"]))
+
+        def upload_file(self, *args, **kwargs):
+            calls.append(("upload_file", args[2]))
+
+    service = StorageService()
+    service.s3_client = FakeS3Client()
+    service.bucket = "bucket"
+    service._url_prefix = "https://cdn/bucket"
+
+    report = tmp_path / "report.json"
+    report.write_bytes(b"{}")
+    assert service.upload_file(report, "a/report.json") == "https://cdn/bucket/a/report.json"
+    assert calls == [("put_object", "a/report.json")]
@@ -1,5 +1,9 @@
 """Testes para UploadService."""
+import hashlib
+import pytest
 from app.services.upload_service import UploadService
+from app.services.file_service import FileService
+from app.utils.chunked_upload import ChunkedUploadManager, BULK_FRAME_HEADER, BULK_DIGEST_SIZE
 from app.config import settings
 
 
@@ -17,3 +21,145 @@ def test_init_upload_persists_mime_type(tmp_path, monkeypatch):
     assert status is not None
     assert status["mime_type"] == "video/mp4"
     assert status["filename"] == "sample-video.mp4"
+
+
+def test_complete_upload_without_checksum(tmp_path, monkeypatch):
+    """complete_upload deve permitir adiar o checksum para o chamador."""
+    monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+    
+    content = b"video-bytes" * 10
+    upload_id, _, _ = UploadService.init_upload(
+        filename="sample-video.mp4",
+        file_size=len(content),
+        mime_type="video/mp4"
+    )
+    UploadService.save_chunk(upload_id, 0, content)
+    
+    file_path, checksum = UploadService.complete_upload(
+        upload_id,
+        tmp_path / "original",
+        calculate_checksum=False
+    )
+    
+    assert checksum is None
+    assert file_path.read_bytes() == content
+
+
+def test_upload_file_direct_splits_into_chunks(tmp_path, monkeypatch):
+    """upload_file_direct deve dividir arquivos maiores que CHUNK_SIZE sem perder bytes."""
+    monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "CHUNK_SIZE", 16)
+    
+    content = bytes(range(50))
+    upload_id = UploadService.upload_file_direct(
+        file_content=content,
+        filename="sample-video.mp4",
+        mime_type="video/mp4"
+    )
+    
+    file_path, _ = UploadService.complete_upload(upload_id, tmp_path / "original")
+    assert file_path.read_bytes() == content
+
+
+def test_complete_upload_checksum_matches_file(tmp_path, monkeypatch):
+    """O checksum calculado na montagem deve ser igual ao do arquivo final."""
+    monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "CHUNK_SIZE", 16)
+    
+    content = bytes(range(50))
+    upload_id = UploadService.upload_file_direct(
+        file_content=content,
+        filename="sample-video.mp4",
+        mime_type="video/mp4"
+    )
+    
+    file_path, checksum = UploadService.complete_upload(upload_id, tmp_path / "original")
+    assert checksum == FileService.calculate_checksum(file_path)
+
+
+def test_chunks_saved_by_separate_requests_are_all_tracked(tmp_path, monkeypatch):
+    """Chunks salvos por gerenciadores distintos (requisições concorrentes) não se perdem no manifesto."""
+    monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "CHUNK_SIZE", 4)
+    
+    upload_id, _, total_chunks = UploadService.init_upload(
+        filename="sample-video.mp4",
+        file_size=12,
+        mime_type="video/mp4"
+    )
+    first = ChunkedUploadManager.load_upload(upload_id)
+    second = ChunkedUploadManager.load_upload(upload_id)
+    first.save_chunk(0, b"aaaa")
+    second.save_chunk(2, b"cccc")
+    UploadService.save_chunk(upload_id, 1, b"bbbb")
+    
+    status = UploadService.get_upload_status(upload_id)
+    assert total_chunks == 3
+    assert status["chunks_received"] == 3
+    assert status["is_complete"]
+
+
+@pytest.mark.parametrize("direct_write", [False, True])
+def test_save_chunk_rejects_negative_chunk_number(tmp_path, monkeypatch, direct_write):
+    """chunk_number negativo é erro de validação, sem gravar nada."""
+    monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "UPLOAD_DIRECT_WRITE", direct_write)
+    
+    upload_id, _, _ = UploadService.init_upload(
+        filename="sample-video.mp4",
+        file_size=10,
+        mime_type="video/mp4"
+    )
+    with pytest.raises(ValueError):
+        UploadService.save_chunk(upload_id, -1, b"aaaa")
+    assert UploadService.get_upload_status(upload_id)["chunks_received"] == 0
+
+
+def test_direct_write_upload_assembles_out_of_order_chunks(tmp_path, monkeypatch):
+    """Com UPLOAD_DIRECT_WRITE, chunks fora de ordem vão direto para o arquivo final."""
+    monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "CHUNK_SIZE", 16)
+    monkeypatch.setattr(settings, "UPLOAD_DIRECT_WRITE", True)
+    
+    content = bytes(range(40))
+    upload_id, chunk_size, total_chunks = UploadService.init_upload(
+        filename="sample-video.mp4",
+        file_size=len(content),
+        mime_type="video/mp4"
+    )
+    for chunk_number in reversed(range(total_chunks)):
+        offset = chunk_number * chunk_size
+        UploadService.save_chunk(upload_id, chunk_number, content[offset:offset + chunk_size])
+    
+    file_path, checksum = UploadService.complete_upload(upload_id, tmp_path / "original")
+    assert file_path.read_bytes() == content
+    assert checksum == FileService.calculate_checksum(file_path)
+
+
+def test_save_chunks_bulk_validates_and_saves_frames(tmp_path, monkeypatch):
+    """Envio em lote grava todos os chunks válidos e rejeita frames inválidos ou grandes demais."""
+    monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "CHUNK_SIZE", 4)
+    
+    def frame(chunk_number, data, digest=None):
+        digest = digest or hashlib.blake2b(data, digest_size=BULK_DIGEST_SIZE).digest()
+        return BULK_FRAME_HEADER.pack(len(data), chunk_number) + data + digest
+    
+    upload_id, _, _ = UploadService.init_upload(
+        filename="sample-video.mp4",
+        file_size=10,
+        mime_type="video/mp4"
+    )
+    
+    with pytest.raises(ValueError):
+        UploadService.save_chunks_bulk(upload_id, frame(0, b"aaaa", digest=bytes(BULK_DIGEST_SIZE)))
+    with pytest.raises(ValueError):
+        UploadService.save_chunks_bulk(upload_id, frame(0, b"aaaaa"))
+    
+    body = frame(2, b"cc") + frame(0, b"aaaa") + frame(1, b"bbbb")
+    chunks_received, progress = UploadService.save_chunks_bulk(upload_id, body)
+    assert chunks_received == 3
+    assert progress == 100.0
+    
+    file_path, _ = UploadService.complete_upload(upload_id, tmp_path / "original")
+    assert file_path.read_bytes() == b"aaaabbbbcc"
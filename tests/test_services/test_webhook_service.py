@@ -0,0 +1,184 @@
+"""Testes para WebhookService."""
+import asyncio
+import json
+import threading
+import numpy as np
+from app.services import webhook_service
+from app.services.webhook_service import WebhookService
+from app.config import settings
+from app.models.analysis_step import StepName
+
+
+def test_background_webhooks_keep_order_and_flush(monkeypatch):
+    """Webhooks em background de uma análise devem sair na ordem de agendamento."""
+    sent = []
+
+    async def fake_send_webhook(webhook_url, event, analysis_id, data=None):
+        # Primeiro evento mais lento que o segundo
+        await asyncio.sleep(0.02 if event == "first" else 0)
+        sent.append(event)
+        return True
+
+    monkeypatch.setattr(WebhookService, "send_webhook", staticmethod(fake_send_webhook))
+
+    async def scenario():
+        WebhookService.send_webhook_background("http://hook", "first", "analysis-1")
+        WebhookService.send_webhook_background("http://hook", "second", "analysis-1")
+        await WebhookService.flush_pending("analysis-1")
+
+    asyncio.run(scenario())
+
+    assert sent == ["first", "second"]
+    assert "analysis-1" not in webhook_service._pending_webhooks
+
+
+def test_batching_groups_events_per_url(monkeypatch):
+    """Com WEBHOOK_BATCHING, eventos próximos da mesma URL saem em um único POST."""
+    deliveries = []
+
+    async def fake_deliver(webhook_url, body, description):
+        deliveries.append((webhook_url, body))
+        return True
+
+    monkeypatch.setattr(settings, "WEBHOOK_BATCHING", True)
+    monkeypatch.setattr(WebhookService, "_deliver", staticmethod(fake_deliver))
+
+    async def scenario():
+        for event in ("a", "b", "c"):
+            await WebhookService.send_webhook("http://hook", event, "analysis-1")
+        await WebhookService.send_webhook("http://other", "d", "analysis-2")
+        await webhook_service._batcher.flush()
+
+    asyncio.run(scenario())
+
+    bodies = dict(deliveries)
+    assert [item["event"] for item in bodies["http://hook"]["deliveries"]] == ["a", "b", "c"]
+    assert bodies["http://other"]["event"] == "d"
+
+
+def test_circuit_breaker_fails_fast_after_threshold(monkeypatch):
+    """Após WEBHOOK_CIRCUIT_THRESHOLD falhas seguidas a URL não recebe novas tentativas."""
+    attempts = []
+
+    class FailingClient:
+        async def post(self, url, **kwargs):
+            attempts.append(url)
+            raise RuntimeError("receptor fora do ar")
+
+    monkeypatch.setattr(settings, "WEBHOOK_RETRY_ATTEMPTS", 2)
+    monkeypatch.setattr(settings, "WEBHOOK_BACKOFF_BASE", 0.0)
+    monkeypatch.setattr(settings, "WEBHOOK_CIRCUIT_THRESHOLD", 3)
+    monkeypatch.setattr(webhook_service, "get_client", lambda: FailingClient())
+    monkeypatch.setattr(webhook_service, "_circuit_state", {})
+
+    async def scenario():
+        results = []
+        for _ in range(3):
+            results.append(await WebhookService._deliver("http://down", {}, "teste"))
+        return results
+
+    assert asyncio.run(scenario()) == [False, False, False]
+    assert len(attempts) == 3
+
+
+def test_circuit_breaker_half_open_allows_single_probe(monkeypatch):
+    """Após o cooldown, envios concorrentes liberam uma única sondagem; se ela falhar o circuito reabre."""
+    attempts = []
+
+    class SlowFailingClient:
+        async def post(self, url, **kwargs):
+            attempts.append(url)
+            await asyncio.sleep(0.02)
+            raise RuntimeError("receptor fora do ar")
+
+    monkeypatch.setattr(settings, "WEBHOOK_RETRY_ATTEMPTS", 1)
+    monkeypatch.setattr(settings, "WEBHOOK_CIRCUIT_THRESHOLD", 1)
+    monkeypatch.setattr(settings, "WEBHOOK_CIRCUIT_COOLDOWN", 0.05)
+    monkeypatch.setattr(webhook_service, "get_client", lambda: SlowFailingClient())
+    monkeypatch.setattr(webhook_service, "_circuit_state", {})
+
+    async def scenario():
+        await WebhookService._deliver("http://down", {}, "teste")
+        await asyncio.sleep(0.06)
+        results = await asyncio.gather(
+            *(WebhookService._deliver("http://down", {}, "teste") for _ in range(3))
+        )
+        reopened = not webhook_service._circuit_allows("http://down")
+        return results, reopened
+
+    results, reopened = asyncio.run(scenario())
+    assert results == [False, False, False]
+    assert len(attempts) == 2
+    assert reopened
+
+
+def test_duplicate_step_update_is_suppressed(monkeypatch):
+    """O mesmo evento de etapa repetido em sequência deve gerar um único envio."""
+    collected = []
+
+    async def fake_collect(analysis_id, db, current_step_name=None, step_result=None):
+        collected.append(current_step_name)
+        return {}
+
+    async def fake_send_webhook(webhook_url, event, analysis_id, data=None):
+        return True
+
+    monkeypatch.setattr(WebhookService, "_collect_step_statistics", staticmethod(fake_collect))
+    monkeypatch.setattr(WebhookService, "send_webhook", staticmethod(fake_send_webhook))
+    monkeypatch.setattr(webhook_service, "_recent_step_events", webhook_service.OrderedDict())
+
+    async def scenario():
+        for is_starting in (True, True, False):
+            await WebhookService.send_step_update(
+                "http://hook", "analysis-1", StepName.prnu, is_starting, db=None
+            )
+
+    asyncio.run(scenario())
+
+    assert collected == [StepName.prnu, StepName.prnu]
+
+
+def test_encode_body_accepts_int_keys_and_numpy(monkeypatch):
+    """Chaves int e valores NumPy dos resultados das etapas não descartam o webhook."""
+    body = {"bins": {0: np.int64(3), 1: np.float32(0.5)}, "frames": np.arange(3)}
+
+    decoded = json.loads(webhook_service._encode_body(body))
+    assert decoded["bins"] == {"0": 3, "1": 0.5}
+    assert decoded["frames"] == [0, 1, 2]
+
+    # Sem orjson (ou se ele recusar o corpo), o json da stdlib ainda serializa
+    monkeypatch.setattr(webhook_service, "orjson", None)
+    decoded = json.loads(webhook_service._encode_body(body))
+    assert decoded["bins"] == {"0": "3", "1": "0.5"}
+
+
+def test_get_client_closes_client_of_previous_loop(monkeypatch):
+    """Ao trocar de event loop, o cliente do loop anterior (ainda ativo) é fechado."""
+    monkeypatch.setattr(webhook_service, "_client", None)
+    monkeypatch.setattr(webhook_service, "_client_loop", None)
+
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        async def create():
+            return webhook_service.get_client()
+
+        old_client = asyncio.run_coroutine_threadsafe(create(), other_loop).result(timeout=5)
+
+        async def switch():
+            new_client = webhook_service.get_client()
+            # aclose do cliente antigo roda no loop dele: aguardar até 1s
+            for _ in range(100):
+                if old_client.is_closed:
+                    break
+                await asyncio.sleep(0.01)
+            await new_client.aclose()
+            return new_client
+
+        assert asyncio.run(switch()) is not old_client
+        assert old_client.is_closed
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join(timeout=5)
+        other_loop.close()
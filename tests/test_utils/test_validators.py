@@ -0,0 +1,9 @@
+"""Testes para validadores de upload."""
+from app.utils.validators import sanitize_filename
+
+
+def test_sanitize_filename_replaces_dangerous_chars():
+    """Separadores, caracteres reservados e ".." devem virar "_"."""
+    assert sanitize_filename('../etc\\pass<w>d:"x"|?*.mp4') == '__etc_pass_w_d__x____.mp4'
+    assert sanitize_filename("video..final.mp4") == "video_final.mp4"
+    assert sanitize_filename("sample-video.mp4") == "sample-video.mp4"